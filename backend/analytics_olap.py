@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Stockage colonnaire des événements analytics (Parquet interrogé par DuckDB).
+
+Chaque worker garde les événements reçus dans un tampon et l'écrit toutes les
+FLUSH_SECONDS en fichiers Parquet, un répertoire par jour :
+
+    analytics/columnar/day=2026-10-19/part-<pid>-<n>.parquet
+
+Les requêtes de l'admin (/api/admin/analytics/timeseries, breakdown, percentiles) ne
+lisent que les fichiers des jours demandés et que les colonnes utiles : elles
+ne touchent ni la base principale ni les partitions SQLite. La tâche
+`analytics.compact` fusionne chaque jour passé en un seul fichier.
+
+DuckDB est optionnel : sans lui, les mêmes requêtes tournent sur les
+partitions SQLite d'analytics_store (plus lent sur de longues périodes).
+
+Usage (depuis backend/):
+    python analytics_olap.py backfill --start 2026-01-01   # reconstruire depuis les partitions SQLite
+    python analytics_olap.py compact
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from config import settings
+import analytics_store
+from lazy import lazy_import, is_available
+
+# duckdb est optionnel (repli sur les partitions SQLite) et importé au premier
+# usage : son chargement coûte ~90 ms au démarrage de chaque worker
+duckdb = lazy_import("duckdb")
+HAS_DUCKDB = is_available("duckdb")
+
+COLUMNAR_DIR = Path(settings.ANALYTICS_DATA_DIR) / "columnar"
+FLUSH_SECONDS = settings.ANALYTICS_COLUMNAR_FLUSH_SECONDS
+# Au-delà, le tampon est écrit sans attendre le prochain cycle
+FLUSH_MAX_ROWS = 5000
+
+BUCKETS = ("hour", "day", "week", "month")
+_KEY_RE = re.compile(r"^[A-Za-z0-9_]{1,64}$")
+
+_buffer: List[tuple] = []
+_buffer_lock = threading.Lock()
+_file_counter = 0
+_flush_task: Optional[asyncio.Task] = None
+
+
+# --- Écriture ---
+
+def append(session_id: str, user_id: Optional[int], event_type: str, url: str,
+           details: Optional[dict], timestamp: datetime):
+    """Ajouter un événement au tampon colonnaire (appelé sur le chemin d'ingestion)."""
+    if not HAS_DUCKDB:
+        return
+    with _buffer_lock:
+        _buffer.append((session_id, user_id, event_type, url,
+                        json.dumps(details, ensure_ascii=False) if details is not None else None, timestamp))
+        full = len(_buffer) >= FLUSH_MAX_ROWS
+    if full:
+        flush()
+
+
+def _day_dir(day: date) -> Path:
+    return COLUMNAR_DIR / f"day={day.isoformat()}"
+
+
+def _write_parquet(rows: Sequence[tuple], target: Path):
+    """Écrire des lignes (session_id, user_id, event_type, url, details, timestamp) dans un fichier Parquet."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    con = duckdb.connect()
+    try:
+        con.execute(
+            "CREATE TABLE batch (session_id VARCHAR, user_id INTEGER, event_type VARCHAR, "
+            "url VARCHAR, details VARCHAR, timestamp TIMESTAMP)"
+        )
+        con.executemany("INSERT INTO batch VALUES (?, ?, ?, ?, ?, ?)", list(rows))
+        con.execute(f"COPY (SELECT * FROM batch ORDER BY timestamp) TO {_sql_str(tmp)} (FORMAT PARQUET, COMPRESSION ZSTD)")
+    finally:
+        con.close()
+    # Les lecteurs ne voient jamais un fichier à moitié écrit
+    os.replace(tmp, target)
+
+
+def flush() -> int:
+    """Écrire le tampon en Parquet, un fichier par jour présent dans le tampon."""
+    global _buffer, _file_counter
+    with _buffer_lock:
+        if not _buffer:
+            return 0
+        rows, _buffer = _buffer, []
+        _file_counter += 1
+        counter = _file_counter
+    by_day: Dict[date, list] = {}
+    for row in rows:
+        by_day.setdefault(row[5].date(), []).append(row)
+    for day, day_rows in by_day.items():
+        _write_parquet(day_rows, _day_dir(day) / f"part-{os.getpid()}-{counter}.parquet")
+    return len(rows)
+
+
+async def _flush_loop():
+    from fastapi.concurrency import run_in_threadpool
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        try:
+            await run_in_threadpool(flush)
+        except Exception as e:
+            print(f"Échec de l'écriture Parquet: {e}")
+
+
+def start_flusher():
+    global _flush_task
+    if HAS_DUCKDB and _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_flusher():
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+        flush()
+
+
+def compact(before: Optional[date] = None) -> List[str]:
+    """Fusionner les fichiers de chaque jour antérieur à `before` (aujourd'hui par défaut) en un seul."""
+    if not HAS_DUCKDB or not COLUMNAR_DIR.exists():
+        return []
+    before = before or datetime.utcnow().date()
+    compacted = []
+    for day_dir in sorted(COLUMNAR_DIR.glob("day=*")):
+        day = date.fromisoformat(day_dir.name[4:])
+        if day < before - timedelta(days=settings.ANALYTICS_COLUMNAR_RETENTION_DAYS):
+            shutil.rmtree(day_dir)
+            continue
+        files = sorted(day_dir.glob("*.parquet"))
+        if day >= before or len(files) <= 1:
+            continue
+        target = day_dir / "compacted.parquet"
+        tmp = day_dir / "compacted.parquet.tmp"
+        con = duckdb.connect()
+        try:
+            con.execute(f"COPY (SELECT * FROM read_parquet({_sql_list(files)}) ORDER BY timestamp) "
+                        f"TO {_sql_str(tmp)} (FORMAT PARQUET, COMPRESSION ZSTD)")
+        finally:
+            con.close()
+        os.replace(tmp, target)
+        for path in files:
+            if path != target:
+                path.unlink()
+        compacted.append(day.isoformat())
+    return compacted
+
+
+def backfill(start: date, end: date) -> int:
+    """Reconstruire les fichiers Parquet des jours [start, end] depuis les partitions SQLite."""
+    if not HAS_DUCKDB:
+        raise RuntimeError("duckdb n'est pas installé")
+    total = 0
+    day = start
+    while day <= end:
+        rows = [row[1:] for row in analytics_store.iter_events(
+            datetime.combine(day, datetime.min.time()), datetime.combine(day, datetime.max.time())
+        )]
+        if _day_dir(day).exists():
+            shutil.rmtree(_day_dir(day))
+        if rows:
+            rows = [(r[0], r[1], r[2], r[3], json.dumps(r[4], ensure_ascii=False) if r[4] is not None else None, r[5])
+                    for r in rows]
+            _write_parquet(rows, _day_dir(day) / "compacted.parquet")
+            total += len(rows)
+        day += timedelta(days=1)
+    return total
+
+
+# --- Lecture ---
+
+def _sql_str(path) -> str:
+    """Littéral SQL pour un chemin (les apostrophes sont doublées)."""
+    return "'" + Path(path).as_posix().replace("'", "''") + "'"
+
+
+def _sql_list(paths) -> str:
+    return "[" + ", ".join(_sql_str(p) for p in paths) + "]"
+
+
+def _files(start: datetime, end: datetime) -> List[Path]:
+    files = []
+    day = start.date()
+    while day <= end.date():
+        files.extend(sorted(_day_dir(day).glob("*.parquet")))
+        day += timedelta(days=1)
+    return files
+
+
+def dimension_sql(dimension: str, engine: str) -> str:
+    """Expression SQL d'une dimension : url, event_type ou details.<clé>."""
+    if dimension in ("url", "event_type", "session_id"):
+        return dimension
+    if dimension.startswith("details.") and _KEY_RE.match(dimension[8:]):
+        function = "json_extract_string" if engine == "duckdb" else "json_extract"
+        return f"{function}(details, '$.{dimension[8:]}')"
+    raise ValueError(f"Dimension inconnue: {dimension}")
+
+
+def _weight_sql(engine: str) -> str:
+    """Poids d'échantillonnage (details.sample_weight, 1 par défaut) : les comptes restent sans biais."""
+    if engine == "duckdb":
+        return "COALESCE(TRY_CAST(json_extract_string(details, '$.sample_weight') AS DOUBLE), 1)"
+    return "COALESCE(json_extract(details, '$.sample_weight'), 1)"
+
+
+def _bucket_sql(bucket: str, engine: str) -> str:
+    if bucket not in BUCKETS:
+        raise ValueError(f"Intervalle inconnu: {bucket}")
+    if engine == "duckdb":
+        return f"date_trunc('{bucket}', timestamp)"
+    return {
+        "hour": "strftime('%Y-%m-%d %H:00:00', timestamp)",
+        "day": "date(timestamp)",
+        "week": "date(timestamp, '-' || ((strftime('%w', timestamp) + 6) % 7) || ' days')",
+        "month": "strftime('%Y-%m-01', timestamp)",
+    }[bucket]
+
+
+def _run(sql: str, start: datetime, end: datetime, params: list) -> List[tuple]:
+    """
+    Exécuter une requête sur la relation `events` de la période : fichiers Parquet
+    via DuckDB, sinon vue UNION ALL des partitions SQLite.
+    """
+    if HAS_DUCKDB:
+        files = _files(start, end)
+        if not files:
+            return []
+        con = duckdb.connect()
+        try:
+            con.execute(f"CREATE VIEW events AS SELECT * FROM read_parquet({_sql_list(files)})")
+            return con.execute(sql, [start, end] + params).fetchall()
+        finally:
+            con.close()
+    with analytics_store.span(start, end) as conn:
+        return conn.execute(sql, [analytics_store.format_timestamp(start), analytics_store.format_timestamp(end)] + params).fetchall()
+
+
+def _engine() -> str:
+    return "duckdb" if HAS_DUCKDB else "sqlite"
+
+
+def _event_filter(event_type: Optional[str], params: list) -> str:
+    if event_type:
+        params.append(event_type)
+        return " AND event_type = ?"
+    return ""
+
+
+def timeseries(start: datetime, end: datetime, bucket: str = "day", event_type: Optional[str] = None) -> List[dict]:
+    """Nombre d'événements et de sessions distinctes par intervalle de temps."""
+    params: list = []
+    sql = (f"SELECT {_bucket_sql(bucket, _engine())} AS bucket, SUM({_weight_sql(_engine())}), COUNT(DISTINCT session_id) "
+           f"FROM events WHERE timestamp BETWEEN ? AND ?{_event_filter(event_type, params)} "
+           f"GROUP BY bucket ORDER BY bucket")
+    return [{"bucket": str(bucket_value), "events": count, "sessions": sessions}
+            for bucket_value, count, sessions in _run(sql, start, end, params)]
+
+
+def breakdown(start: datetime, end: datetime, dimension: str, event_type: Optional[str] = None,
+              limit: int = 20) -> List[dict]:
+    """Répartition des événements par url, event_type ou clé de details."""
+    params: list = []
+    expression = dimension_sql(dimension, _engine())
+    sql = (f"SELECT {expression} AS value, SUM({_weight_sql(_engine())}) AS events FROM events "
+           f"WHERE timestamp BETWEEN ? AND ?{_event_filter(event_type, params)} "
+           f"GROUP BY value ORDER BY events DESC LIMIT ?")
+    return [{"value": value, "events": count} for value, count in _run(sql, start, end, params + [limit])]
+
+
+def percentiles(start: datetime, end: datetime, metric: str, quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+                event_type: Optional[str] = None) -> dict:
+    """Percentiles d'une valeur numérique de details (ex. details.load_ms)."""
+    params: list = []
+    expression = f"CAST({dimension_sql(metric, _engine())} AS DOUBLE)"
+    where = f"WHERE timestamp BETWEEN ? AND ?{_event_filter(event_type, params)} AND {expression} IS NOT NULL"
+    if HAS_DUCKDB:
+        rows = _run(f"SELECT COUNT(*), quantile_cont({expression}, {list(quantiles)}) FROM events {where}",
+                    start, end, params)
+        count, values = rows[0] if rows else (0, None)
+    else:
+        values_list = sorted(v for (v,) in _run(f"SELECT {expression} FROM events {where}", start, end, params))
+        count = len(values_list)
+        values = [_quantile(values_list, q) for q in quantiles] if values_list else None
+    return {
+        "metric": metric,
+        "count": count,
+        "percentiles": {f"p{q * 100:g}": v for q, v in zip(quantiles, values)} if values else {},
+    }
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """Interpolation linéaire, comme quantile_cont de DuckDB."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = q * (len(sorted_values) - 1)
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("backfill", help="reconstruire les fichiers Parquet depuis les partitions SQLite")
+    rebuild.add_argument("--start", type=date.fromisoformat, required=True)
+    rebuild.add_argument("--end", type=date.fromisoformat, default=datetime.utcnow().date())
+    commands.add_parser("compact", help="fusionner les fichiers des jours passés")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        print(f"✅ {backfill(args.start, args.end)} événement(s) écrit(s) en Parquet")
+    else:
+        print(f"✅ Jours compactés : {', '.join(compact()) or 'aucun'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Stockage des événements analytics, partitionné par mois.
+
+Les événements ne sont plus écrits dans la base principale mais dans un
+fichier SQLite par mois (analytics/events-2026-10.db). La base applicative
+reste petite, et une partition se sauvegarde, s'archive ou se supprime
+d'un bloc.
+
+Rétention (ANALYTICS_LIVE_MONTHS) : les partitions plus anciennes sont
+archivées en NDJSON compressé (analytics/archive/events-AAAA-MM.ndjson.gz)
+puis supprimées. Les partitions sont créées en auto_vacuum=INCREMENTAL :
+l'espace libéré est rendu par petites étapes, sans VACUUM bloquant.
+
+Les requêtes de l'admin passent par `span(start, end)`, qui attache les
+partitions concernées et expose une vue `events` unique.
+
+Usage (depuis backend/):
+    python analytics_store.py status
+    python analytics_store.py migrate    # déplacer analytics_events de la base principale
+    python analytics_store.py archive    # archiver les partitions hors rétention
+    python analytics_store.py vacuum
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+
+from config import settings
+
+DATA_DIR = Path(settings.ANALYTICS_DATA_DIR)
+ARCHIVE_DIR = DATA_DIR / "archive"
+COLUMNS = ("id", "session_id", "user_id", "event_type", "url", "details", "timestamp")
+
+# Limite de SQLite sur le nombre de bases attachées (SQLITE_MAX_ATTACHED) : span() procède par lots au-delà
+MAX_ATTACHED = 10
+VACUUM_PAGES = 2000
+MIGRATE_BATCH_SIZE = 5000
+
+_PARTITION_RE = re.compile(r"^events-(\d{4}-\d{2})\.db$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT,
+    user_id INTEGER,
+    event_type TEXT,
+    url TEXT,
+    details TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS ix_events_type_timestamp ON events (event_type, timestamp);
+"""
+
+_connections: Dict[str, sqlite3.Connection] = {}
+_lock = threading.Lock()
+
+
+def partition_key(moment: datetime) -> str:
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def partition_path(key: str) -> Path:
+    return DATA_DIR / f"events-{key}.db"
+
+
+def format_timestamp(moment: datetime) -> str:
+    """Format texte triable, identique à celui de SQLAlchemy pour SQLite."""
+    return moment.isoformat(sep=" ")
+
+
+def _open(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+    # auto_vacuum doit être fixé avant la création de la première table
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _writer(key: str) -> sqlite3.Connection:
+    conn = _connections.get(key)
+    if conn is None:
+        conn = _connections[key] = _open(partition_path(key))
+    return conn
+
+
+def record(session_id: str, event_type: str, url: str, details: Optional[dict] = None,
+           user_id: Optional[int] = None, timestamp: Optional[datetime] = None):
+    """Enregistrer un événement dans la partition de son mois."""
+    record_many([(session_id, user_id, event_type, url, details, timestamp or datetime.utcnow())])
+
+
+def record_many(rows):
+    """Enregistrer des tuples (session_id, user_id, event_type, url, details, timestamp), une transaction par partition."""
+    by_partition: Dict[str, list] = {}
+    for session_id, user_id, event_type, url, details, moment in rows:
+        by_partition.setdefault(partition_key(moment), []).append((
+            session_id, user_id, event_type, url,
+            json.dumps(details, ensure_ascii=False) if details is not None else None,
+            format_timestamp(moment),
+        ))
+    with _lock:
+        for key, values in by_partition.items():
+            conn = _writer(key)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (session_id, user_id, event_type, url, details, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+
+
+def partitions() -> List[str]:
+    """Clés (AAAA-MM) des partitions présentes sur disque, de la plus ancienne à la plus récente."""
+    if not DATA_DIR.exists():
+        return []
+    return sorted(m.group(1) for m in (_PARTITION_RE.match(p.name) for p in DATA_DIR.iterdir()) if m)
+
+
+def live_cutoff(today: Optional[date] = None) -> str:
+    """Plus ancienne partition conservée : le mois courant et les ANALYTICS_LIVE_MONTHS précédents."""
+    today = today or datetime.utcnow().date()
+    index = today.year * 12 + today.month - 1 - settings.ANALYTICS_LIVE_MONTHS
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+@contextmanager
+def span(start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Connexion en lecture où `events` réunit les partitions couvrant [start, end].
+    Sans borne, toutes les partitions vivantes. Jusqu'à MAX_ATTACHED partitions,
+    c'est une vue UNION ALL ; au-delà, les événements de la période sont copiés
+    dans une table temporaire, MAX_ATTACHED partitions attachées à la fois.
+    """
+    keys = [key for key in partitions()
+            if (start is None or key >= partition_key(start)) and (end is None or key <= partition_key(end))]
+    conn = sqlite3.connect(":memory:")
+    try:
+        if len(keys) <= MAX_ATTACHED:
+            selects = []
+            for i, key in enumerate(keys):
+                conn.execute(f"ATTACH DATABASE ? AS p{i}", (str(partition_path(key)),))
+                selects.append(f"SELECT * FROM p{i}.events")
+            if not selects:
+                selects.append("SELECT " + ", ".join(f"NULL AS {c}" for c in COLUMNS) + " WHERE 0")
+            conn.execute("CREATE TEMP VIEW events AS " + " UNION ALL ".join(selects))
+        else:
+            conn.execute("CREATE TEMP TABLE events AS SELECT " + ", ".join(f"NULL AS {c}" for c in COLUMNS) + " WHERE 0")
+            where, params = " WHERE 1", []
+            if start:
+                where, params = where + " AND timestamp >= ?", params + [format_timestamp(start)]
+            if end:
+                where, params = where + " AND timestamp <= ?", params + [format_timestamp(end)]
+            for offset in range(0, len(keys), MAX_ATTACHED):
+                chunk = keys[offset:offset + MAX_ATTACHED]
+                for i, key in enumerate(chunk):
+                    conn.execute(f"ATTACH DATABASE ? AS p{i}", (str(partition_path(key)),))
+                for i in range(len(chunk)):
+                    conn.execute(f"INSERT INTO temp.events SELECT * FROM p{i}.events{where}", params)
+                conn.commit()
+                for i in range(len(chunk)):
+                    conn.execute(f"DETACH DATABASE p{i}")
+        yield conn
+    finally:
+        conn.close()
+
+
+def iter_events(start: Optional[datetime] = None, end: Optional[datetime] = None, batch_size: int = 1000):
+    """Parcourir les événements de [start, end] par lots, partition après partition (exports)."""
+    for key in partitions():
+        if (start and key < partition_key(start)) or (end and key > partition_key(end)):
+            continue
+        conn = sqlite3.connect(str(partition_path(key)))
+        try:
+            sql, params = "SELECT " + ", ".join(COLUMNS) + " FROM events WHERE 1", []
+            if start:
+                sql, params = sql + " AND timestamp >= ?", params + [format_timestamp(start)]
+            if end:
+                sql, params = sql + " AND timestamp <= ?", params + [format_timestamp(end)]
+            cursor = conn.execute(sql + " ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[:5] + (json.loads(row[5]) if row[5] else None, datetime.fromisoformat(row[6]))
+        finally:
+            conn.close()
+
+
+def _close(key: str):
+    with _lock:
+        conn = _connections.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+
+def archive_partition(key: str) -> Path:
+    """Écrire la partition en NDJSON gzip (écriture atomique), puis supprimer ses fichiers SQLite."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    target = ARCHIVE_DIR / f"events-{key}.ndjson.gz"
+    tmp = target.with_name(target.name + ".tmp")
+    _close(key)
+    conn = sqlite3.connect(str(partition_path(key)))
+    try:
+        cursor = conn.execute("SELECT " + ", ".join(COLUMNS) + " FROM events ORDER BY id")
+        with gzip.open(tmp, "wb", compresslevel=6) as out:
+            while True:
+                rows = cursor.fetchmany(MIGRATE_BATCH_SIZE)
+                if not rows:
+                    break
+                out.write(b"".join(orjson.dumps({
+                    **dict(zip(COLUMNS, row)), "details": json.loads(row[5]) if row[5] else None
+                }) + b"\n" for row in rows))
+    finally:
+        conn.close()
+    os.replace(tmp, target)
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(partition_path(key)) + suffix).unlink(missing_ok=True)
+    return target
+
+
+def archive_expired() -> List[str]:
+    """Archiver toutes les partitions antérieures à la fenêtre de rétention."""
+    cutoff = live_cutoff()
+    expired = [key for key in partitions() if key < cutoff]
+    for key in expired:
+        archive_partition(key)
+    return expired
+
+
+def vacuum(pages: int = VACUUM_PAGES) -> Dict[str, int]:
+    """Rendre au plus `pages` pages libres par partition (PRAGMA incremental_vacuum)."""
+    freed = {}
+    for key in partitions():
+        with _lock:
+            conn = _writer(key)
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if before:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+                freed[key] = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return freed
+
+
+def migrate_legacy(batch_size: int = MIGRATE_BATCH_SIZE) -> int:
+    """
+    Déplacer la table analytics_events de la base principale vers les partitions,
+    par lots (copie puis suppression du lot), sans verrouiller la base longtemps.
+    """
+    from sqlalchemy import text
+    from database import engine
+
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, session_id, user_id, event_type, url, details, timestamp "
+                "FROM analytics_events ORDER BY id LIMIT :limit"
+            ), {"limit": batch_size}).fetchall()
+            if not rows:
+                break
+            record_many([(
+                row.session_id, row.user_id, row.event_type, row.url,
+                json.loads(row.details) if isinstance(row.details, str) else row.details,
+                row.timestamp if isinstance(row.timestamp, datetime) else datetime.fromisoformat(str(row.timestamp)),
+            ) for row in rows])
+            conn.execute(text("DELETE FROM analytics_events WHERE id <= :last"), {"last": rows[-1].id})
+        moved += len(rows)
+    if moved and engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+                conn.execute(text("PRAGMA incremental_vacuum"))
+            else:
+                print("La base principale n'est pas en auto_vacuum=INCREMENTAL : un VACUUM ponctuel rendra l'espace libéré.")
+    return moved
+
+
+def status() -> List[dict]:
+    cutoff = live_cutoff()
+    result = []
+    for key in partitions():
+        path = partition_path(key)
+        conn = sqlite3.connect(str(path))
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        result.append({"partition": key, "events": count, "bytes": path.stat().st_size,
+                       "free_pages": free, "expired": key < cutoff})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "migrate", "archive", "vacuum"])
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(f"{'partition':<10} {'événements':>11} {'Ko':>10} {'pages libres':>13}")
+        for row in status():
+            print(f"{row['partition']:<10} {row['events']:>11} {row['bytes'] / 1024:>10.0f} {row['free_pages']:>13}"
+                  + ("  (à archiver)" if row["expired"] else ""))
+    elif args.command == "migrate":
+        print(f"✅ {migrate_legacy()} événement(s) déplacé(s) vers {DATA_DIR}")
+    elif args.command == "archive":
+        print(f"✅ Partitions archivées : {', '.join(archive_expired()) or 'aucune'}")
+    else:
+        print(f"✅ Pages rendues : {vacuum() or 'aucune'}")
+
+
+if __name__ == "__main__":
+    main()
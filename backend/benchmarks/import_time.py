@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Mesure du coût d'import de l'API (python -X importtime).
+
+Usage (depuis backend/):
+    python benchmarks/import_time.py                # mesure et affiche le top 15
+    python benchmarks/import_time.py --runs 5       # médiane sur 5 démarrages
+    python benchmarks/import_time.py --save         # enregistre la référence
+    python benchmarks/import_time.py --check 10     # échoue si >10% plus lent que la référence
+
+La référence (import_time_baseline.json, versionnée) garde un total par module :
+--module analytics_olap --save n'écrase pas celle de main.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / "import_time_baseline.json"
+
+
+def measure(module: str):
+    """Retourne (total en µs, {module de premier niveau: cumul en µs})."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Import de {module} impossible:\n{result.stderr[-2000:]}")
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        top = name.strip().split(".")[0]
+        # Le cumul d'un paquet racine inclut ses sous-modules : on garde le max
+        packages[top] = max(packages.get(top, 0), int(cumulative_us))
+    total = packages.get(module.split(".")[0], sum(packages.values()))
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", action="store_true", help="enregistrer le résultat comme référence")
+    parser.add_argument("--check", type=float, metavar="PCT", help="tolérance de régression en %%")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    total = int(statistics.median(run[0] for run in runs))
+    packages = runs[-1][1]
+
+    print(f"Import de '{args.module}': {total / 1000:.1f} ms (médiane sur {args.runs})")
+    for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<30} {us / 1000:8.1f} ms")
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if args.save:
+        baselines[args.module] = total
+        BASELINE_FILE.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+        print(f"Référence de '{args.module}' enregistrée dans {BASELINE_FILE.name}")
+
+    if args.check is not None:
+        if args.module not in baselines:
+            sys.exit(f"Aucune référence pour '{args.module}' : lancez d'abord avec --save")
+        baseline = baselines[args.module]
+        delta = (total - baseline) / baseline * 100
+        print(f"Référence: {baseline / 1000:.1f} ms ({delta:+.1f}%)")
+        if delta > args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
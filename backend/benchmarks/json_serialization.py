@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark : coût de sérialisation d'une liste d'articles par requête.
+
+Compare le chemin par défaut de FastAPI (validation Pydantic du response_model,
+jsonable_encoder puis json.dumps) au chemin direct utilisé par les endpoints de
+liste (lignes SQLAlchemy -> dicts -> orjson).
+
+Usage (depuis backend/):
+    python benchmarks/json_serialization.py --items 20 100 --repeat 2000
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+class AuthorOut(BaseModel):
+    id: int
+    full_name: str
+
+
+class BlogPostOut(BaseModel):
+    id: int
+    title: str
+    slug: str
+    content: str
+    is_published: bool
+    created_at: datetime
+    updated_at: datetime
+    author: AuthorOut
+
+
+def make_rows(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [{
+        "id": i,
+        "title": f"Article numéro {i}",
+        "slug": f"article-numero-{i}",
+        "content": "<p>" + "Lorem ipsum dolor sit amet. " * 60 + "</p>",
+        "is_published": True,
+        "created_at": now - timedelta(days=i),
+        "updated_at": now,
+        "author": {"id": 1, "full_name": "Administrateur Vulsoft"},
+    } for i in range(count)]
+
+
+def default_path(rows):
+    """response_model : validation, jsonable_encoder, json.dumps (JSONResponse.render)."""
+    models = [BlogPostOut(**row) for row in rows]
+    return json.dumps(jsonable_encoder(models), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def direct_path(rows):
+    """Endpoints optimisés : dicts construits depuis les colonnes, sérialisés par orjson."""
+    return orjson.dumps(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'articles':>8} {'défaut µs':>12} {'orjson µs':>12} {'gain':>7}")
+    for count in args.items:
+        rows = make_rows(count)
+        assert json.loads(default_path(rows)) == json.loads(direct_path(rows))
+        default = min(timeit.repeat(lambda: default_path(rows), number=args.repeat, repeat=3)) / args.repeat
+        direct = min(timeit.repeat(lambda: direct_path(rows), number=args.repeat, repeat=3)) / args.repeat
+        print(f"{count:>8} {default * 1e6:>12.1f} {direct * 1e6:>12.1f} {default / direct:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
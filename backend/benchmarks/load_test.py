@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test de charge : requêtes/seconde en fonction du nombre de workers.
+
+Lance start.py pour chaque nombre de workers demandé, attend /health, envoie
+des requêtes HTTP/1.1 keep-alive pendant une durée fixe puis arrête le serveur.
+
+Usage (depuis backend/):
+    python benchmarks/load_test.py --workers 1 2 4 --path /health --duration 10
+"""
+
+import argparse
+import asyncio
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+async def client(host: str, port: int, path: str, deadline: float, latencies: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+    errors = 0
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            headers = await reader.readuntil(b"\r\n\r\n")
+            status = int(headers.split(b" ", 2)[1])
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if status >= 400:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+    return errors
+
+
+async def run_load(host, port, path, concurrency, duration):
+    latencies = []
+    deadline = time.monotonic() + duration
+    errors = await asyncio.gather(*(client(host, port, path, deadline, latencies) for _ in range(concurrency)))
+    return latencies, sum(errors)
+
+
+def wait_healthy(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("Le serveur n'est pas devenu disponible")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'erreurs':>8}")
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "start.py", "--port", str(args.port), "--host", "127.0.0.1",
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_healthy(args.port)
+            latencies, errors = asyncio.run(run_load("127.0.0.1", args.port, args.path, args.concurrency, args.duration))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        rps = len(latencies) / args.duration
+        print(f"{workers:>8} {rps:>10.0f} {percentile(latencies, 50) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Octets et latence par chargement de page pour le site statique.
+
+Pour chaque page HTML, additionne la page et les css/js/images/polices qu'elle
+référence, sans compression puis avec les variantes .gz / .br de dist/.
+Avec --url, charge aussi chaque page et ses ressources sur un serveur lancé
+(premier chargement puis revalidation avec les ETag reçus).
+
+Usage (depuis backend/, après python static_assets.py):
+    python benchmarks/static_bytes.py
+    python benchmarks/static_bytes.py --url http://localhost:8002 --pages index.html blog.html
+"""
+
+import argparse
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from static_assets import DIST_DIR, _REFERENCE_RE  # noqa: E402
+
+
+def page_assets(dist: Path, page: str):
+    html = (dist / page).read_text(encoding="utf-8", errors="ignore")
+    assets = {page}
+    for match in _REFERENCE_RE.finditer(html):
+        if (dist / match.group("path")).is_file():
+            assets.add(match.group("path"))
+    return sorted(assets)
+
+
+def encoded_size(path: Path, suffix: str) -> int:
+    variant = path.with_name(path.name + suffix)
+    return variant.stat().st_size if variant.exists() else path.stat().st_size
+
+
+def fetch(url: str, etag: str = None):
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "br, gzip"})
+    if etag:
+        request.add_header("If-None-Match", etag)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            return response.status, len(body), response.headers.get("etag"), time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, 0, etag, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", type=Path, default=DIST_DIR)
+    parser.add_argument("--pages", nargs="*")
+    parser.add_argument("--url", help="URL d'un serveur lancé pour mesurer la latence")
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(path.name for path in args.dist.glob("*.html"))
+    print(f"{'page':<24} {'fichiers':>8} {'brut Ko':>9} {'gzip Ko':>9} {'br Ko':>9}")
+    totals = [0, 0, 0]
+    for page in pages:
+        assets = page_assets(args.dist, page)
+        raw = sum((args.dist / a).stat().st_size for a in assets)
+        gz = sum(encoded_size(args.dist / a, ".gz") for a in assets)
+        br = sum(encoded_size(args.dist / a, ".br") for a in assets)
+        totals = [totals[0] + raw, totals[1] + gz, totals[2] + br]
+        print(f"{page:<24} {len(assets):>8} {raw / 1024:>9.1f} {gz / 1024:>9.1f} {br / 1024:>9.1f}")
+    print(f"{'TOTAL':<24} {'':>8} {totals[0] / 1024:>9.1f} {totals[1] / 1024:>9.1f} {totals[2] / 1024:>9.1f}")
+
+    if not args.url:
+        return
+
+    print(f"\n{'page':<24} {'1er chargement ms':>18} {'Ko reçus':>9} {'revalidation ms':>16} {'304':>5}")
+    for page in pages:
+        assets = page_assets(args.dist, page)
+        first = [fetch(f"{args.url.rstrip('/')}/{a}") for a in assets]
+        again = [fetch(f"{args.url.rstrip('/')}/{a}", etag) for a, (_, _, etag, _) in zip(assets, first)]
+        print(f"{page:<24} {sum(r[3] for r in first) * 1000:>18.1f} {sum(r[1] for r in first) / 1024:>9.1f} "
+              f"{sum(r[3] for r in again) * 1000:>16.1f} {sum(1 for r in again if r[0] == 304):>5}")
+
+
+if __name__ == "__main__":
+    main()
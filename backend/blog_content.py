@@ -0,0 +1,196 @@
+"""
+Champs dérivés des articles du blog, calculés à l'écriture.
+
+`derive(content)` transforme le contenu saisi (Markdown, HTML accepté) en :
+    - content_html : HTML nettoyé (liste blanche de balises et d'attributs,
+      liens http(s)/mailto/relatifs seulement, ancres sur les titres) ;
+    - excerpt : début du texte, coupé sur un mot ;
+    - word_count et reading_time (minutes, WORDS_PER_MINUTE) ;
+    - toc : titres h2/h3 [{"level", "id", "text"}].
+
+Les routes du blog les enregistrent en base : les lectures ne recalculent rien
+et les listes renvoient l'extrait au lieu du contenu complet.
+"""
+
+import html
+import math
+import re
+import unicodedata
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+try:
+    import markdown
+except ImportError:  # markdown est optionnel : paragraphes en texte brut
+    markdown = None
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 160
+
+ALLOWED_TAGS = {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "strong", "b", "em", "i", "u", "s", "del",
+    "sub", "sup", "mark", "small", "a", "img", "ul", "ol", "li", "blockquote", "code", "pre", "kbd",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "figure", "figcaption", "dl", "dt", "dd", "span", "div",
+}
+VOID_TAGS = {"br", "hr", "img"}
+INLINE_TAGS = {"strong", "b", "em", "i", "u", "s", "del", "sub", "sup", "mark", "small", "a", "code", "kbd", "span"}
+# Balises retirées avec leur contenu
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template", "svg", "math", "form"}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "th": {"colspan", "rowspan", "align"},
+    "td": {"colspan", "rowspan", "align"},
+    "code": {"class"},
+    "ol": {"start"},
+}
+SAFE_SCHEMES = ("http:", "https:", "mailto:")
+TOC_LEVELS = {"h2": 2, "h3": 3}
+# Fermées implicitement par une balise identique (<li>a<li>b)
+SELF_CLOSING_SIBLINGS = {"p", "li", "dt", "dd", "tr", "td", "th"}
+
+_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r"<[a-zA-Z][^>]*>")
+_WORD_RE = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+def to_html(content: str) -> str:
+    """Markdown vers HTML (comme marked côté client), sans nettoyage."""
+    if markdown is not None:
+        return markdown.markdown(content, extensions=["extra", "sane_lists"])
+    if _TAG_RE.search(content):
+        # Contenu déjà en HTML : il sera nettoyé tel quel
+        return content
+    return "".join(f"<p>{html.escape(block).replace(chr(10), '<br>')}</p>"
+                   for block in re.split(r"\n\s*\n", content.strip()))
+
+
+def anchor(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9]+", "-", normalized).strip("-") or "section"
+
+
+def _safe_url(value: str) -> bool:
+    # Les navigateurs ignorent les caractères de contrôle et espaces dans le schéma
+    compact = re.sub(r"[\x00-\x20]+", "", html.unescape(value)).lower()
+    return not _SCHEME_RE.match(compact) or compact.startswith(SAFE_SCHEMES)
+
+
+class Sanitizer(HTMLParser):
+    """Réécrit le HTML en ne gardant que la liste blanche ; collecte texte et titres au passage."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.text: List[str] = []
+        self.toc: List[Dict] = []
+        self.open: List[str] = []
+        self.dropping = 0
+        self.heading: Optional[dict] = None
+        self.anchors: Dict[str, int] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        if tag in SELF_CLOSING_SIBLINGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+        if tag not in INLINE_TAGS:
+            # Fin de bloc : les mots de part et d'autre ne se touchent pas dans le texte
+            self.text.append(" ")
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in ("href", "src") and not _safe_url(value):
+                continue
+            kept.append((name, value))
+        if tag == "a" and any(name == "href" and value.startswith(("http:", "https:")) for name, value in kept):
+            kept.append(("rel", "noopener nofollow"))
+        if tag in TOC_LEVELS:
+            self.heading = {"tag": tag, "index": len(self.out), "text": []}
+        self.out.append(f"<{tag}" + "".join(f' {name}="{html.escape(value)}"' for name, value in kept) + ">")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            # <svg/> n'a pas de contenu ni de balise fermante : rien à ignorer ensuite
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        if tag not in INLINE_TAGS:
+            self.text.append(" ")
+        # Fermer aussi les balises laissées ouvertes à l'intérieur
+        while self.open:
+            current = self.open.pop()
+            self.out.append(f"</{current}>")
+            if current == tag:
+                break
+        if self.heading is not None and self.heading["tag"] == tag:
+            self._finish_heading()
+
+    def _finish_heading(self):
+        text = _SPACE_RE.sub(" ", "".join(self.heading["text"])).strip()
+        if text:
+            base = anchor(text)
+            count = self.anchors.get(base, 0)
+            self.anchors[base] = count + 1
+            identifier = base if not count else f"{base}-{count + 1}"
+            self.out[self.heading["index"]] = self.out[self.heading["index"]][:-1] + f' id="{identifier}">'
+            self.toc.append({"level": TOC_LEVELS[self.heading["tag"]], "id": identifier, "text": text})
+        self.heading = None
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.out.append(html.escape(data, quote=False))
+        self.text.append(data)
+        if self.heading is not None:
+            self.heading["text"].append(data)
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.out.append(f"</{self.open.pop()}>")
+
+
+def sanitize(raw_html: str) -> Sanitizer:
+    parser = Sanitizer()
+    parser.feed(raw_html)
+    parser.close()
+    return parser
+
+
+def excerpt_of(text: str, length: int = EXCERPT_LENGTH) -> str:
+    text = _SPACE_RE.sub(" ", text).strip()
+    return text if len(text) <= length else text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def derive(content: Optional[str]) -> dict:
+    """Valeurs des colonnes dérivées d'un article, à partir de son contenu."""
+    if not content or not content.strip():
+        return {"content_html": "", "excerpt": "", "word_count": 0, "reading_time": 0, "toc": []}
+    parser = sanitize(to_html(content))
+    text = "".join(parser.text)
+    words = len(_WORD_RE.findall(text))
+    return {
+        "content_html": "".join(parser.out),
+        "excerpt": excerpt_of(text),
+        "word_count": words,
+        "reading_time": max(1, math.ceil(words / WORDS_PER_MINUTE)),
+        "toc": parser.toc,
+    }
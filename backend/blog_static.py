@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Génération statique du blog.
+
+Les articles publiés sont rendus en HTML à partir des gabarits du site
+(blog-post.html, blog.html), avec les flux et le sitemap du blog :
+
+    generated/blog/<slug>.html   page de l'article
+    generated/blog/index.html    liste des articles
+    generated/blog/feed.xml      RSS 2.0
+    generated/blog/atom.xml      Atom
+    generated/blog/sitemap.xml   sitemap des articles
+
+Le répertoire est servi sous /blog par PrecompressedStaticFiles (variantes
+.br/.gz, ETag). La génération est incrémentale : les événements PostPublished
+/ PostDeleted marquent les articles modifiés, rendus ensemble après un court
+délai (un import de 100 articles ne régénère la liste qu'une fois).
+
+Usage (depuis backend/):
+    python blog_static.py build
+"""
+
+import argparse
+import asyncio
+import html
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+from xml.sax.saxutils import escape as xml_escape
+
+from config import settings
+from database import SessionLocal, BlogPost, User
+from static_assets import SITE_ROOT, DIST_DIR, compress_file
+import events
+import blog_content
+
+OUTPUT_DIR = Path(settings.BLOG_STATIC_DIR)
+# Regroupe les événements d'un import ou d'une série de modifications
+RENDER_DELAY_SECONDS = 0.5
+FEED_SIZE = 20
+
+_MONTHS = ("janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+           "août", "septembre", "octobre", "novembre", "décembre")
+
+_dirty: Set[str] = set()
+_render_task: Optional[asyncio.Task] = None
+_render_lock = threading.Lock()
+
+
+def _template(name: str) -> str:
+    # Les gabarits de dist/ référencent déjà les fichiers avec empreinte
+    root = DIST_DIR if (DIST_DIR / name).exists() else SITE_ROOT
+    page = (root / name).read_text(encoding="utf-8")
+    # Sous /blog/<slug>.html, i18n.js charge le bundle de traduction du gabarit
+    return re.sub(r"<html\b", f'<html data-i18n-page="{Path(name).stem}"', page, count=1)
+
+
+def french_date(moment: datetime) -> str:
+    return f"{moment.day} {_MONTHS[moment.month - 1]} {moment.year}"
+
+
+def post_url(slug: str) -> str:
+    return f"{settings.SITE_URL.rstrip('/')}/blog/{slug}.html"
+
+
+def _with_head(page: str, title: str, description: str, canonical: str) -> str:
+    # Les pages sont servies sous /blog/ : les liens relatifs du gabarit partent de la racine
+    head = (f'<title>{html.escape(title)}</title>\n    <base href="/">\n'
+            f'    <meta name="description" content="{html.escape(description)}">\n'
+            f'    <link rel="canonical" href="{canonical}">\n'
+            f'    <link rel="alternate" type="application/rss+xml" title="Vulsoft Blog" href="/blog/feed.xml">\n'
+            f'    <link rel="alternate" type="application/atom+xml" title="Vulsoft Blog" href="/blog/atom.xml">')
+    return re.sub(r"<title>.*?</title>", lambda _: head, page, count=1, flags=re.S)
+
+
+def _without_scripts(page: str, names: Iterable[str]) -> str:
+    """Retirer les scripts qui rendraient la page côté client."""
+    for name in names:
+        page = re.sub(rf'\s*<script src="[^"]*{re.escape(name)}[^"]*"[^>]*></script>', "", page)
+    return page
+
+
+def _toc(entries) -> str:
+    if not entries or len(entries) < 2:
+        return ""
+    items = "".join(f'<li class="toc-level-{entry["level"]}"><a href="#{html.escape(entry["id"])}">{html.escape(entry["text"])}</a></li>'
+                    for entry in entries)
+    return f'<nav class="post-toc" aria-label="Sommaire"><ul>{items}</ul></nav>'
+
+
+def render_post_page(post: BlogPost, author_name: str) -> str:
+    initials = "".join(part[0] for part in author_name.split() if part).upper()
+    derived = blog_content.derive(post.content) if post.content_html is None else {
+        "content_html": post.content_html, "excerpt": post.excerpt, "reading_time": post.reading_time, "toc": post.toc,
+    }
+    article = f"""<main id="post-container" class="post-container">
+        <article class="post-article">
+            <header class="post-header">
+                <h1 class="post-title">{html.escape(post.title)}</h1>
+                <div class="post-meta">
+                    <div class="post-author">
+                        <div class="post-author-avatar">{html.escape(initials)}</div>
+                        <span>Par {html.escape(author_name)}</span>
+                    </div>
+                    <time datetime="{post.created_at.isoformat()}">Publié le {french_date(post.created_at)}</time>
+                    <span class="post-reading-time">{derived["reading_time"] or 1} min de lecture</span>
+                </div>
+            </header>
+
+            <div class="post-featured-image" style="background-image: url('https://placehold.co/1200x600/1a1a1a/ffffff?text=Vulsoft')"></div>
+
+            {_toc(derived["toc"])}
+
+            <div class="post-content">
+                {derived["content_html"]}
+            </div>
+        </article>
+    </main>"""
+    page = _with_head(_template("blog-post.html"), f"{post.title} - Vulsoft Blog",
+                      derived["excerpt"] or "", post_url(post.slug))
+    page = re.sub(r'<main id="post-container".*?</main>', lambda _: article, page, count=1, flags=re.S)
+    return _without_scripts(page, ("blog-post.js", "marked.min.js"))
+
+
+def render_index_page(posts: List[tuple]) -> str:
+    cards = "".join(f"""
+            <a class="blog-card" href="/blog/{slug}.html">
+                <div class="blog-card-image"><img src="https://source.unsplash.com/600x400/?technology&sig={post_id}" alt="{html.escape(title)}" loading="lazy"></div>
+                <div class="blog-card-content">
+                    <h2 class="blog-card-title">{html.escape(title)}</h2>
+                    <p class="blog-card-excerpt">{html.escape(excerpt or '')}</p>
+                    <div class="blog-card-meta">
+                        <div class="blog-card-author"><span>👤</span><span>{html.escape(author or 'Équipe Vulsoft')}</span></div>
+                        <div class="blog-card-date">{french_date(created_at)}</div>
+                    </div>
+                </div>
+            </a>""" for post_id, slug, title, excerpt, created_at, updated_at, author in posts)
+    page = _with_head(_template("blog.html"), "Blog - Vulsoft", "Articles et actualités de Vulsoft",
+                      f"{settings.SITE_URL.rstrip('/')}/blog/")
+    page = re.sub(r'\s*<div id="blog-loading".*?</p>\s*</div>', "", page, count=1, flags=re.S)
+    page = re.sub(r'<div id="blog-grid" class="blog-grid" style="display: none;">.*?</div>',
+                  lambda _: f'<div id="blog-grid" class="blog-grid">{cards}\n        </div>', page, count=1, flags=re.S)
+    if posts:
+        page = re.sub(r'\s*<div id="blog-empty".*?</p>\s*</div>', "", page, count=1, flags=re.S)
+    else:
+        page = page.replace('<div id="blog-empty" class="blog-empty" style="display: none;">',
+                            '<div id="blog-empty" class="blog-empty">', 1)
+    return _without_scripts(page, ("js/blog.js",))
+
+
+def render_rss(posts: List[tuple]) -> str:
+    base = settings.SITE_URL.rstrip("/")
+    items = "".join(f"""
+    <item>
+      <title>{xml_escape(title)}</title>
+      <link>{post_url(slug)}</link>
+      <guid isPermaLink="true">{post_url(slug)}</guid>
+      <pubDate>{format_datetime(created_at.replace(tzinfo=timezone.utc), usegmt=True)}</pubDate>
+      <description>{xml_escape(excerpt or '')}</description>
+    </item>""" for _, slug, title, excerpt, created_at, _, _ in posts[:FEED_SIZE])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+  <channel>
+    <title>Vulsoft Blog</title>
+    <link>{base}/blog/</link>
+    <description>Articles et actualités de Vulsoft</description>
+    <language>fr</language>
+    <atom:link href="{base}/blog/feed.xml" rel="self" type="application/rss+xml"/>{items}
+  </channel>
+</rss>
+"""
+
+
+def render_atom(posts: List[tuple]) -> str:
+    base = settings.SITE_URL.rstrip("/")
+    updated = max((row[5] or row[4] for row in posts), default=datetime.utcnow())
+    entries = "".join(f"""
+  <entry>
+    <title>{xml_escape(title)}</title>
+    <link href="{post_url(slug)}"/>
+    <id>{post_url(slug)}</id>
+    <published>{created_at.isoformat()}Z</published>
+    <updated>{(updated_at or created_at).isoformat()}Z</updated>
+    <author><name>{xml_escape(author or 'Équipe Vulsoft')}</name></author>
+    <summary>{xml_escape(excerpt or '')}</summary>
+  </entry>""" for _, slug, title, excerpt, created_at, updated_at, author in posts[:FEED_SIZE])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="fr">
+  <title>Vulsoft Blog</title>
+  <link href="{base}/blog/"/>
+  <link href="{base}/blog/atom.xml" rel="self"/>
+  <id>{base}/blog/</id>
+  <updated>{updated.isoformat()}Z</updated>{entries}
+</feed>
+"""
+
+
+def render_sitemap(posts: List[tuple]) -> str:
+    base = settings.SITE_URL.rstrip("/")
+    urls = "".join(f"""
+  <url>
+    <loc>{post_url(slug)}</loc>
+    <lastmod>{(updated_at or created_at).date().isoformat()}</lastmod>
+    <changefreq>monthly</changefreq>
+    <priority>0.6</priority>
+  </url>""" for _, slug, _, _, created_at, updated_at, _ in posts)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url>
+    <loc>{base}/blog/</loc>
+    <changefreq>weekly</changefreq>
+    <priority>0.8</priority>
+  </url>{urls}
+</urlset>
+"""
+
+
+def _write(name: str, content: str):
+    """Écriture atomique, puis variantes précompressées (les anciennes sont retirées d'abord)."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    target = OUTPUT_DIR / name
+    for suffix in (".gz", ".br"):
+        target.with_name(target.name + suffix).unlink(missing_ok=True)
+    # Nom temporaire propre à chaque écriture : deux rendus ne partagent jamais un fichier
+    fd, tmp = tempfile.mkstemp(dir=OUTPUT_DIR, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        # mkstemp crée en 0600 : les pages sont servies aussi par nginx
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    compress_file(target)
+
+
+def _remove(name: str):
+    for suffix in ("", ".gz", ".br"):
+        (OUTPUT_DIR / (name + suffix)).unlink(missing_ok=True)
+
+
+def _published(db) -> List[tuple]:
+    return db.query(
+        BlogPost.id, BlogPost.slug, BlogPost.title, BlogPost.excerpt,
+        BlogPost.created_at, BlogPost.updated_at, User.full_name
+    ).outerjoin(User, BlogPost.author_id == User.id).filter(
+        BlogPost.is_published == True
+    ).order_by(BlogPost.created_at.desc()).all()
+
+
+def render(slugs: Optional[Iterable[str]] = None) -> int:
+    """
+    Rendre les articles `slugs` (tous si None), puis la liste, les flux et le
+    sitemap. Les pages d'articles supprimés, dépubliés ou renommés sont retirées.
+    Les rendus d'un même processus ne se chevauchent pas.
+    """
+    with _render_lock:
+        return _render(slugs)
+
+
+def _render(slugs: Optional[Iterable[str]]) -> int:
+    db = SessionLocal()
+    try:
+        posts = _published(db)
+        published = {row.slug for row in posts}
+        wanted = published if slugs is None else published & set(slugs)
+        rendered = 0
+        if wanted:
+            for post, author in db.query(BlogPost, User.full_name).outerjoin(
+                User, BlogPost.author_id == User.id
+            ).filter(BlogPost.slug.in_(wanted)):
+                _write(f"{post.slug}.html", render_post_page(post, author or "Équipe Vulsoft"))
+                rendered += 1
+    finally:
+        db.close()
+
+    if OUTPUT_DIR.exists():
+        for path in OUTPUT_DIR.glob("*.html"):
+            if path.stem != "index" and path.stem not in published:
+                _remove(path.name)
+    _write("index.html", render_index_page(posts))
+    _write("feed.xml", render_rss(posts))
+    _write("atom.xml", render_atom(posts))
+    _write("sitemap.xml", render_sitemap(posts))
+    return rendered
+
+
+async def _render_later():
+    """Rendre les articles marqués, puis ceux marqués pendant ce rendu, jusqu'à ce qu'il n'en reste plus."""
+    global _render_task
+    from fastapi.concurrency import run_in_threadpool
+    try:
+        while _dirty:
+            await asyncio.sleep(RENDER_DELAY_SECONDS)
+            slugs = set(_dirty)
+            _dirty.clear()
+            try:
+                await run_in_threadpool(render, slugs)
+            except Exception as e:
+                print(f"Échec de la génération statique du blog: {e}")
+    finally:
+        # Effacé seulement une fois le dernier rendu terminé : jamais deux tâches à la fois
+        _render_task = None
+
+
+@events.bus.subscribe(events.PostPublished, events.PostDeleted, scope=events.LOCAL)
+async def on_post_event(event):
+    """Un seul worker écrit les fichiers (répertoire partagé) : scope LOCAL."""
+    global _render_task
+    _dirty.add(event.slug)
+    if _render_task is None:
+        _render_task = asyncio.create_task(_render_later())
+
+
+def ensure_built():
+    """Génération complète au démarrage si le répertoire est vide."""
+    if not (OUTPUT_DIR / "index.html").exists():
+        render()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+    print(f"✅ {render()} article(s) rendu(s) dans {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Compression des réponses de l'API (brotli / gzip).
+
+Ne compresse que les types texte (JSON, NDJSON, CSV, HTML...) au-delà d'une
+taille minimale, sauf les flux SSE (text/event-stream). Laisse passer les
+réponses déjà encodées (fichiers statiques précompressés) et compresse les
+réponses en streaming bloc par bloc.
+Le temps CPU de compression est renvoyé dans l'en-tête Server-Timing et
+cumulé dans `stats`.
+"""
+
+import time
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seulement
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+# Flux ouverts indéfiniment (SSE de /admin/stream) : chaque événement doit
+# partir aussitôt, sans passer par le tampon d'un compresseur
+EXCLUDED_TYPES = ("text/event-stream",)
+
+# Compteurs exposés à l'admin
+stats = {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0}
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Choisir br puis gzip parmi les encodages acceptés (q=0 exclu)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality == 0:
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        self.cpu = 0.0
+        self.bytes_in = 0
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        start = time.thread_time()
+        self.bytes_in += len(data)
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            out += self._compressor.finish() if final else self._compressor.flush()
+        else:
+            out = self._compressor.compress(data)
+            out += self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        self.cpu += time.thread_time() - start
+        return out
+
+
+class CompressionMiddleware:
+    """Middleware ASGI de compression sensible au Content-Type."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 content_types=COMPRESSIBLE_TYPES, excluded_types=EXCLUDED_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = content_types
+        self.excluded_types = excluded_types
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _Responder(self, encoding, send).send)
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+        self.bytes_out = 0
+
+    def _eligible(self, headers) -> bool:
+        content_type = ""
+        for key, value in headers:
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        return (content_type.startswith(self.middleware.content_types)
+                and not content_type.startswith(self.middleware.excluded_types))
+
+    def _encoded_headers(self, content_length: Optional[int], cpu: Optional[float]):
+        headers = [(k, v) for k, v in self.start_message["headers"] if k != b"content-length"]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        if cpu is not None:
+            headers.append((b"server-timing", f"compress;dur={cpu * 1000:.2f}".encode()))
+        return headers
+
+    def _record(self):
+        stats["responses"] += 1
+        stats["bytes_in"] += self.encoder.bytes_in
+        stats["bytes_out"] += self.bytes_out
+        stats["cpu_ms"] += self.encoder.cpu * 1000
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if not self._eligible(message.get("headers", [])):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            return await self.downstream(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Trop petit : le coût de la compression dépasse le gain
+                self.passthrough = True
+                await self.downstream(self.start_message)
+                return await self.downstream(message)
+
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            if not more_body:
+                compressed = self.encoder.compress(body, final=True)
+                self.bytes_out = len(compressed)
+                self.start_message["headers"] = self._encoded_headers(len(compressed), self.encoder.cpu)
+                self._record()
+                await self.downstream(self.start_message)
+                return await self.downstream({"type": "http.response.body", "body": compressed})
+
+            # Réponse en streaming : longueur inconnue, chaque bloc est vidé immédiatement
+            self.start_message["headers"] = self._encoded_headers(None, None)
+            await self.downstream(self.start_message)
+
+        chunk = self.encoder.compress(body, final=not more_body)
+        self.bytes_out += len(chunk)
+        if not more_body:
+            self._record()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # App settings
@@ -27,9 +27,26 @@ class Settings(BaseSettings):
     # OpenAI API Key
     OPENAI_API_KEY: str = "votre_clé_api_openai_ici"
 
+    # Chatbot : recherche locale (BM25) injectée dans le prompt
+    CHATBOT_MODEL: str = "gpt-3.5-turbo"
+    CHATBOT_MAX_TOKENS: int = 300
+    CHATBOT_HISTORY_MESSAGES: int = 6
+    CHATBOT_RAG_TOP_K: int = 3
+    CHATBOT_RAG_MAX_CHARS: int = 1500
+
     # Stripe Keys
     STRIPE_PUBLIC_KEY: str = "pk_test_VOTRE_CLE_PUBLIQUE"
     STRIPE_SECRET_KEY: str = "sk_test_VOTRE_CLE_SECRETE"
+    STRIPE_WEBHOOK_SECRET: str = ""
+    # URL d'un stripe-mock local pour les tests (ex: http://localhost:12111)
+    STRIPE_API_BASE: str = ""
+    # Durée pendant laquelle une intention non payée est réutilisée pour (utilisateur, cours)
+    STRIPE_INTENT_REUSE_MINUTES: int = 30
+    COURSE_PRICE_CACHE_SECONDS: int = 300
+    # Compteurs d'étiquettes servis aux filtres du blog et des projets
+    TAXONOMY_CACHE_SECONDS: int = 300
+    # Taille maximale d'une image de projet envoyée par l'admin
+    PROJECT_IMAGE_MAX_BYTES: int = 5 * 1024 * 1024
 
     # OAuth2 Google
     GOOGLE_CLIENT_ID: str = ""
@@ -39,6 +56,62 @@ class Settings(BaseSettings):
     GITHUB_CLIENT_ID: str = ""
     GITHUB_CLIENT_SECRET: str = ""
     
+    # Limitation de débit : "memory" ou "sqlite:///./rate_limit.db" (multi-workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORE: str = "memory"
+    # Adresses / réseaux dont X-Forwarded-For est cru (le reverse proxy) ; vide : jamais
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = []
+
+    # Compression des réponses de l'API
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Importer openai/stripe/qrcode... en tâche de fond après le démarrage
+    # plutôt qu'à la première requête qui en a besoin (désactivé par défaut :
+    # le préchargement annule le gain au démarrage à froid)
+    WARM_LAZY_MODULES: bool = False
+
+    # Bus d'événements : "" (un seul worker) ou "local" pour rediffuser
+    # les événements aux autres workers de la machine
+    EVENT_BUS_BROKER: str = ""
+    EVENT_BUS_SOCKET_DIR: str = "/tmp/vulsoft-events"
+
+    # File de tâches : en production, désactiver le worker intégré et lancer
+    # `python jobs.py worker` dans un processus séparé
+    JOBS_EMBEDDED_WORKER: bool = True
+    JOBS_EMBEDDED_QUEUES: str = "email,default"
+
+    # Analytics : une base SQLite par mois ; au-delà de ANALYTICS_LIVE_MONTHS
+    # mois précédents, les partitions sont archivées en NDJSON compressé
+    ANALYTICS_DATA_DIR: str = "./analytics"
+    ANALYTICS_LIVE_MONTHS: int = 3
+    # Copie colonnaire (Parquet, si duckdb est installé) pour les requêtes de l'admin
+    ANALYTICS_COLUMNAR_FLUSH_SECONDS: float = 5.0
+    ANALYTICS_COLUMNAR_RETENTION_DAYS: int = 400
+    # Compteurs probabilistes par jour (visiteurs uniques, pages et clics les plus fréquents)
+    ANALYTICS_SKETCH_RETENTION_DAYS: int = 730
+    # Pré-traitement à l'ingestion (voir ingestion.py). Taux d'échantillonnage par
+    # type d'événement, de préférence en 1/n (ex. {"scroll": 0.25}) ; absent = 1
+    ANALYTICS_SAMPLE_RATES: Dict[str, float] = {}
+    ANALYTICS_DEDUP_SECONDS: float = 2.0
+    ANALYTICS_SITE_HOSTS: List[str] = ["vulsoft.org", "localhost", "127.0.0.1"]
+    # Résumés de sessions et entonnoirs : étapes "type:motif" (voir sessionization.py)
+    ANALYTICS_SESSION_RETENTION_DAYS: int = 400
+    ANALYTICS_FUNNELS: Dict[str, List[str]] = {
+        "pricing_to_payment": ["pageview:/pricing*", "pageview:/payment*", "click:payment-submit"],
+        "contact": ["pageview:/contact*", "click:contact-submit"],
+    }
+
+    # Pages du blog générées (servies sous /blog) et URL publique du site
+    BLOG_STATIC_DIR: str = "./generated/blog"
+    # Bundles de traduction par page (i18n_bundles.py) ; replis résolus à la génération
+    I18N_BUNDLE_DIR: str = "./generated/i18n"
+    I18N_LOCALES: List[str] = ["fr", "en", "zh"]
+    I18N_DEFAULT_LOCALE: str = "fr"
+    I18N_FALLBACKS: Dict[str, List[str]] = {"en": ["fr"], "zh": ["en", "fr"]}
+    SITE_URL: str = "https://vulsoft.org"
+
     # 2FA
     TWO_FACTOR_ISSUER_NAME: str = "Vulsoft"
 
@@ -2,12 +2,29 @@
 """
 Script pour créer du contenu par défaut pour le blog
 Usage: python create_blog_content.py
+
+L'import est réservé aux administrateurs : le script utilise VULSOFT_ADMIN_TOKEN
+s'il est défini, sinon il se connecte avec VULSOFT_ADMIN_USERNAME /
+VULSOFT_ADMIN_PASSWORD (demandés au clavier s'ils sont absents).
 """
 
+import getpass
+import os
 import requests
 import json
 from datetime import datetime, timedelta
 
+def get_admin_token(api_root: str) -> str:
+    """Jeton Bearer d'un administrateur (variable d'environnement ou connexion)."""
+    token = os.getenv("VULSOFT_ADMIN_TOKEN")
+    if token:
+        return token
+    username = os.getenv("VULSOFT_ADMIN_USERNAME") or input("Nom d'utilisateur admin: ").strip()
+    password = os.getenv("VULSOFT_ADMIN_PASSWORD") or getpass.getpass("Mot de passe admin: ")
+    response = requests.post(f"{api_root}/auth/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
 def create_blog_posts():
     """Créer des articles de blog par défaut"""
     
@@ -214,31 +231,37 @@ async def create_user(user: User):
         }
     ]
     
-    api_base = "http://localhost:8002/api/blog"
+    api_root = "http://localhost:8002/api"
+    api_base = f"{api_root}/blog"
     
-    for i, post in enumerate(default_posts):
-        try:
-            print(f"📝 Création de l'article {i+1}: {post['title']}")
-            
-            response = requests.post(
-                f"{api_base}/posts",
-                headers={"Content-Type": "application/json"},
-                data=json.dumps(post)
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"   ✅ Article créé avec l'ID: {result['id']}")
-            else:
-                error_data = response.json() if response.headers.get('content-type') == 'application/json' else response.text
-                print(f"   ❌ Erreur: {error_data}")
-                
-        except requests.exceptions.ConnectionError:
-            print(f"   ❌ Impossible de se connecter au serveur API")
-            print("      Assurez-vous que le serveur est démarré avec: python start.py")
-            break
-        except Exception as e:
-            print(f"   ❌ Erreur: {e}")
+    try:
+        token = get_admin_token(api_root)
+        print(f"📝 Import de {len(default_posts)} articles en une requête")
+        
+        response = requests.post(
+            f"{api_base}/posts/import",
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+            data=json.dumps(default_posts)
+        )
+        
+        if response.status_code == 200:
+            for item in response.json()["results"]:
+                title = default_posts[item["index"]]["title"]
+                if item["success"]:
+                    print(f"   ✅ {title} -> {item['slug']}")
+                else:
+                    print(f"   ❌ {title}: {item['error']}")
+        else:
+            error_data = response.json() if response.headers.get('content-type') == 'application/json' else response.text
+            print(f"   ❌ Erreur: {error_data}")
+            
+    except requests.exceptions.HTTPError as e:
+        print(f"   ❌ Connexion administrateur refusée: {e}")
+    except requests.exceptions.ConnectionError:
+        print(f"   ❌ Impossible de se connecter au serveur API")
+        print("      Assurez-vous que le serveur est démarré avec: python start.py")
+    except Exception as e:
+        print(f"   ❌ Erreur: {e}")
     
     print("\n🎉 Création du contenu terminée !")
     print("🌐 Visitez http://localhost:8001/pages/blog.html pour voir le blog")
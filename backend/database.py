@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Float, Index, Table, UniqueConstraint
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -61,11 +61,47 @@ class BlogPost(Base):
     title = Column(String, index=True, nullable=False)
     slug = Column(String, unique=True, index=True, nullable=False)
     content = Column(Text, nullable=True)
+    # Dérivés du contenu à l'écriture (blog_content.derive)
+    content_html = Column(Text, nullable=True)
+    excerpt = Column(String, nullable=True)
+    word_count = Column(Integer, nullable=True)
+    reading_time = Column(Integer, nullable=True)
+    toc = Column(JSON, nullable=True)
     author_id = Column(Integer, ForeignKey("users.id"))
     is_published = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author = relationship("User", back_populates="posts")
+    # Écrites par taxonomy.set_labels (compteurs à jour)
+    tags = relationship("Tag", secondary="post_tags", viewonly=True, order_by="[Tag.kind, Tag.name]")
+
+
+class Tag(Base):
+    """Étiquette, technologie ou catégorie des articles et des projets (taxonomy.py)."""
+    __tablename__ = "tags"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # tag, technology, category
+    slug = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    # Articles publiés et projets portant l'étiquette
+    post_count = Column(Integer, default=0, nullable=False)
+    project_count = Column(Integer, default=0, nullable=False)
+    __table_args__ = (UniqueConstraint("kind", "slug", name="uq_tags_kind_slug"),)
+
+# Index inversés étiquette -> éléments (la clé primaire couvre élément -> étiquettes)
+post_tags = Table(
+    "post_tags", Base.metadata,
+    Column("post_id", Integer, ForeignKey("blog_posts.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_post_tags_tag", "tag_id", "post_id"),
+)
+
+project_tags = Table(
+    "project_tags", Base.metadata,
+    Column("project_id", Integer, ForeignKey("projects.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_project_tags_tag", "tag_id", "project_id"),
+)
 
 
 class ProjectImage(Base):
@@ -74,6 +110,7 @@ class ProjectImage(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     file_path = Column(String, nullable=False)
     is_primary = Column(Boolean, default=False)
+    position = Column(Integer, default=0)  # ordre dans la galerie
     created_at = Column(DateTime, default=datetime.utcnow)
     project = relationship("Project", back_populates="images")
 
@@ -88,6 +125,34 @@ class Project(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     images = relationship("ProjectImage", back_populates="project", cascade="all, delete-orphan")
+    tags = relationship("Tag", secondary="project_tags", viewonly=True, order_by="[Tag.kind, Tag.name]")
+
+class ProjectCard(Base):
+    """Modèle de lecture de la liste des projets, maintenu par project_cards.refresh."""
+    __tablename__ = "project_cards"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    title = Column(String)
+    description = Column(Text, nullable=True)
+    technology = Column(String, nullable=True)
+    client = Column(String, nullable=True)
+    status = Column(String)
+    primary_image_url = Column(String, nullable=True)
+    image_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    __table_args__ = (Index("ix_project_cards_status", "status", "project_id"),)
+
+class RelatedItem(Base):
+    """Voisins TF-IDF précalculés d'un article ou d'un projet (recommendations.py)."""
+    __tablename__ = "related_items"
+    id = Column(Integer, primary_key=True, index=True)
+    source_type = Column(String, nullable=False)  # post, project
+    source_id = Column(Integer, nullable=False)
+    target_type = Column(String, nullable=False)
+    target_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)
+    __table_args__ = (Index("ix_related_items_source", "source_type", "source_id", "rank"),)
 
 class AnalyticsEvent(Base):
     __tablename__ = "analytics_events"
@@ -97,4 +162,124 @@ class AnalyticsEvent(Base):
     event_type = Column(String, index=True) # e.g., 'pageview', 'click'
     url = Column(String)
     details = Column(JSON, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+class CoursePrice(Base):
+    __tablename__ = "course_prices"
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(String, unique=True, index=True, nullable=False)
+    amount = Column(Integer, nullable=False)  # en unités de la devise (GNF)
+    currency = Column(String, default="gnf")
+    is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PaymentIntentRecord(Base):
+    __tablename__ = "payment_intents"
+    id = Column(Integer, primary_key=True, index=True)
+    stripe_id = Column(String, unique=True, index=True, nullable=False)
+    client_secret = Column(String, nullable=False)
+    idempotency_key = Column(String, index=True, nullable=False)
+    customer_key = Column(String, index=True, nullable=False)  # "user:<id>" ou "anon"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    course_id = Column(String, index=True, nullable=False)
+    amount = Column(Integer, nullable=False)
+    currency = Column(String, default="gnf")
+    status = Column(String, default="requires_payment_method")
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class StripeEvent(Base):
+    """Journal des événements webhook Stripe : le payload brut n'est jamais modifié."""
+    __tablename__ = "stripe_events"
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, unique=True, index=True, nullable=False)
+    event_type = Column(String, index=True, nullable=False)
+    payload = Column(Text, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow)
+    # État de traitement
+    status = Column(String, default="pending", index=True)  # pending, processing, processed, failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+
+class CourseEnrollment(Base):
+    __tablename__ = "course_enrollments"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    course_id = Column(String, index=True, nullable=False)
+    payment_intent_id = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    """File de tâches de fond (emails, newsletter...) traitée par `python jobs.py worker`."""
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True, nullable=False)
+    queue = Column(String, default="default", index=True)
+    payload = Column(Text, nullable=False)
+    priority = Column(Integer, default=0, index=True)  # plus grand = plus prioritaire
+    status = Column(String, default="pending", index=True)  # pending, processing, done, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=5)
+    run_at = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+def add_missing_columns():
+    """
+    Ajouter les colonnes déclarées mais absentes des tables existantes
+    (create_all ne modifie pas une table déjà créée). Colonnes nullables seulement.
+    """
+    from sqlalchemy import inspect, text
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}'
+                    ))
+                    print(f"Colonne ajoutée : {table.name}.{column.name}")
+
+
+def backfill_blog_posts():
+    """Calculer les champs dérivés des articles écrits avant leur ajout."""
+    import blog_content
+    db = SessionLocal()
+    try:
+        for post_id, content in db.query(BlogPost.id, BlogPost.content).filter(BlogPost.word_count == None).all():
+            values = {getattr(BlogPost, key): value for key, value in blog_content.derive(content).items()}
+            # updated_at explicite : onupdate ne doit pas dater le rattrapage comme une modification
+            values[BlogPost.updated_at] = BlogPost.updated_at
+            db.query(BlogPost).filter(BlogPost.id == post_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def backfill_project_tags():
+    """Indexer les technologies des projets existants (taxonomy.py)."""
+    import taxonomy
+    db = SessionLocal()
+    try:
+        taxonomy.backfill_projects(db)
+    finally:
+        db.close()
+
+
+async def init_db():
+    """Créer les tables manquantes et les colonnes ajoutées depuis."""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    backfill_blog_posts()
+    backfill_project_tags()
+    import project_cards
+    project_cards.ensure_built()
@@ -1,38 +1,42 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from functools import lru_cache
 from pydantic import EmailStr
 from typing import List, Dict
 from pathlib import Path
 from backend.core.config import settings
+from lazy import lazy_import
 
-# Configuration pour fastapi-mail
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent / 'templates',
-)
+fastapi_mail = lazy_import("fastapi_mail")
 
-fm = FastMail(conf)
+@lru_cache(maxsize=None)
+def get_mailer():
+    """Connexion FastMail construite au premier envoi plutôt qu'à l'import."""
+    conf = fastapi_mail.ConnectionConfig(
+        MAIL_USERNAME=settings.MAIL_USERNAME,
+        MAIL_PASSWORD=settings.MAIL_PASSWORD,
+        MAIL_FROM=settings.MAIL_FROM,
+        MAIL_PORT=settings.MAIL_PORT,
+        MAIL_SERVER=settings.MAIL_SERVER,
+        MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
+        MAIL_STARTTLS=settings.MAIL_STARTTLS,
+        MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent.parent / 'templates',
+    )
+    return fastapi_mail.FastMail(conf)
 
 async def send_email(subject: str, recipients: List[EmailStr], template_name: str, template_body: Dict):
     """
     Envoie un email en utilisant un template.
     """
-    message = MessageSchema(
+    message = fastapi_mail.MessageSchema(
         subject=subject,
         recipients=recipients,
         template_body=template_body,
         subtype="html"
     )
     try:
-        await fm.send_message(message, template_name=template_name)
+        await get_mailer().send_message(message, template_name=template_name)
         print(f"Email envoyé à {recipients}")
     except Exception as e:
         print(f"Échec de l'envoi de l'email: {e}")
@@ -77,9 +81,9 @@ async def send_contact_notification_to_admin(data: Dict):
         file_url = f"{base_url}/{data.get('file_path')}"
         body += f"\n\nPièce jointe: {file_url}"
 
-    message = MessageSchema(subject="Nouveau Message de Contact", recipients=[admin_email], body=body, subtype="plain")
+    message = fastapi_mail.MessageSchema(subject="Nouveau Message de Contact", recipients=[admin_email], body=body, subtype="plain")
     try:
-        await fm.send_message(message)
+        await get_mailer().send_message(message)
     except Exception as e:
         print(f"Échec de l'envoi de la notification admin: {e}")
 
@@ -87,7 +91,7 @@ async def send_bulk_email(recipients: List[EmailStr], subject: str, content: str
     """
     Envoie un email en masse en utilisant BCC pour la confidentialité.
     """
-    message = MessageSchema(
+    message = fastapi_mail.MessageSchema(
         subject=subject,
         recipients=[],  # Le champ "To" peut être vide ou contenir votre propre email
         bcc=recipients,
@@ -95,7 +99,7 @@ async def send_bulk_email(recipients: List[EmailStr], subject: str, content: str
         subtype="html"
     )
     try:
-        await fm.send_message(message)
+        await get_mailer().send_message(message)
         print(f"Newsletter envoyée à {len(recipients)} destinataires.")
     except Exception as e:
         print(f"Échec de l'envoi de la newsletter: {e}")
\ No newline at end of file
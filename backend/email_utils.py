@@ -1,22 +1,26 @@
-from fastapi_mail import FastMail, ConnectionConfig
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
+from lazy import lazy_import
+
+fastapi_mail = lazy_import("fastapi_mail")
 
 # Charger les variables d'environnement
 load_dotenv()
 
-# Configuration de fastapi-mail
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT", 587)),
-    MAIL_SERVER=os.getenv("MAIL_SERVER"),
-    MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "True").lower() == "true",
-    MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "False").lower() == "true",
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
+@lru_cache(maxsize=None)
+def get_mailer():
+    """Instance FastMail réutilisable, construite au premier envoi."""
+    conf = fastapi_mail.ConnectionConfig(
+        MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
+        MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
+        MAIL_FROM=os.getenv("MAIL_FROM"),
+        MAIL_PORT=int(os.getenv("MAIL_PORT", 587)),
+        MAIL_SERVER=os.getenv("MAIL_SERVER"),
+        MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "True").lower() == "true",
+        MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "False").lower() == "true",
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True
+    )
+    return fastapi_mail.FastMail(conf)
 
-# Instance FastMail réutilisable
-fm = FastMail(conf)
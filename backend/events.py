@@ -0,0 +1,329 @@
+"""
+Bus d'événements métier (asyncio).
+
+Les routes publient des événements typés après le commit ; les abonnés
+(emails, index de recherche, tableau de bord admin...) les traitent dans
+leurs propres tâches, hors du chemin de la requête :
+
+    @bus.subscribe(ContactSubmitted, policy=BLOCK, scope=LOCAL)
+    async def send_contact_emails(event: ContactSubmitted): ...
+
+    await bus.publish(ContactSubmitted(...))
+
+Chaque abonné a une file bornée et une politique quand elle est pleine :
+    - DROP_OLDEST : l'événement le plus ancien est perdu (état dérivé, tableau de bord) ;
+    - DROP_NEWEST : le nouvel événement est perdu ;
+    - BLOCK : la publication attend une place (au plus BLOCK_TIMEOUT_SECONDS),
+      pour les effets qu'on ne veut pas perdre (emails).
+
+En multi-workers, un broker local (sockets Unix datagramme, un par worker)
+rediffuse les événements aux autres workers de la machine. Seuls les abonnés
+`scope=ALL` les reçoivent (caches et index en mémoire de chaque worker) ;
+les abonnés `scope=LOCAL` (envoi d'email) ne s'exécutent qu'une fois, dans le
+worker qui a publié.
+"""
+
+import asyncio
+import dataclasses
+import inspect
+import os
+import socket
+import typing
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Type
+
+import orjson
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+LOCAL = "local"
+ALL = "all"
+
+DEFAULT_QUEUE_SIZE = 1000
+BLOCK_TIMEOUT_SECONDS = 2.0
+# Temps laissé aux abonnés pour vider leur file à l'arrêt
+DRAIN_TIMEOUT_SECONDS = 5.0
+
+EVENT_TYPES: Dict[str, Type["DomainEvent"]] = {}
+
+
+class DomainEvent:
+    """Base des événements : dataclasses sérialisables, enregistrées par nom."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        EVENT_TYPES[cls.__name__] = cls
+
+    def to_bytes(self) -> bytes:
+        return orjson.dumps({"type": type(self).__name__, "data": dataclasses.asdict(self)})
+
+    @staticmethod
+    def from_bytes(raw: bytes) -> "DomainEvent":
+        message = orjson.loads(raw)
+        cls = EVENT_TYPES[message["type"]]
+        data = message["data"]
+        for name, hint in typing.get_type_hints(cls).items():
+            if datetime in (hint, *typing.get_args(hint)) and isinstance(data.get(name), str):
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+@dataclasses.dataclass(frozen=True)
+class ContactSubmitted(DomainEvent):
+    message_id: int
+    first_name: str
+    last_name: str
+    email: str
+    message: str
+    service: Optional[str]
+    file_path: Optional[str]
+    created_at: datetime
+
+
+@dataclasses.dataclass(frozen=True)
+class UserRegistered(DomainEvent):
+    user_id: int
+    username: str
+    email: str
+    full_name: str
+    created_at: Optional[datetime]
+    # "password", "google", "github" ou "admin"
+    source: str = "password"
+
+
+@dataclasses.dataclass(frozen=True)
+class PostPublished(DomainEvent):
+    """Article créé ou modifié (publié ou non : les abonnés filtrent sur is_published)."""
+    post_id: int
+    slug: str
+    title: str
+    content: Optional[str]
+    is_published: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class PostDeleted(DomainEvent):
+    post_id: int
+    slug: str
+
+
+@dataclasses.dataclass(frozen=True)
+class ProjectUpdated(DomainEvent):
+    project_id: int
+    deleted: bool = False
+
+
+class Subscription:
+    def __init__(self, handler: Callable, event_types, maxsize: int, policy: str, scope: str):
+        self.handler = handler
+        self.name = f"{handler.__module__}.{handler.__qualname__}"
+        self.event_types = tuple(event_types)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.scope = scope
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"delivered": 0, "dropped": 0, "failed": 0}
+
+    def accepts(self, event: DomainEvent, remote: bool) -> bool:
+        return isinstance(event, self.event_types) and (not remote or self.scope == ALL)
+
+    async def call(self, event: DomainEvent):
+        try:
+            if self.is_async:
+                await self.handler(event)
+            else:
+                # Les abonnés synchrones s'exécutent dans la boucle : ils doivent rester courts
+                self.handler(event)
+            self.stats["delivered"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Erreur de l'abonné {self.name} sur {type(event).__name__}: {e}")
+
+    async def offer(self, event: DomainEvent):
+        queue = self.queue
+        if queue.full():
+            if self.policy == DROP_NEWEST:
+                self.stats["dropped"] += 1
+                return
+            if self.policy == DROP_OLDEST:
+                queue.get_nowait()
+                queue.task_done()
+                self.stats["dropped"] += 1
+            else:
+                try:
+                    await asyncio.wait_for(queue.put(event), timeout=BLOCK_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    self.stats["dropped"] += 1
+                return
+        queue.put_nowait(event)
+
+    async def run(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.call(event)
+            finally:
+                self.queue.task_done()
+
+
+class LocalBroker:
+    """
+    Diffusion entre les workers d'une machine : chaque worker lie une socket
+    Unix datagramme dans `directory` et envoie chaque événement à toutes les autres.
+    Les sockets des workers disparus sont supprimées au premier envoi refusé.
+    """
+
+    # Limité par net.core.wmem_default (~208 Ko) ; au-delà l'envoi échoue et est compté
+    MAX_DATAGRAM = 200 * 1024
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}.sock"
+        self.sock: Optional[socket.socket] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "received": 0, "failed": 0}
+
+    async def start(self, on_message: Callable):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(str(self.path))
+        self.sock.setblocking(False)
+        self.task = asyncio.create_task(self._receive(on_message))
+
+    async def _receive(self, on_message: Callable):
+        loop = asyncio.get_running_loop()
+        while True:
+            raw = await loop.sock_recv(self.sock, self.MAX_DATAGRAM)
+            self.stats["received"] += 1
+            try:
+                await on_message(DomainEvent.from_bytes(raw))
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Événement distant illisible: {e}")
+
+    def send(self, event: DomainEvent):
+        raw = event.to_bytes()
+        if len(raw) > self.MAX_DATAGRAM:
+            self.stats["failed"] += 1
+            return
+        for peer in self.directory.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self.sock.sendto(raw, str(peer))
+                self.stats["sent"] += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                peer.unlink(missing_ok=True)
+            except OSError:
+                # File de réception du pair pleine : l'événement est perdu pour lui
+                self.stats["failed"] += 1
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.sock is not None:
+            self.sock.close()
+        self.path.unlink(missing_ok=True)
+
+
+def create_broker(kind: Optional[str], directory: str) -> Optional[LocalBroker]:
+    """Broker configuré par EVENT_BUS_BROKER : vide (un seul worker) ou "local"."""
+    if not kind:
+        return None
+    if kind == "local":
+        return LocalBroker(directory)
+    raise ValueError(f"Broker d'événements inconnu: {kind}")
+
+
+class EventBus:
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        self.broker: Optional[LocalBroker] = None
+        self.running = False
+
+    def subscribe(self, *event_types: Type[DomainEvent], maxsize: int = DEFAULT_QUEUE_SIZE,
+                  policy: str = DROP_OLDEST, scope: str = ALL):
+        """Décorateur : abonner un handler (sync ou async) à un ou plusieurs types d'événements."""
+        def decorator(handler: Callable):
+            subscription = Subscription(handler, event_types, maxsize, policy, scope)
+            self.subscriptions.append(subscription)
+            if self.running:
+                self._start_subscription(subscription)
+            return handler
+        return decorator
+
+    async def publish(self, event: DomainEvent):
+        """Publier un événement après le commit. N'attend que les abonnés BLOCK dont la file est pleine."""
+        await self._dispatch(event, remote=False)
+        if self.broker is not None:
+            self.broker.send(event)
+
+    async def _dispatch(self, event: DomainEvent, remote: bool):
+        for subscription in self.subscriptions:
+            if not subscription.accepts(event, remote):
+                continue
+            if self.running:
+                await subscription.offer(event)
+            else:
+                # Hors du serveur (scripts) : exécution immédiate
+                await subscription.call(event)
+
+    def _start_subscription(self, subscription: Subscription):
+        subscription.queue = asyncio.Queue(maxsize=subscription.maxsize)
+        subscription.task = asyncio.create_task(subscription.run())
+
+    async def start(self, broker: Optional[LocalBroker] = None):
+        for subscription in self.subscriptions:
+            self._start_subscription(subscription)
+        self.running = True
+        if broker is not None:
+            await broker.start(lambda event: self._dispatch(event, remote=True))
+            self.broker = broker
+
+    async def stop(self):
+        if self.broker is not None:
+            await self.broker.stop()
+            self.broker = None
+        self.running = False
+        pending = [s.queue.join() for s in self.subscriptions if s.queue is not None]
+        if pending:
+            try:
+                await asyncio.wait_for(asyncio.gather(*pending), timeout=DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print("Arrêt du bus d'événements : des événements n'ont pas été traités")
+        for subscription in self.subscriptions:
+            if subscription.task is not None:
+                subscription.task.cancel()
+                try:
+                    await subscription.task
+                except asyncio.CancelledError:
+                    pass
+                subscription.task = None
+                subscription.queue = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": [{
+                "name": s.name,
+                "events": [t.__name__ for t in s.event_types],
+                "policy": s.policy,
+                "scope": s.scope,
+                "queued": s.queue.qsize() if s.queue is not None else 0,
+                "capacity": s.maxsize,
+                **s.stats,
+            } for s in self.subscriptions],
+            "broker": dict(self.broker.stats) if self.broker is not None else None,
+        }
+
+
+bus = EventBus()
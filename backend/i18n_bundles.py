@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Bundles de traduction par page.
+
+Les catalogues fr.json / en.json / zh.json (racine du site) sont chargés une
+fois et découpés en espaces de noms : chaque page ne reçoit que les sections
+de premier niveau qu'elle utilise (attributs data-i18n* de son HTML, clés
+citées dans les scripts qu'elle charge).
+
+La chaîne de repli (I18N_FALLBACKS, puis I18N_DEFAULT_LOCALE) est résolue à la
+génération : une clé absente de zh.json est déjà remplie depuis en puis fr, le
+navigateur n'a plus qu'un fichier à charger.
+
+    generated/i18n/<page>.<langue>.<empreinte>.json   servis immutable (.br/.gz)
+    generated/i18n/_all.<langue>.<empreinte>.json     catalogue complet (pages sans entrée)
+    generated/i18n/manifest.json                      page -> langue -> fichier (revalidé)
+
+Le répertoire est servi sous /i18n par PrecompressedStaticFiles. Il est
+regénéré au démarrage quand les catalogues, les pages ou les scripts ont changé.
+
+Usage (depuis backend/):
+    python i18n_bundles.py build
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from config import settings
+from static_assets import SITE_ROOT, compress_file, fingerprint_name
+
+OUTPUT_DIR = Path(settings.I18N_BUNDLE_DIR)
+MANIFEST_NAME = "manifest.json"
+ALL_PAGES = "_all"
+
+_ATTRIBUTE_RE = re.compile(r"""data-i18n(?:-[a-z]+)?\s*=\s*["']([A-Za-z0-9_]+)\.""")
+_SCRIPT_RE = re.compile(r"""<script[^>]+src=["'](?:\.\./|/)?(js/[^"'?#]+)""")
+_KEY_RE = re.compile(r"""["'`]([A-Za-z0-9_]+)\.[A-Za-z0-9_.]+["'`]""")
+
+_catalogues: Optional[Dict[str, dict]] = None
+
+
+def load_catalogues() -> Dict[str, dict]:
+    """Catalogues bruts par langue, lus une seule fois."""
+    global _catalogues
+    if _catalogues is None:
+        _catalogues = {
+            locale: json.loads((SITE_ROOT / f"{locale}.json").read_text(encoding="utf-8"))
+            for locale in settings.I18N_LOCALES
+            if (SITE_ROOT / f"{locale}.json").exists()
+        }
+    return _catalogues
+
+
+def fallback_chain(locale: str) -> List[str]:
+    """Langues consultées dans l'ordre pour `locale` (elle-même, ses replis, la langue par défaut)."""
+    chain = [locale, *settings.I18N_FALLBACKS.get(locale, []), settings.I18N_DEFAULT_LOCALE]
+    return list(dict.fromkeys(chain))
+
+
+def _merge(primary, fallback):
+    """Fusion récursive : la valeur de `primary` l'emporte sauf si elle est absente ou vide."""
+    if isinstance(primary, dict) and isinstance(fallback, dict):
+        merged = {key: _merge(primary.get(key), value) for key, value in fallback.items()}
+        merged.update({key: value for key, value in primary.items() if key not in fallback})
+        return merged
+    return fallback if primary in (None, "") else primary
+
+
+def resolve(locale: str) -> dict:
+    """Catalogue complet de `locale`, replis appliqués."""
+    catalogues = load_catalogues()
+    resolved: dict = {}
+    for fallback in reversed(fallback_chain(locale)):
+        resolved = _merge(catalogues.get(fallback, {}), resolved)
+    return resolved
+
+
+def page_namespaces(sections: Set[str]) -> Dict[str, List[str]]:
+    """{page: [sections]} d'après les attributs data-i18n* et les scripts chargés par chaque page."""
+    script_keys: Dict[str, Set[str]] = {}
+    namespaces: Dict[str, List[str]] = {}
+    for path in sorted(SITE_ROOT.glob("*.html")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        used = set(_ATTRIBUTE_RE.findall(text))
+        for script in _SCRIPT_RE.findall(text):
+            if script not in script_keys:
+                source = SITE_ROOT / script
+                code = source.read_text(encoding="utf-8", errors="ignore") if source.is_file() else ""
+                # Clés citées en JS ("index_hero.title2") et gabarits injectés (cookies.js)
+                script_keys[script] = set(_KEY_RE.findall(code)) | set(_ATTRIBUTE_RE.findall(code))
+            used |= script_keys[script]
+        used &= sections
+        if used:
+            namespaces[path.stem] = sorted(used)
+    return namespaces
+
+
+def source_digest() -> str:
+    """Empreinte des entrées (catalogues, pages, scripts) : régénérer seulement si elle change."""
+    digest = hashlib.md5()
+    digest.update(json.dumps([settings.I18N_LOCALES, settings.I18N_FALLBACKS, settings.I18N_DEFAULT_LOCALE]).encode())
+    sources = [SITE_ROOT / f"{locale}.json" for locale in settings.I18N_LOCALES]
+    sources += sorted(SITE_ROOT.glob("*.html")) + sorted((SITE_ROOT / "js").glob("*.js"))
+    for path in sources:
+        if path.is_file():
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _write(name: str, content: bytes):
+    """Écriture atomique puis variantes précompressées (un nom avec empreinte ne change jamais de contenu)."""
+    target = OUTPUT_DIR / name
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, target)
+    compress_file(target)
+
+
+def build() -> dict:
+    """Écrire les bundles et le manifeste, retirer les bundles qui n'y figurent plus."""
+    global _catalogues
+    _catalogues = None
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    locales = list(load_catalogues())
+    resolved = {locale: resolve(locale) for locale in locales}
+    sections = set().union(*(catalogue.keys() for catalogue in resolved.values())) if resolved else set()
+    namespaces = {ALL_PAGES: sorted(sections), **page_namespaces(sections)}
+
+    pages: Dict[str, Dict[str, str]] = {}
+    for page, names in namespaces.items():
+        for locale in locales:
+            bundle = {name: resolved[locale][name] for name in names if name in resolved[locale]}
+            content = json.dumps(bundle, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+            name = fingerprint_name(f"{page}.{locale}.json", content)
+            if not (OUTPUT_DIR / name).exists():
+                _write(name, content)
+            pages.setdefault(page, {})[locale] = name
+
+    manifest = {
+        "source": source_digest(),
+        "default": settings.I18N_DEFAULT_LOCALE,
+        "locales": locales,
+        "pages": pages,
+    }
+    _write(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    kept = {name for files in pages.values() for name in files.values()} | {MANIFEST_NAME}
+    for path in OUTPUT_DIR.iterdir():
+        base = path.name[:-3] if path.name.endswith((".gz", ".br")) else path.name
+        if base not in kept:
+            path.unlink(missing_ok=True)
+    return manifest
+
+
+def ensure_built():
+    """Au démarrage : régénérer si les entrées ont changé depuis le dernier manifeste."""
+    try:
+        current = json.loads((OUTPUT_DIR / MANIFEST_NAME).read_text(encoding="utf-8")).get("source")
+    except (OSError, ValueError):
+        current = None
+    if current != source_digest():
+        build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+    manifest = build()
+    count = sum(len(files) for files in manifest["pages"].values())
+    print(f"✅ {count} bundle(s) pour {len(manifest['pages'])} page(s) dans {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Pré-traitement des événements analytics avant stockage.
+
+Pour chaque événement reçu par /api/analytics/track :
+    1. robots : le User-Agent est classé (robot, appareil, navigateur, système),
+       avec un cache LRU : les mêmes User-Agent reviennent sans cesse. Les
+       robots ne sont pas enregistrés ;
+    2. doublons : un événement identique (session, type, url, élément) reçu
+       moins de ANALYTICS_DEDUP_SECONDS après le précédent est ignoré (double
+       clic, double envoi). La fenêtre est propre à chaque worker ;
+    3. échantillonnage : ANALYTICS_SAMPLE_RATES fixe un taux par type
+       d'événement. Le tirage dépend de la session (une session garde tous ses
+       événements d'un type, ou aucun) et le poids 1/taux est enregistré dans
+       details.sample_weight (jamais accepté du client) : les agrégats le
+       somment et restent sans biais. Les résumés de sessions ignorent les
+       types échantillonnés (voir sessionization.py) ;
+    4. enrichissement : appareil, navigateur, canal d'acquisition (direct,
+       interne, recherche, social, référent) et paramètres utm_* ajoutés à details.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config import settings
+
+ACCEPT = "accepted"
+BOT = "bot"
+DUPLICATE = "duplicate"
+SAMPLED = "sampled"
+
+# Clés récentes gardées pour la détection des doublons (par worker)
+DEDUP_CAPACITY = 50_000
+UTM_KEYS = ("utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content")
+
+_BOT_RE = re.compile(
+    r"bot|crawl|spider|slurp|archiver|bingpreview|facebookexternalhit|embedly|preview|headless|"
+    r"lighthouse|pagespeed|python-requests|python-urllib|aiohttp|httpx|curl|wget|go-http-client|"
+    r"java/|okhttp|axios|node-fetch|monitor|uptime|pingdom|scanner",
+    re.IGNORECASE,
+)
+_TABLET_RE = re.compile(r"ipad|tablet|kindle|silk|android(?!.*mobile)", re.IGNORECASE)
+_MOBILE_RE = re.compile(r"mobi|iphone|ipod|android|windows phone", re.IGNORECASE)
+_BROWSERS = (("edge", "edg/"), ("opera", "opr/"), ("samsung", "samsungbrowser"), ("chrome", "chrome/"),
+             ("chrome", "crios/"), ("firefox", "firefox/"), ("firefox", "fxios/"), ("safari", "safari/"))
+_SYSTEMS = (("ios", "iphone"), ("ios", "ipad"), ("android", "android"), ("windows", "windows"),
+            ("macos", "mac os x"), ("linux", "linux"))
+_SEARCH_ENGINES = ("google.", "bing.", "duckduckgo.", "yahoo.", "baidu.", "yandex.", "qwant.", "ecosia.")
+_SOCIAL_NETWORKS = ("facebook.", "fb.", "t.co", "twitter.", "x.com", "linkedin.", "lnkd.in", "instagram.",
+                    "youtube.", "reddit.", "tiktok.", "whatsapp.", "telegram.", "weixin.", "weibo.")
+
+
+class Agent(NamedTuple):
+    is_bot: bool
+    device: str
+    browser: str
+    os: str
+
+
+class Decision(NamedTuple):
+    verdict: str
+    details: Optional[dict] = None
+
+
+@lru_cache(maxsize=4096)
+def classify_user_agent(user_agent: Optional[str]) -> Agent:
+    if not user_agent or _BOT_RE.search(user_agent):
+        return Agent(True, "bot", "other", "other")
+    lowered = user_agent.lower()
+    device = "tablet" if _TABLET_RE.search(user_agent) else "mobile" if _MOBILE_RE.search(user_agent) else "desktop"
+    browser = next((name for name, marker in _BROWSERS if marker in lowered), "other")
+    system = next((name for name, marker in _SYSTEMS if marker in lowered), "other")
+    return Agent(False, device, browser, system)
+
+
+def _host_matches(host: str, domains) -> bool:
+    # "google." reconnaît google.fr et news.google.com, pas notgoogle.com
+    return any(f".{domain}" in f".{host}" for domain in domains)
+
+
+def traffic_source(referrer: Optional[str], url: str) -> dict:
+    """Canal d'acquisition et paramètres UTM de l'URL de la page."""
+    source = {}
+    query = parse_qs(urlsplit(url or "").query)
+    for key in UTM_KEYS:
+        if query.get(key):
+            source[key] = query[key][0][:100]
+    host = (urlsplit(referrer).hostname or "") if referrer else ""
+    host = host[4:] if host.startswith("www.") else host
+    if not host:
+        channel = "campaign" if source else "direct"
+    elif host in settings.ANALYTICS_SITE_HOSTS:
+        channel = "internal"
+    elif _host_matches(host, _SEARCH_ENGINES):
+        channel = "search"
+    elif _host_matches(host, _SOCIAL_NETWORKS):
+        channel = "social"
+    else:
+        channel = "referral"
+    if host and channel != "internal":
+        source["referrer_host"] = host
+    source["channel"] = channel
+    return source
+
+
+class Deduplicator:
+    """Dernière occurrence de chaque clé récente, en LRU borné."""
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY):
+        self.capacity = capacity
+        self.seen: "OrderedDict[Tuple, float]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def is_duplicate(self, key: Tuple, now: float, window: float) -> bool:
+        with self.lock:
+            last = self.seen.get(key)
+            self.seen[key] = now
+            self.seen.move_to_end(key)
+            if len(self.seen) > self.capacity:
+                self.seen.popitem(last=False)
+        return last is not None and now - last < window
+
+
+def sample_rate(event_type: str) -> float:
+    return settings.ANALYTICS_SAMPLE_RATES.get(event_type, 1.0)
+
+
+def is_sampled(session_id: str, event_type: str, rate: float) -> bool:
+    """Tirage déterministe par session et type d'événement."""
+    if rate >= 1:
+        return True
+    digest = hashlib.blake2b(f"{session_id}:{event_type}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2 ** 64 < rate
+
+
+_deduplicator = Deduplicator()
+stats = {ACCEPT: 0, BOT: 0, DUPLICATE: 0, SAMPLED: 0}
+
+
+def process(session_id: str, event_type: str, url: str, details: Optional[dict],
+            user_agent: Optional[str]) -> Decision:
+    """Décider du sort d'un événement ; s'il est gardé, renvoyer ses details enrichis."""
+    agent = classify_user_agent((user_agent or "")[:512])
+    details = dict(details or {})
+    # Le poids n'est fixé que par le serveur : une valeur envoyée par le client fausserait tous les agrégats
+    details.pop("sample_weight", None)
+    if agent.is_bot:
+        verdict = BOT
+    elif _deduplicator.is_duplicate((session_id, event_type, url, details.get("element")),
+                                    time.monotonic(), settings.ANALYTICS_DEDUP_SECONDS):
+        verdict = DUPLICATE
+    else:
+        rate = sample_rate(event_type)
+        if not is_sampled(session_id, event_type, rate):
+            verdict = SAMPLED
+        else:
+            verdict = ACCEPT
+            if rate < 1:
+                details["sample_weight"] = round(1 / rate, 6)
+            details.update(device=agent.device, browser=agent.browser, os=agent.os)
+            details.update(traffic_source(details.get("referrer"), url))
+    stats[verdict] += 1
+    return Decision(verdict, details if verdict == ACCEPT else None)
+
+
+def weight(details: Optional[dict]) -> float:
+    """Poids d'échantillonnage d'un événement enregistré (1 s'il n'a pas été échantillonné)."""
+    return float((details or {}).get("sample_weight", 1))
+
+
+def get_stats() -> dict:
+    info = classify_user_agent.cache_info()
+    return {**stats, "user_agent_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize}}
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+File de tâches persistée en base (table `jobs`).
+
+Les routes enregistrent une tâche (`enqueue("email.send", {...})`) au lieu
+d'utiliser BackgroundTasks ; des processus workers séparés la réclament,
+l'exécutent et la replanifient en cas d'échec :
+
+    - priorités (plus grand = plus tôt) puis ordre d'arrivée ;
+    - tâches planifiées (run_at / delay) ;
+    - réessais avec backoff exponentiel jusqu'à max_attempts ;
+    - délai de visibilité : une tâche réclamée par un worker mort redevient
+      disponible à l'expiration de locked_until (ou échoue si c'était son
+      dernier essai).
+
+Usage (depuis backend/):
+    python jobs.py worker --queues email,default --concurrency 4
+    python jobs.py stats
+    python jobs.py retry            # remettre les tâches en échec dans la file
+    python jobs.py purge --days 7   # supprimer les tâches terminées
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import signal
+import socket
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Job
+
+DEFAULT_QUEUE = "default"
+DEFAULT_MAX_ATTEMPTS = 5
+# Délai de visibilité par défaut : durée maximale d'une exécution
+DEFAULT_TIMEOUT_SECONDS = 120
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+IDLE_POLL_SECONDS = 1.0
+CLAIM_CANDIDATES = 10
+
+
+@dataclass
+class Task:
+    name: str
+    func: Callable
+    queue: str
+    priority: int
+    max_attempts: int
+    timeout: int
+
+
+TASKS: Dict[str, Task] = {}
+
+
+def task(name: str, queue: str = DEFAULT_QUEUE, priority: int = 0,
+         max_attempts: int = DEFAULT_MAX_ATTEMPTS, timeout: int = DEFAULT_TIMEOUT_SECONDS):
+    """Enregistrer une fonction (sync ou async) comme tâche. Elle reçoit le payload en arguments nommés."""
+    def decorator(func):
+        TASKS[name] = Task(name, func, queue, priority, max_attempts, timeout)
+        return func
+    return decorator
+
+
+def enqueue(name: str, payload: Optional[dict] = None, *, db: Optional[Session] = None,
+            priority: Optional[int] = None, run_at: Optional[datetime] = None, delay: float = 0) -> int:
+    """Enregistrer une tâche et retourner son identifiant. Le payload doit être sérialisable en JSON."""
+    return enqueue_many(name, [payload or {}], db=db, priority=priority, run_at=run_at, delay=delay)[0]
+
+
+def enqueue_many(name: str, payloads: List[dict], *, db: Optional[Session] = None,
+                 priority: Optional[int] = None, run_at: Optional[datetime] = None, delay: float = 0) -> List[int]:
+    """
+    Enregistrer plusieurs tâches du même type en une transaction (tout ou rien).
+
+    Avec `db`, les tâches rejoignent la transaction de l'appelant : elles sont
+    seulement envoyées (flush, pour obtenir leurs identifiants) et c'est à
+    l'appelant de faire le commit. Sans `db`, une session dédiée est validée.
+    """
+    definition = TASKS.get(name)
+    if definition is None:
+        raise KeyError(f"Tâche inconnue: {name}")
+    run_at = run_at or datetime.utcnow() + timedelta(seconds=delay)
+    rows = [Job(
+        name=name,
+        queue=definition.queue,
+        payload=json.dumps(payload, ensure_ascii=False),
+        priority=definition.priority if priority is None else priority,
+        max_attempts=definition.max_attempts,
+        run_at=run_at,
+    ) for payload in payloads]
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        db.add_all(rows)
+        if own_session:
+            db.commit()
+        else:
+            db.flush()
+        return [job.id for job in rows]
+    finally:
+        if own_session:
+            db.close()
+
+
+def schedule_once(name: str, payload: Optional[dict] = None, *, delay: float = 0) -> Optional[int]:
+    """Planifier une tâche périodique, sauf si une instance est déjà en attente ou en cours."""
+    db = SessionLocal()
+    try:
+        if db.query(Job.id).filter(Job.name == name, Job.status.in_(("pending", "processing"))).first():
+            return None
+        job_id = enqueue(name, payload, db=db, delay=delay)
+        db.commit()
+        return job_id
+    finally:
+        db.close()
+
+
+def reschedule(name: str, payload: Optional[dict] = None, *, delay: float = 0) -> Optional[int]:
+    """
+    Replanifier une tâche périodique depuis sa propre exécution (dans un finally,
+    même après une erreur), sauf si une instance est déjà en attente : un essai
+    replanifié par _finish, ou la prochaine occurrence déjà enregistrée.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(Job.id).filter(Job.name == name, Job.status == "pending").first():
+            return None
+        job_id = enqueue(name, payload, db=db, delay=delay)
+        db.commit()
+        return job_id
+    finally:
+        db.close()
+
+
+def claim(db: Session, queues: Sequence[str], worker_id: str) -> Optional[Job]:
+    """Réclamer atomiquement la prochaine tâche due (UPDATE conditionnel : un seul worker gagne)."""
+    now = datetime.utcnow()
+    expired = (Job.status == "processing") & (Job.locked_until < now)
+    # Worker mort pendant son dernier essai : la tâche échoue au lieu d'être relancée
+    exhausted = db.query(Job).filter(Job.queue.in_(queues), expired, Job.attempts >= Job.max_attempts).update({
+        Job.status: "failed",
+        Job.finished_at: now,
+        Job.locked_until: None,
+        Job.locked_by: None,
+        Job.last_error: "Délai de visibilité dépassé au dernier essai",
+    }, synchronize_session=False)
+    if exhausted:
+        db.commit()
+    available = ((Job.status == "pending") & (Job.run_at <= now)) | (expired & (Job.attempts < Job.max_attempts))
+    candidates = db.query(Job.id, Job.name).filter(Job.queue.in_(queues), available).order_by(
+        Job.priority.desc(), Job.run_at, Job.id
+    ).limit(CLAIM_CANDIDATES).all()
+    for job_id, name in candidates:
+        timeout = TASKS[name].timeout if name in TASKS else DEFAULT_TIMEOUT_SECONDS
+        claimed = db.query(Job).filter(Job.id == job_id, available).update({
+            Job.status: "processing",
+            Job.locked_until: now + timedelta(seconds=timeout),
+            Job.locked_by: worker_id,
+            Job.attempts: Job.attempts + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.query(Job).filter(Job.id == job_id).first()
+    return None
+
+
+def _claim(queues: Sequence[str], worker_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        job = claim(db, queues, worker_id)
+        if job is None:
+            return None
+        return {"id": job.id, "name": job.name, "payload": job.payload,
+                "attempts": job.attempts, "max_attempts": job.max_attempts}
+    finally:
+        db.close()
+
+
+def _finish(job_id: int, worker_id: str, error: Optional[str] = None):
+    """Marquer la tâche terminée, ou la replanifier / l'abandonner après une erreur."""
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).first()
+        if job is None:
+            # Délai de visibilité dépassé : un autre worker l'a réclamée entre-temps
+            return
+        job.locked_until = None
+        job.locked_by = None
+        if error is None:
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+            job.last_error = None
+        else:
+            job.last_error = error
+            if job.attempts >= job.max_attempts:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "pending"
+                backoff = min(BACKOFF_BASE_SECONDS * 2 ** (job.attempts - 1), BACKOFF_MAX_SECONDS)
+                job.run_at = datetime.utcnow() + timedelta(seconds=backoff)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def execute(job: dict, worker_id: str):
+    definition = TASKS.get(job["name"])
+    error = None
+    try:
+        if definition is None:
+            raise KeyError(f"Tâche inconnue: {job['name']}")
+        payload = json.loads(job["payload"])
+        if inspect.iscoroutinefunction(definition.func):
+            await asyncio.wait_for(definition.func(**payload), timeout=definition.timeout)
+        else:
+            await run_in_threadpool(definition.func, **payload)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        print(f"Tâche {job['name']}#{job['id']} en échec (essai {job['attempts']}/{job['max_attempts']}): {error}")
+    await run_in_threadpool(_finish, job["id"], worker_id, error)
+
+
+async def work(queues: Sequence[str], concurrency: int = 1, stop: Optional[asyncio.Event] = None,
+               worker_id: Optional[str] = None):
+    """Traiter les files jusqu'à `stop` : `concurrency` tâches au plus en parallèle."""
+    stop = stop or asyncio.Event()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    async def slot():
+        while not stop.is_set():
+            job = await run_in_threadpool(_claim, queues, worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await execute(job, worker_id)
+
+    await asyncio.gather(*(slot() for _ in range(concurrency)))
+
+
+def queue_stats(db: Session) -> dict:
+    """Profondeur des files : nombre de tâches par statut et âge de la plus ancienne tâche due."""
+    now = datetime.utcnow()
+    stats: Dict[str, dict] = {}
+    for queue, status, count in db.query(Job.queue, Job.status, func.count(Job.id)).group_by(Job.queue, Job.status):
+        stats.setdefault(queue, {})[status] = count
+    for queue, due, oldest in db.query(Job.queue, func.count(Job.id), func.min(Job.run_at)).filter(
+        Job.status == "pending", Job.run_at <= now
+    ).group_by(Job.queue):
+        stats.setdefault(queue, {})["due"] = due
+        stats[queue]["oldest_due_seconds"] = round((now - oldest).total_seconds(), 1)
+    return stats
+
+
+# --- Worker intégré (développement) ---
+
+_embedded_stop: Optional[asyncio.Event] = None
+_embedded_task: Optional[asyncio.Task] = None
+
+
+def start_embedded_worker(queues: Sequence[str], concurrency: int = 1):
+    """Traiter les files dans le processus de l'API (JOBS_EMBEDDED_WORKER), sans worker séparé."""
+    global _embedded_stop, _embedded_task
+    if _embedded_task is None:
+        import tasks  # noqa: F401  (enregistrement des tâches)
+        _embedded_stop = asyncio.Event()
+        _embedded_task = asyncio.create_task(work(queues, concurrency, _embedded_stop))
+
+
+async def stop_embedded_worker():
+    global _embedded_task
+    if _embedded_task is not None:
+        _embedded_stop.set()
+        await _embedded_task
+        _embedded_task = None
+
+
+# --- CLI ---
+
+def _run_worker(args):
+    import tasks  # noqa: F401  (enregistrement des tâches)
+
+    queues = [q.strip() for q in args.queues.split(",") if q.strip()]
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"👷 Worker {os.getpid()} : files {', '.join(queues)}, {args.concurrency} tâche(s) en parallèle")
+        await work(queues, args.concurrency, stop)
+        print("Worker arrêté")
+
+    asyncio.run(main())
+
+
+def _print_stats(args):
+    db = SessionLocal()
+    try:
+        stats = queue_stats(db)
+    finally:
+        db.close()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"{'file':<12} {'dues':>6} {'attente':>8} {'en cours':>9} {'échecs':>7} {'terminées':>10} {'plus ancienne':>14}")
+    for queue, counts in sorted(stats.items()):
+        oldest = counts.get("oldest_due_seconds")
+        print(f"{queue:<12} {counts.get('due', 0):>6} {counts.get('pending', 0):>8} {counts.get('processing', 0):>9} "
+              f"{counts.get('failed', 0):>7} {counts.get('done', 0):>10} {f'{oldest:.0f} s' if oldest is not None else '-':>14}")
+
+
+def _retry_failed(args):
+    db = SessionLocal()
+    try:
+        query = db.query(Job).filter(Job.status == "failed")
+        if args.name:
+            query = query.filter(Job.name == args.name)
+        count = query.update({
+            Job.status: "pending", Job.attempts: 0, Job.run_at: datetime.utcnow(), Job.finished_at: None
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    print(f"{count} tâche(s) remise(s) dans la file")
+
+
+def _purge(args):
+    db = SessionLocal()
+    try:
+        count = db.query(Job).filter(
+            Job.status == "done", Job.finished_at < datetime.utcnow() - timedelta(days=args.days)
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    print(f"{count} tâche(s) supprimée(s)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="traiter les tâches")
+    worker.add_argument("--queues", default="email,default", help="files traitées, séparées par des virgules")
+    worker.add_argument("--concurrency", type=int, default=4)
+    worker.set_defaults(func=_run_worker)
+
+    stats = commands.add_parser("stats", help="profondeur des files")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=_print_stats)
+
+    retry = commands.add_parser("retry", help="remettre les tâches en échec dans la file")
+    retry.add_argument("--name", help="seulement les tâches de ce nom")
+    retry.set_defaults(func=_retry_failed)
+
+    purge = commands.add_parser("purge", help="supprimer les tâches terminées")
+    purge.add_argument("--days", type=int, default=7)
+    purge.set_defaults(func=_purge)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    # Passer par le module "jobs" : c'est dans jobs.TASKS que tasks.py enregistre ses tâches
+    from jobs import main as run_cli
+    sys.exit(run_cli())
@@ -0,0 +1,77 @@
+"""
+Import différé des sous-systèmes lourds (openai, stripe, qrcode/PIL, pyotp,
+httpx, fastapi_mail).
+
+`lazy_import("stripe")` retourne un proxy : le module réel n'est importé
+qu'au premier accès à un attribut. Le démarrage d'un worker ne paie donc
+que ce qu'il utilise.
+"""
+
+import importlib
+import importlib.util
+import threading
+from functools import lru_cache
+from typing import Dict, List
+
+_registry: Dict[str, "LazyModule"] = {}
+
+
+class LazyModule:
+    """Proxy de module importé au premier accès."""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "chargé" if self.is_loaded else "non chargé"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Retourne le proxy partagé pour le module `name`."""
+    if name not in _registry:
+        _registry[name] = LazyModule(name)
+    return _registry[name]
+
+
+@lru_cache(maxsize=None)
+def is_available(name: str) -> bool:
+    """Le module `name` est-il installé ? (recherche du fichier, sans l'importer)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def warm_up() -> List[str]:
+    """Importer tous les modules différés (à lancer en tâche de fond après le démarrage)."""
+    loaded = []
+    for name, module in list(_registry.items()):
+        try:
+            module._load()
+            loaded.append(name)
+        except ImportError as e:
+            print(f"Module optionnel indisponible: {name} ({e})")
+    return loaded
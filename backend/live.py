@@ -0,0 +1,192 @@
+"""
+Flux temps réel du tableau de bord admin.
+
+`hub` garde une copie des statistiques du tableau de bord et diffuse des
+deltas aux abonnés (un flux SSE par onglet admin). Il est alimenté par les
+événements métier du bus (`events.py` : messages, inscriptions, projets),
+par le suivi analytics (pages vues) et par les actions admin.
+
+Les statistiques ne sont lues en base qu'une fois (au premier abonné), puis
+mises à jour par les deltas, ou recalculées une seule fois par rafale
+d'écritures qu'on ne sait pas traduire en delta. Le coût en base ne dépend
+donc pas du nombre de tableaux de bord ouverts.
+
+Avec le broker local (EVENT_BUS_BROKER=local), chaque worker reçoit aussi les
+événements publiés par les autres ; les pages vues et les actions admin
+restent propres à chaque worker.
+"""
+
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, date
+from typing import Optional, Set
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, ContactMessage, Project
+from events import bus, ContactSubmitted, UserRegistered, ProjectUpdated
+
+# Messages en attente par abonné : un onglet lent perd les plus anciens
+SUBSCRIBER_QUEUE_SIZE = 100
+# Les pages vues sont regroupées avant diffusion
+PAGEVIEW_FLUSH_SECONDS = 2.0
+# Délai de regroupement des recalculs complets
+REFRESH_DELAY_SECONDS = 1.0
+# Commentaire SSE envoyé en l'absence d'événement (proxys, détection de déconnexion)
+KEEPALIVE_SECONDS = 15.0
+
+
+def collect_stats(db: Session) -> dict:
+    """Statistiques générales du tableau de bord admin."""
+    today = datetime.utcnow().date()
+    total_users = db.query(func.count(User.id)).scalar()
+    new_users_today = db.query(func.count(User.id)).filter(func.date(User.created_at) == today).scalar()
+    total_messages = db.query(func.count(ContactMessage.id)).scalar()
+    unread_messages = db.query(func.count(ContactMessage.id)).filter(ContactMessage.status == "nouveau").scalar()
+    total_projects = db.query(func.count(Project.id)).scalar()
+    active_projects = db.query(func.count(Project.id)).filter(Project.status == "en_cours").scalar()
+    completed_projects = db.query(func.count(Project.id)).filter(Project.status == "terminé").scalar()
+    return {
+        "total_users": total_users,
+        "new_users_today": new_users_today,
+        "total_messages": total_messages,
+        "unread_messages": unread_messages,
+        "total_projects": total_projects,
+        "active_projects": active_projects,
+        "completion_rate": (completed_projects / total_projects * 100) if total_projects > 0 else 0,
+    }
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def _load_stats() -> dict:
+    db = SessionLocal()
+    try:
+        return collect_stats(db)
+    finally:
+        db.close()
+
+
+class DashboardHub:
+    """Bus de diffusion et état courant du tableau de bord."""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.version = 0
+        self.stats: Optional[dict] = None
+        self.stats_day: Optional[date] = None
+        self.pageviews: Counter = Counter()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    # --- Diffusion ---
+
+    def publish(self, event: str, data: dict):
+        """Envoyer un message à tous les abonnés sans jamais attendre."""
+        self.version += 1
+        message = {"event": event, "version": self.version, "data": data}
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        self._ensure_flush_task()
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+
+    async def snapshot(self) -> dict:
+        """Statistiques courantes et version du dernier message appliqué."""
+        async with self._lock:
+            if self.stats is None or self.stats_day != datetime.utcnow().date():
+                self.stats_day = datetime.utcnow().date()
+                self.stats = await run_in_threadpool(_load_stats)
+            return {"version": self.version, "stats": dict(self.stats)}
+
+    # --- Entrées depuis les chemins d'écriture ---
+
+    def _apply(self, **deltas):
+        if self.stats is None:
+            return
+        if self.stats_day != datetime.utcnow().date():
+            # Changement de jour : new_users_today repart de zéro
+            self.stats = None
+            self.refresh()
+            return
+        for key, delta in deltas.items():
+            self.stats[key] += delta
+
+    def contact_created(self, event: ContactSubmitted):
+        self._apply(total_messages=1, unread_messages=1)
+        self.publish("contact", {
+            "id": event.message_id,
+            "name": f"{event.first_name} {event.last_name}",
+            "service": event.service,
+            "created_at": event.created_at.isoformat(),
+            "delta": {"total_messages": 1, "unread_messages": 1},
+        })
+
+    def user_registered(self, event: UserRegistered):
+        self._apply(total_users=1, new_users_today=1)
+        self.publish("registration", {
+            "id": event.user_id,
+            "username": event.username,
+            "created_at": event.created_at.isoformat() if event.created_at else None,
+            "delta": {"total_users": 1, "new_users_today": 1},
+        })
+
+    def pageview(self, url: str):
+        if self.subscribers:
+            self.pageviews[url] += 1
+
+    def refresh(self):
+        """Écriture sans delta connu : un seul recalcul pour toute la rafale."""
+        if not self.subscribers:
+            self.stats = None
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+
+    async def _refresh(self):
+        await asyncio.sleep(REFRESH_DELAY_SECONDS)
+        async with self._lock:
+            self.stats_day = datetime.utcnow().date()
+            self.stats = await run_in_threadpool(_load_stats)
+            self.publish("stats", dict(self.stats))
+
+    def _ensure_flush_task(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_pageviews())
+
+    async def _flush_pageviews(self):
+        while self.subscribers:
+            await asyncio.sleep(PAGEVIEW_FLUSH_SECONDS)
+            if self.pageviews:
+                pages, self.pageviews = self.pageviews, Counter()
+                self.publish("pageviews", {"count": sum(pages.values()), "pages": dict(pages.most_common(10))})
+        self.pageviews.clear()
+
+
+hub = DashboardHub()
+
+
+@bus.subscribe(ContactSubmitted, UserRegistered, ProjectUpdated, maxsize=SUBSCRIBER_QUEUE_SIZE)
+def on_domain_event(event):
+    if isinstance(event, ContactSubmitted):
+        hub.contact_created(event)
+    elif isinstance(event, UserRegistered):
+        hub.user_registered(event)
+    else:
+        hub.refresh()
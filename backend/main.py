@@ -2,19 +2,36 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, EmailStr
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import uvicorn
 from pathlib import Path
 
 # Import des routes
-from routers import auth, contact, projects, admin, email, analytics, chatbot, payment, social_auth, two_factor, newsletter, blog
+from routers import auth, contact, projects, admin, email, analytics, chatbot, payment, social_auth, two_factor, newsletter, blog, exports
 from database import init_db
+from rate_limit import RateLimitMiddleware, create_store
+from compression import CompressionMiddleware
+from config import settings
+from static_assets import PrecompressedStaticFiles, DIST_DIR
+import payment_events
+import events
+import jobs
+import analytics_olap
+import sketches
+import blog_static  # abonné aux événements du blog
+import i18n_bundles
+import tasks  # enregistre les tâches de fond dans jobs.TASKS
+import lazy
 
 # Initialisation de l'app FastAPI
 app = FastAPI(
     title="Vulsoft API",
     description="API moderne pour le site Vulsoft",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson : sérialisation native des datetime, nettement moins coûteuse que json.dumps
+    default_response_class=ORJSONResponse
 )
 
 # Modèle Pydantic pour la demande de réinitialisation
@@ -41,19 +58,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Limitation de débit sur les endpoints publics en écriture
+app.add_middleware(
+    RateLimitMiddleware,
+    store=create_store(settings.RATE_LIMIT_STORE),
+    enabled=settings.RATE_LIMIT_ENABLED,
+    trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+)
+
+# Compression brotli/gzip des réponses JSON, NDJSON, CSV...
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # Créer le répertoire d'uploads s'il n'existe pas
 UPLOADS_DIR = Path("uploads")
 UPLOADS_DIR.mkdir(exist_ok=True)
 
 # Servir les fichiers statiques (CSS, JS, images)
 app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
-app.mount("/", StaticFiles(directory="../", html=True), name="static")
 
 # Inclusion des routes
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(contact.router, prefix="/api/contact", tags=["Contact"])
 app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Administration"])
+app.include_router(exports.router, prefix="/api/admin/export", tags=["Administration"])
 app.include_router(email.router, prefix="/api/email", tags=["Email"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(chatbot.router, prefix="/api/chatbot", tags=["Chatbot"])
@@ -63,10 +96,49 @@ app.include_router(two_factor.router, prefix="/api/2fa", tags=["2FA"])
 app.include_router(newsletter.router, prefix="/api/newsletter", tags=["Newsletter"])
 app.include_router(blog.router, prefix="/api/blog", tags=["Blog"])
 
+def start_background(func):
+    """Lancer une fonction bloquante dans un thread sans retarder le démarrage ; la tâche est annulée à l'arrêt."""
+    task = asyncio.create_task(run_in_threadpool(func))
+    task.add_done_callback(_report_background_failure)
+    app.state.background_tasks.append(task)
+
+def _report_background_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Échec d'une tâche de démarrage: {task.exception()!r}")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialisation de la base de données au démarrage"""
     await init_db()
+    await events.bus.start(events.create_broker(settings.EVENT_BUS_BROKER, settings.EVENT_BUS_SOCKET_DIR))
+    payment_events.start_worker()
+    jobs.schedule_once("analytics.maintenance")
+    jobs.schedule_once("analytics.sessionize")
+    jobs.schedule_once("recommendations.rebuild")
+    analytics_olap.start_flusher()
+    sketches.start_flusher()
+    if settings.JOBS_EMBEDDED_WORKER:
+        jobs.start_embedded_worker(settings.JOBS_EMBEDDED_QUEUES.split(","))
+    # Première génération des pages du blog, hors du chemin de démarrage
+    app.state.background_tasks = []
+    start_background(blog_static.ensure_built)
+    start_background(i18n_bundles.ensure_built)
+    if settings.WARM_LAZY_MODULES:
+        # Ne retarde pas la disponibilité du worker
+        start_background(lazy.warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrêt propre des workers en tâche de fond"""
+    background_tasks = getattr(app.state, "background_tasks", [])
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await payment_events.stop_worker()
+    await jobs.stop_embedded_worker()
+    await analytics_olap.stop_flusher()
+    await sketches.stop_flusher()
+    await events.bus.stop()
 
 @app.get("/health")
 async def health_check():
@@ -104,5 +176,17 @@ async def reset_password(request: ResetPasswordRequest):
     # 3. Invalider le token.
     return {"message": "Votre mot de passe a été réinitialisé avec succès."}
 
+# Le site statique est monté en dernier : un montage sur "/" placé avant
+# les routes de l'API intercepterait /health et /api/*.
+# dist/ (python static_assets.py) contient les fichiers avec empreinte et précompressés.
+SITE_DIR = DIST_DIR if DIST_DIR.exists() else Path("../")
+# Pages du blog générées par blog_static.py
+blog_static.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/blog", PrecompressedStaticFiles(directory=blog_static.OUTPUT_DIR, html=True), name="blog")
+# Traductions par page générées par i18n_bundles.py
+i18n_bundles.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/i18n", PrecompressedStaticFiles(directory=i18n_bundles.OUTPUT_DIR), name="i18n")
+app.mount("/", PrecompressedStaticFiles(directory=SITE_DIR, html=True), name="static")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Traitement asynchrone des événements webhook Stripe.
+
+Le endpoint /api/payment/webhook se contente de vérifier la signature et
+d'insérer l'événement brut (dédupliqué sur event_id). Ce worker réclame
+ensuite les événements en attente un par un, applique le handler
+correspondant et replanifie les échecs avec un backoff exponentiel.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, StripeEvent, PaymentIntentRecord, CourseEnrollment
+
+MAX_ATTEMPTS = 8
+BATCH_SIZE = 20
+LOCK_SECONDS = 60
+IDLE_POLL_SECONDS = 5
+
+HANDLERS: Dict[str, Callable[[Session, dict], None]] = {}
+
+_wakeup: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+
+
+def handler(event_type: str):
+    """Enregistrer un handler pour un type d'événement Stripe."""
+    def decorator(func):
+        HANDLERS[event_type] = func
+        return func
+    return decorator
+
+
+def _update_intent_status(db: Session, intent: dict) -> Optional[PaymentIntentRecord]:
+    record = db.query(PaymentIntentRecord).filter(PaymentIntentRecord.stripe_id == intent["id"]).first()
+    if record:
+        record.status = intent.get("status", record.status)
+    return record
+
+
+@handler("payment_intent.succeeded")
+def on_payment_succeeded(db: Session, event: dict):
+    intent = event["data"]["object"]
+    record = _update_intent_status(db, intent)
+    course_id = (intent.get("metadata") or {}).get("course_id") or (record.course_id if record else None)
+    if not course_id:
+        return
+    # payment_intent_id est unique : un événement rejoué ne crée pas de double inscription
+    if not db.query(CourseEnrollment).filter(CourseEnrollment.payment_intent_id == intent["id"]).first():
+        db.add(CourseEnrollment(
+            user_id=record.user_id if record else None,
+            course_id=course_id,
+            payment_intent_id=intent["id"],
+        ))
+
+
+@handler("payment_intent.payment_failed")
+@handler("payment_intent.canceled")
+def on_payment_not_completed(db: Session, event: dict):
+    _update_intent_status(db, event["data"]["object"])
+
+
+def record_event(db: Session, event_id: str, event_type: str, payload: str) -> bool:
+    """Insérer un événement brut. Retourne False si event_id est déjà connu."""
+    if db.query(StripeEvent.id).filter(StripeEvent.event_id == event_id).first():
+        return False
+    db.add(StripeEvent(event_id=event_id, event_type=event_type, payload=payload))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Livraison concurrente du même événement
+        db.rollback()
+        return False
+    return True
+
+
+def _claim_next(db: Session) -> Optional[StripeEvent]:
+    """Réclamer atomiquement un événement dû (UPDATE conditionnel : un seul worker gagne)."""
+    now = datetime.utcnow()
+    candidates = db.query(StripeEvent.id).filter(
+        ((StripeEvent.status == "pending") & (StripeEvent.next_attempt_at <= now)) |
+        ((StripeEvent.status == "processing") & (StripeEvent.locked_until < now))
+    ).order_by(StripeEvent.id).limit(BATCH_SIZE).all()
+    for (event_pk,) in candidates:
+        claimed = db.query(StripeEvent).filter(
+            StripeEvent.id == event_pk,
+            ((StripeEvent.status == "pending") | ((StripeEvent.status == "processing") & (StripeEvent.locked_until < now)))
+        ).update({
+            StripeEvent.status: "processing",
+            StripeEvent.locked_until: now + timedelta(seconds=LOCK_SECONDS),
+            StripeEvent.attempts: StripeEvent.attempts + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.query(StripeEvent).filter(StripeEvent.id == event_pk).first()
+    return None
+
+
+def process_pending() -> int:
+    """Traiter tous les événements dus. Retourne le nombre d'événements traités."""
+    processed = 0
+    db = SessionLocal()
+    try:
+        while True:
+            stored = _claim_next(db)
+            if stored is None:
+                return processed
+            event_pk = stored.id
+            try:
+                func = HANDLERS.get(stored.event_type)
+                if func:
+                    func(db, json.loads(stored.payload))
+                stored.status = "processed"
+                stored.processed_at = datetime.utcnow()
+                stored.last_error = None
+            except Exception as e:
+                db.rollback()
+                stored = db.query(StripeEvent).filter(StripeEvent.id == event_pk).first()
+                stored.last_error = str(e)
+                if stored.attempts >= MAX_ATTEMPTS:
+                    stored.status = "failed"
+                else:
+                    stored.status = "pending"
+                    stored.next_attempt_at = datetime.utcnow() + timedelta(seconds=2 ** stored.attempts)
+            stored.locked_until = None
+            db.commit()
+            processed += 1
+    finally:
+        db.close()
+
+
+def notify():
+    """Réveiller le worker après l'insertion d'un événement."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _worker_loop():
+    while True:
+        try:
+            await run_in_threadpool(process_pending)
+        except Exception as e:
+            print(f"Erreur du worker Stripe: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_worker():
+    global _wakeup, _task
+    if _task is None:
+        _wakeup = asyncio.Event()
+        _task = asyncio.create_task(_worker_loop())
+
+
+async def stop_worker():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,85 @@
+"""
+Modèle de lecture des projets (table project_cards).
+
+Une ligne par projet avec tout ce qu'affiche la galerie : colonnes du projet,
+statut, URL de l'image principale et nombre d'images. `refresh()` la réécrit
+dans la transaction de chaque écriture (projet ou image) ; GET /api/projects
+la lit en une requête sur l'index (status, project_id), sans jointure ni
+chargement de Project.images.
+
+Image principale : celle marquée is_primary, sinon la première selon
+ProjectImage.position.
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Project, ProjectImage, ProjectCard
+
+CARD_FIELDS = ("title", "description", "technology", "client", "status", "created_at", "updated_at")
+
+
+def image_url(file_path: Optional[str]) -> Optional[str]:
+    """Chemin enregistré ("uploads/x.png") vers l'URL servie par le montage /uploads."""
+    if not file_path:
+        return None
+    return file_path if file_path.startswith(("http://", "https://", "/")) else "/" + file_path.replace("\\", "/")
+
+
+def primary_images(db: Session, project_id: Optional[int] = None) -> Dict[int, str]:
+    """{project_id: file_path} de l'image principale de chaque projet (ou d'un seul)."""
+    query = db.query(ProjectImage.project_id, ProjectImage.file_path).order_by(
+        ProjectImage.project_id, ProjectImage.is_primary.desc(), ProjectImage.position, ProjectImage.id
+    )
+    if project_id is not None:
+        query = query.filter(ProjectImage.project_id == project_id)
+    primaries: Dict[int, str] = {}
+    for owner, file_path in query:
+        primaries.setdefault(owner, file_path)
+    return primaries
+
+
+def refresh(db: Session, project_id: int):
+    """Réécrire la carte d'un projet (supprimée si le projet n'existe plus). Sans commit."""
+    db.flush()
+    project = db.query(Project).filter(Project.id == project_id).first()
+    card = db.query(ProjectCard).filter(ProjectCard.project_id == project_id).first()
+    if project is None:
+        if card is not None:
+            db.delete(card)
+        return
+    if card is None:
+        card = ProjectCard(project_id=project_id)
+        db.add(card)
+    for field in CARD_FIELDS:
+        setattr(card, field, getattr(project, field))
+    card.image_count = db.query(func.count(ProjectImage.id)).filter(ProjectImage.project_id == project_id).scalar()
+    card.primary_image_url = image_url(primary_images(db, project_id).get(project_id))
+
+
+def rebuild(db: Session) -> int:
+    """Recalculer toutes les cartes en trois requêtes."""
+    counts = dict(db.query(ProjectImage.project_id, func.count(ProjectImage.id)).group_by(ProjectImage.project_id))
+    primaries = primary_images(db)
+    db.query(ProjectCard).delete()
+    projects = db.query(Project.id, *(getattr(Project, field) for field in CARD_FIELDS)).all()
+    db.add_all(ProjectCard(
+        project_id=row.id,
+        **{field: getattr(row, field) for field in CARD_FIELDS},
+        image_count=counts.get(row.id, 0),
+        primary_image_url=image_url(primaries.get(row.id)),
+    ) for row in projects)
+    db.commit()
+    return len(projects)
+
+
+def ensure_built():
+    """Au démarrage : construire les cartes si des projets n'en ont pas (table ajoutée après coup)."""
+    db = SessionLocal()
+    try:
+        if db.query(func.count(Project.id)).scalar() != db.query(func.count(ProjectCard.project_id)).scalar():
+            print(f"Cartes de projets reconstruites : {rebuild(db)}")
+    finally:
+        db.close()
@@ -0,0 +1,251 @@
+"""
+Limitation de débit (token bucket) pour les endpoints publics en écriture.
+
+Chaque route protégée a sa politique (débit, rafale, clé : ip / session / user).
+Les compteurs sont tenus dans un store en mémoire découpé en shards, ou dans
+un store SQLite partagé quand plusieurs workers tournent sur la même machine.
+
+Les clés ne dépendent que de ce que le client ne peut pas choisir : l'adresse
+de la connexion (X-Forwarded-For n'est lu que si elle vient d'un proxy de
+RATE_LIMIT_TRUSTED_PROXIES) et l'utilisateur d'un JWT dont la signature est
+vérifiée. Sans utilisateur vérifié, les politiques "session" et "user"
+retombent sur l'adresse IP.
+"""
+
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from lazy import lazy_import
+
+jose_jwt = lazy_import("jose.jwt")
+
+
+@dataclass(frozen=True)
+class Policy:
+    rate: float      # jetons rechargés par seconde
+    burst: int       # capacité du seau
+    key: str = "ip"  # "ip", "session" ou "user"
+
+
+# Politiques par (méthode, chemin)
+DEFAULT_POLICIES: Dict[Tuple[str, str], Policy] = {
+    ("POST", "/api/contact/submit"): Policy(rate=1 / 60, burst=3),
+    ("POST", "/api/newsletter/subscribe"): Policy(rate=1 / 60, burst=3),
+    ("POST", "/api/analytics/track"): Policy(rate=5, burst=30, key="session"),
+    ("POST", "/api/auth/register"): Policy(rate=1 / 300, burst=3),
+    ("POST", "/api/auth/token"): Policy(rate=1 / 30, burst=5),
+    ("POST", "/api/chatbot/chat"): Policy(rate=1 / 6, burst=5, key="user"),
+}
+
+
+class RateLimitStore(ABC):
+    """Interface d'un store : consomme un jeton et retourne (autorisé, secondes avant réessai)."""
+
+    # True si consume() fait des E/S : le middleware l'appelle alors dans un thread
+    blocking = False
+
+    @abstractmethod
+    def consume(self, key: str, policy: Policy, now: float) -> Tuple[bool, float]:
+        ...
+
+
+class MemoryStore(RateLimitStore):
+    """Store en mémoire découpé en shards pour limiter la contention des verrous."""
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self.max_keys = max_keys_per_shard
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def consume(self, key, policy, now):
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            tokens, updated = buckets.pop(key, (float(policy.burst), now))
+            tokens = min(policy.burst, tokens + (now - updated) * policy.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+            # Éviction LRU en O(1) : les clés les moins récentes sortent en premier
+            if len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / policy.rate
+
+
+class SQLiteStore(RateLimitStore):
+    """Store partagé entre workers via un fichier SQLite (une ligne par seau)."""
+
+    blocking = True
+    # Un seau inactif depuis plus longtemps est plein (la plus lente des
+    # politiques, l'inscription, se recharge en 15 min) : sa ligne est inutile
+    IDLE_SECONDS = 3600
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._pruned_at = 0.0
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_updated ON rate_limit_buckets (updated)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, policy, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (float(policy.burst), now)
+            tokens = min(policy.burst, tokens + (now - updated) * policy.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if now - self._pruned_at > self.PRUNE_INTERVAL_SECONDS:
+            self._pruned_at = now
+            self.prune(now)
+        return allowed, 0.0 if allowed else (1 - tokens) / policy.rate
+
+    def prune(self, now: float) -> int:
+        """Supprimer les seaux inactifs (pleins de toute façon)."""
+        cursor = self._connect().execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.IDLE_SECONDS,))
+        return cursor.rowcount
+
+
+def create_store(url: str) -> RateLimitStore:
+    """'memory' ou 'sqlite:///chemin/vers/fichier.db'."""
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    return MemoryStore()
+
+
+# Compteurs exposés à l'admin : {chemin: {"allowed": n, "rejected": n}}
+stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"allowed": 0, "rejected": 0})
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def parse_networks(values: Iterable[str]):
+    """Adresses ou réseaux CIDR des proxies de confiance."""
+    return [ipaddress.ip_network(value.strip(), strict=False) for value in values if value.strip()]
+
+
+def _is_trusted(address: str, trusted) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_ip(scope, trusted_proxies=()) -> str:
+    """
+    Adresse du client. X-Forwarded-For n'est lu que si la connexion vient d'un
+    proxy de confiance ; on remonte alors la chaîne depuis la droite jusqu'au
+    premier saut qui n'en est pas un (les entrées de gauche sont du client).
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not trusted_proxies or not _is_trusted(address, trusted_proxies):
+        return address
+    forwarded = _header(scope, b"x-forwarded-for")
+    if not forwarded:
+        return address
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    return hops[0] if hops else address
+
+
+def jwt_user(scope) -> Optional[str]:
+    """Utilisateur (`sub`) d'un jeton Bearer à la signature valide, sinon None."""
+    auth = _header(scope, b"authorization")
+    secret = os.getenv("JWT_SECRET_KEY")
+    if not auth or not secret or not auth.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jose_jwt.decode(auth[7:].strip(), secret, algorithms=[os.getenv("JWT_ALGORITHM", "HS256")])
+    except Exception:
+        return None
+    subject = payload.get("sub")
+    return str(subject) if subject else None
+
+
+def client_key(scope, policy: Policy, trusted_proxies=(), identify: Callable = jwt_user) -> str:
+    """Identifier le client selon la politique : utilisateur vérifié, sinon adresse IP."""
+    if policy.key in ("user", "session"):
+        user = identify(scope)
+        if user:
+            return "user:" + user
+    return "ip:" + client_ip(scope, trusted_proxies)
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI : une recherche de politique et une opération de seau par requête."""
+
+    def __init__(self, app, store: Optional[RateLimitStore] = None, policies=None, enabled: bool = True,
+                 trusted_proxies: Iterable[str] = (), identify: Callable = jwt_user):
+        self.app = app
+        self.store = store or MemoryStore()
+        self.policies = policies if policies is not None else DEFAULT_POLICIES
+        self.enabled = enabled
+        self.trusted_proxies = parse_networks(trusted_proxies)
+        self.identify = identify
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"].rstrip("/") or "/"
+        policy = self.policies.get((scope["method"], path))
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        key = f"{path}|{client_key(scope, policy, self.trusted_proxies, self.identify)}"
+        if self.store.blocking:
+            allowed, retry_after = await run_in_threadpool(self.store.consume, key, policy, time.time())
+        else:
+            allowed, retry_after = self.store.consume(key, policy, time.time())
+        if allowed:
+            stats[path]["allowed"] += 1
+            return await self.app(scope, receive, send)
+
+        stats[path]["rejected"] += 1
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": "Trop de requêtes. Veuillez réessayer plus tard."},
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+        await response(scope, receive, send)
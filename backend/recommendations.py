@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Contenus similaires (articles et projets) par TF-IDF.
+
+Chaque article publié et chaque projet devient un vecteur TF-IDF (tf
+logarithmique, idf lissé, norme L2) ; la similarité cosinus est alors un
+simple produit scalaire. Les TOP_K voisins de chaque document sont
+précalculés dans la table related_items : /api/blog/posts/{slug}/related
+n'est qu'une lecture indexée.
+
+    - reconstruction complète (tâche quotidienne `recommendations.rebuild`) :
+      nouveau vocabulaire et nouvel idf, produit matriciel creux X·Xᵀ par
+      blocs de lignes (NumPy/SciPy) ;
+    - après une écriture (tâche `recommendations.refresh`, enregistrée dans la
+      transaction de l'écriture par `enqueue_refresh`) : le modèle gardé en
+      mémoire par le worker n'est pas reconstruit. Seul le texte des documents
+      modifiés depuis sa dernière synchronisation est relu et revectorisé avec
+      l'idf courant (un terme inconnu reçoit l'idf d'un terme rare) ; seules
+      la ligne du document et celles des documents dont il entre ou sort du
+      top-k sont recalculées. Le reste attend la reconstruction suivante.
+
+Sans NumPy/SciPy, les mêmes calculs se font sur des vecteurs creux en dict.
+Ils sont importés au premier calcul, pas au démarrage de l'API.
+
+Usage (depuis backend/):
+    python recommendations.py rebuild
+"""
+
+import argparse
+import math
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, BlogPost, Project, RelatedItem
+from retrieval import tokenize, strip_html
+from lazy import lazy_import, is_available
+import jobs
+
+# numpy/scipy sont optionnels (produits scalaires en Python) et chargés au premier calcul
+np = lazy_import("numpy")
+sparse = lazy_import("scipy.sparse")
+HAS_NUMPY = is_available("numpy") and is_available("scipy")
+
+TOP_K = 6
+MIN_SCORE = 0.05
+# Lignes de la matrice de similarité calculées à la fois
+BLOCK_ROWS = 512
+TITLE_WEIGHT = 3
+# Marge sur updated_at lors de la synchronisation (écritures concurrentes)
+SYNC_MARGIN = timedelta(seconds=5)
+
+Key = Tuple[str, int]
+
+_model: Optional["Model"] = None
+_model_lock = threading.Lock()
+
+
+def documents(db: Session, since: Optional[datetime] = None, keys: Iterable[Key] = ()) -> Dict[Key, str]:
+    """
+    Texte de chaque document recommandable ; le titre compte TITLE_WEIGHT fois.
+    Avec `since` ou `keys`, seulement les documents modifiés depuis `since` ou désignés.
+    """
+    keys = set(keys)
+    partial = since is not None or bool(keys)
+
+    def restrict(query, model, kind):
+        if not partial:
+            return query
+        ids = [item_id for key_kind, item_id in keys if key_kind == kind]
+        conditions = [model.id.in_(ids)] if ids else []
+        if since is not None:
+            conditions.append(model.updated_at >= since)
+        return query.filter(conditions[0] if len(conditions) == 1 else conditions[0] | conditions[1])
+
+    docs: Dict[Key, str] = {}
+    posts = db.query(BlogPost.id, BlogPost.title, BlogPost.content_html, BlogPost.content).filter(
+        BlogPost.is_published == True
+    )
+    for post_id, title, content_html, content in restrict(posts, BlogPost, "post"):
+        docs[("post", post_id)] = " ".join([title or ""] * TITLE_WEIGHT + [strip_html(content_html or content or "")])
+    projects = db.query(Project.id, Project.title, Project.description, Project.technology)
+    for project_id, title, description, technology in restrict(projects, Project, "project"):
+        docs[("project", project_id)] = " ".join([title or ""] * TITLE_WEIGHT + [description or "", technology or ""])
+    return docs
+
+
+def live_keys(db: Session) -> set:
+    """Identifiants des documents recommandables, sans leur texte."""
+    keys = {("post", post_id) for (post_id,) in db.query(BlogPost.id).filter(BlogPost.is_published == True)}
+    keys.update(("project", project_id) for (project_id,) in db.query(Project.id))
+    return keys
+
+
+class Model:
+    """Vecteurs TF-IDF normalisés de tous les documents, modifiables ligne par ligne."""
+
+    def __init__(self, docs: Dict[Key, str]):
+        self.keys: List[Key] = list(docs)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        counts = [Counter(tokenize(text)) for text in docs.values()]
+        document_frequency = Counter(term for count in counts for term in count)
+        self.vocabulary = {term: i for i, term in enumerate(document_frequency)}
+        self.total = len(counts)
+        self.idf = {term: math.log((1 + self.total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.vectors: List[Dict[int, float]] = [self._weigh(count) for count in counts]
+        self.synced_at: Optional[datetime] = None
+        self.matrix = None
+        if HAS_NUMPY:
+            rows = [i for i, vector in enumerate(self.vectors) for _ in vector]
+            cols = [term for vector in self.vectors for term in vector]
+            data = [w for vector in self.vectors for w in vector.values()]
+            self.matrix = sparse.csr_matrix((data, (rows, cols)), shape=(self.total, len(self.vocabulary)),
+                                            dtype=np.float32)
+
+    def _weigh(self, count: Counter) -> Dict[int, float]:
+        weights = {}
+        for term, tf in count.items():
+            if term not in self.vocabulary:
+                # Terme apparu depuis la reconstruction : idf d'un terme présent dans un seul document
+                self.vocabulary[term] = len(self.vocabulary)
+                self.idf[term] = math.log((1 + self.total) / 2) + 1
+            weights[self.vocabulary[term]] = (1 + math.log(tf)) * self.idf[term]
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    def contains(self, key: Key) -> bool:
+        return key in self.index and bool(self.vectors[self.index[key]])
+
+    def set(self, key: Key, text: Optional[str]):
+        """Revectoriser un document (None : retiré, sa ligne devient nulle jusqu'à la reconstruction)."""
+        vector = self._weigh(Counter(tokenize(text))) if text else {}
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.vectors.append(vector)
+        else:
+            self.vectors[row] = vector
+        if self.matrix is not None:
+            line = sparse.csr_matrix((list(vector.values()), ([0] * len(vector), list(vector))),
+                                     shape=(1, len(self.vocabulary)), dtype=np.float32)
+            matrix = self.matrix
+            if matrix.shape[1] < len(self.vocabulary):
+                matrix.resize((matrix.shape[0], len(self.vocabulary)))
+            parts = [matrix[:row], line] + ([matrix[row + 1:]] if row + 1 < matrix.shape[0] else [])
+            self.matrix = sparse.vstack(parts, format="csr")
+
+    def similarities(self, rows: Sequence[int]):
+        """Scores cosinus des lignes `rows` contre tous les documents (len(rows) x N)."""
+        if self.matrix is not None:
+            return (self.matrix[list(rows)] @ self.matrix.T).toarray()
+        result = []
+        for row in rows:
+            vector = self.vectors[row]
+            result.append([
+                sum(w * other.get(term, 0.0) for term, w in vector.items()) if len(vector) <= len(other)
+                else sum(w * vector.get(term, 0.0) for term, w in other.items())
+                for other in self.vectors
+            ])
+        return result
+
+    def top_k(self, row: int, scores, k: int = TOP_K) -> List[Tuple[Key, float]]:
+        if self.matrix is not None:
+            scores = np.asarray(scores, dtype=np.float32).copy()
+            scores[row] = -1
+            candidates = np.argpartition(-scores, min(k, len(scores) - 1))[:k] if len(scores) > k else np.arange(len(scores))
+            ranked = sorted(((int(i), float(scores[i])) for i in candidates), key=lambda item: item[1], reverse=True)
+        else:
+            ranked = sorted(((i, s) for i, s in enumerate(scores) if i != row), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.keys[i], round(score, 4)) for i, score in ranked if score >= MIN_SCORE]
+
+
+def current_model(db: Session) -> Model:
+    """
+    Modèle du worker, construit une fois puis synchronisé : documents modifiés
+    (updated_at) ou supprimés depuis la dernière synchronisation, y compris par
+    un autre worker. Les textes inchangés ne sont ni relus ni retokenisés.
+    """
+    global _model
+    now = datetime.utcnow()
+    if _model is None:
+        _model = Model(documents(db))
+    else:
+        live = live_keys(db)
+        for key in list(_model.index):
+            if key not in live and _model.contains(key):
+                _model.set(key, None)
+        added = live - set(_model.index)
+        for key, text in documents(db, since=_model.synced_at - SYNC_MARGIN, keys=added).items():
+            _model.set(key, text)
+    _model.synced_at = now
+    return _model
+
+
+def _replace(db: Session, source: Key, neighbours: List[Tuple[Key, float]]):
+    db.query(RelatedItem).filter(RelatedItem.source_type == source[0], RelatedItem.source_id == source[1]).delete()
+    db.add_all(RelatedItem(source_type=source[0], source_id=source[1], target_type=target[0], target_id=target[1],
+                           score=score, rank=rank) for rank, (target, score) in enumerate(neighbours))
+
+
+def _recompute(db: Session, model: Model, rows: Sequence[int]):
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = rows[start:start + BLOCK_ROWS]
+        for row, scores in zip(block, model.similarities(block)):
+            _replace(db, model.keys[row], model.top_k(row, scores))
+
+
+def rebuild(db: Session) -> int:
+    """Recalculer tous les voisins (une transaction) ; le modèle reconstruit devient celui du worker."""
+    global _model
+    with _model_lock:
+        model = Model(documents(db))
+        model.synced_at = datetime.utcnow()
+        db.query(RelatedItem).delete()
+        _recompute(db, model, range(len(model.keys)))
+        db.commit()
+        _model = model
+    return len(model.keys)
+
+
+def refresh(db: Session, kind: str, item_id: int) -> int:
+    """
+    Après l'écriture d'un document : recalculer sa ligne et celles des documents
+    dont le top-k change (il y entre, y change de score ou en sort). Renvoie le
+    nombre de lignes recalculées.
+    """
+    key = (kind, item_id)
+    with _model_lock:
+        model = current_model(db)
+        # Le document lui-même, même si updated_at n'a pas bougé (dépublication)
+        model.set(key, documents(db, keys=[key]).get(key))
+
+        # Documents qui le citent : il y change de score ou en sort
+        affected = {model.index[(source_type, source_id)] for source_type, source_id in db.query(
+            RelatedItem.source_type, RelatedItem.source_id
+        ).filter(RelatedItem.target_type == kind, RelatedItem.target_id == item_id)
+            if (source_type, source_id) in model.index}
+        if not model.contains(key):
+            # Supprimé ou dépublié : il n'a plus de voisins et disparaît de ceux des autres
+            db.query(RelatedItem).filter(RelatedItem.source_type == kind, RelatedItem.source_id == item_id).delete()
+        else:
+            row = model.index[key]
+            affected.add(row)
+            candidates = {other: float(score) for other, score in enumerate(model.similarities([row])[0])
+                          if other != row and score >= MIN_SCORE}
+            # Documents dont il peut entrer dans le top-k : moins de TOP_K voisins ou un plus faible que lui
+            weakest = {}
+            for candidate_kind in ("post", "project"):
+                ids = [model.keys[other][1] for other in candidates if model.keys[other][0] == candidate_kind]
+                for chunk in range(0, len(ids), BLOCK_ROWS):
+                    weakest.update(((candidate_kind, source_id), (count, lowest)) for source_id, count, lowest in db.query(
+                        RelatedItem.source_id, func.count(), func.min(RelatedItem.score)
+                    ).filter(RelatedItem.source_type == candidate_kind,
+                             RelatedItem.source_id.in_(ids[chunk:chunk + BLOCK_ROWS])).group_by(RelatedItem.source_id))
+            for other, score in candidates.items():
+                count, lowest = weakest.get(model.keys[other], (0, 0.0))
+                if count < TOP_K or score > lowest:
+                    affected.add(other)
+        _recompute(db, model, sorted(affected))
+        db.commit()
+    return len(affected)
+
+
+def related(db: Session, kind: str, item_id: int, limit: int = TOP_K) -> List[dict]:
+    """Voisins précalculés d'un document, avec de quoi afficher une carte."""
+    rows = db.query(RelatedItem.target_type, RelatedItem.target_id, RelatedItem.score).filter(
+        RelatedItem.source_type == kind, RelatedItem.source_id == item_id
+    ).order_by(RelatedItem.rank).limit(limit).all()
+    post_ids = [target_id for target_type, target_id, _ in rows if target_type == "post"]
+    project_ids = [target_id for target_type, target_id, _ in rows if target_type == "project"]
+    posts = {row.id: row for row in db.query(BlogPost.id, BlogPost.slug, BlogPost.title, BlogPost.excerpt).filter(
+        BlogPost.id.in_(post_ids))} if post_ids else {}
+    projects = {row.id: row for row in db.query(Project.id, Project.title, Project.description).filter(
+        Project.id.in_(project_ids))} if project_ids else {}
+    items = []
+    for target_type, target_id, score in rows:
+        if target_type == "post" and target_id in posts:
+            post = posts[target_id]
+            items.append({"type": "post", "id": post.id, "slug": post.slug, "title": post.title,
+                          "excerpt": post.excerpt, "url": f"/blog/{post.slug}.html", "score": score})
+        elif target_type == "project" and target_id in projects:
+            project = projects[target_id]
+            items.append({"type": "project", "id": project.id, "title": project.title,
+                          "excerpt": (project.description or "")[:160],
+                          "url": f"/project-details.html?id={project.id}", "score": score})
+    return items
+
+
+def enqueue_refresh(db: Session, kind: str, item_ids: Iterable[int]):
+    """
+    Enregistrer le recalcul dans la transaction de l'écriture (appelé avant son
+    commit, que fait l'appelant) : une écriture validée a toujours sa tâche.
+    """
+    jobs.enqueue_many("recommendations.refresh", [{"kind": kind, "item_id": item_id} for item_id in item_ids], db=db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        print(f"✅ Voisins recalculés pour {rebuild(db)} document(s)" + ("" if HAS_NUMPY else " (sans numpy)"))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
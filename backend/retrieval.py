@@ -0,0 +1,294 @@
+"""
+Index de recherche local (BM25) pour le chatbot.
+
+Découpe le contenu des articles de blog, des pages de cours et des
+catalogues i18n (fr/en/zh.json) en passages, puis les indexe en mémoire
+pour injecter les passages les plus pertinents dans les prompts.
+"""
+
+import html
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from events import bus, PostPublished, PostDeleted
+
+# Racine du site statique (servie par main.py depuis "../")
+SITE_ROOT = Path(__file__).resolve().parent.parent
+
+COURSE_PAGES = ["cours.html", "course-details.html", "academie.html"]
+I18N_FILES = ["fr.json", "en.json", "zh.json"]
+
+# Paramètres BM25 classiques
+K1 = 1.5
+B = 0.75
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 20
+
+STOPWORDS = {
+    "le", "la", "les", "de", "des", "du", "un", "une", "et", "ou", "en", "au", "aux",
+    "a", "à", "est", "pour", "par", "sur", "dans", "que", "qui", "ce", "ces", "se",
+    "ne", "pas", "plus", "vous", "nous", "il", "elle", "on", "je", "tu", "son", "sa",
+    "ses", "vos", "votre", "notre", "nos", "avec", "d", "l", "s", "c", "j", "qu", "n",
+    "the", "of", "and", "or", "to", "in", "is", "are", "for", "on", "with", "an",
+    "it", "this", "that", "be", "as", "by", "at", "from", "your", "you", "we", "our",
+}
+
+_TAG_RE = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.S | re.I)
+_WORD_RE = re.compile(r"\w+", re.U)
+_CJK_RE = re.compile(r"[一-鿿]")
+
+
+@dataclass
+class Passage:
+    id: int
+    source: str  # "blog", "course", "i18n"
+    ref: str     # slug, nom de page ou clé i18n
+    title: str
+    text: str
+
+
+def strip_html(raw: str) -> str:
+    """Retirer les balises HTML et normaliser les espaces."""
+    text = _TAG_RE.sub(" ", raw or "")
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+
+def _fold(token: str) -> str:
+    """Supprimer les accents pour que 'sécurité' et 'securite' se rejoignent."""
+    decomposed = unicodedata.normalize("NFKD", token)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Découper un texte en termes indexables (minuscules, sans accents, sans mots vides)."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if _CJK_RE.search(word):
+            # Pas d'espaces en chinois : on indexe les caractères un par un
+            tokens.extend(ch for ch in word if _CJK_RE.match(ch))
+            continue
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        tokens.append(_fold(word))
+    return tokens
+
+
+def chunk_text(text: str, max_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Découper un texte en passages de taille bornée avec chevauchement."""
+    words = text.split()
+    if len(words) <= max_words:
+        return [text] if words else []
+    step = max(1, max_words - overlap)
+    return [" ".join(words[i:i + max_words]) for i in range(0, len(words) - overlap, step)]
+
+
+class BM25Index:
+    """Index inversé BM25 en mémoire, mis à jour de façon incrémentale par groupe de passages."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._next_id = 0
+        self.passages: Dict[int, Passage] = {}
+        self.doc_len: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.groups: Dict[str, List[int]] = {}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.passages)
+
+    def _add(self, passage: Passage, terms: List[str]):
+        self.passages[passage.id] = passage
+        self.doc_len[passage.id] = len(terms)
+        self.total_len += len(terms)
+        for term, tf in Counter(terms).items():
+            self.postings[term][passage.id] = tf
+
+    def _remove(self, passage_id: int):
+        passage = self.passages.pop(passage_id, None)
+        if passage is None:
+            return
+        self.total_len -= self.doc_len.pop(passage_id, 0)
+        for term in set(tokenize(passage.title + " " + passage.text)):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(passage_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def replace_group(self, key: str, source: str, ref: str, title: str, chunks: Iterable[str]):
+        """Remplacer tous les passages d'un document (article, page, catalogue)."""
+        with self._lock:
+            for passage_id in self.groups.pop(key, []):
+                self._remove(passage_id)
+            ids = []
+            for chunk in chunks:
+                terms = tokenize(title + " " + chunk)
+                if not terms:
+                    continue
+                passage = Passage(self._next_id, source, ref, title, chunk)
+                self._next_id += 1
+                self._add(passage, terms)
+                ids.append(passage.id)
+            if ids:
+                self.groups[key] = ids
+
+    def remove_group(self, key: str):
+        with self._lock:
+            for passage_id in self.groups.pop(key, []):
+                self._remove(passage_id)
+
+    def search(self, query: str, k: int = 3) -> List[Passage]:
+        """Retourner les k passages les plus pertinents pour la requête."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.passages)
+            if not n or not terms:
+                return []
+            avg_len = self.total_len / n
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for passage_id, tf in docs.items():
+                    norm = K1 * (1 - B + B * self.doc_len[passage_id] / avg_len)
+                    scores[passage_id] += idf * tf * (K1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [self.passages[passage_id] for passage_id, _ in best]
+
+
+index = BM25Index()
+_built = False
+_build_lock = threading.Lock()
+# Fichier statique -> (mtime_ns, taille) lors de sa dernière indexation, et ses groupes
+_static_signatures: Dict[str, tuple] = {}
+_static_groups: Dict[str, Set[str]] = {}
+
+
+def _flatten_i18n(data, prefix: str = ""):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten_i18n(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, str):
+        yield prefix, data
+
+
+def index_post(post):
+    """Indexer (ou réindexer) un article de blog. Les brouillons sont retirés de l'index."""
+    index_blog_entry(post.id, post.slug, post.title, post.content, post.is_published)
+
+
+def index_blog_entry(post_id: int, slug: str, title: str, content: Optional[str], is_published: bool):
+    key = f"blog:{post_id}"
+    if not is_published:
+        index.remove_group(key)
+        return
+    index.replace_group(key, "blog", slug, title, chunk_text(strip_html(content or "")))
+
+
+def remove_post(post_id: int):
+    index.remove_group(f"blog:{post_id}")
+
+
+@bus.subscribe(PostPublished, PostDeleted)
+def on_post_event(event):
+    """Tenir l'index à jour dans chaque worker (scope ALL)."""
+    if isinstance(event, PostDeleted):
+        remove_post(event.post_id)
+    else:
+        index_blog_entry(event.post_id, event.slug, event.title, event.content, event.is_published)
+
+
+def _static_groups_of(path: Path) -> Dict[str, tuple]:
+    """{clé de groupe: (source, ref, titre, passages)} d'une page de cours ou d'un catalogue i18n."""
+    name = path.name
+    if name in COURSE_PAGES:
+        text = strip_html(path.read_text(encoding="utf-8", errors="ignore"))
+        return {f"course:{name}": ("course", name, name, chunk_text(text))}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+    # Une section de premier niveau (nav, pricing, academy...) = un document
+    sections: Dict[str, List[str]] = defaultdict(list)
+    for key, value in _flatten_i18n(data):
+        sections[key.split(".")[0]].append(strip_html(value))
+    return {f"i18n:{name}:{section}": ("i18n", f"{name}:{section}", section, chunk_text(" ".join(values)))
+            for section, values in sections.items()}
+
+
+def index_static_content(site_root: Path = SITE_ROOT) -> int:
+    """
+    Indexer les pages de cours et les chaînes i18n du site. Seuls les fichiers
+    modifiés (mtime, taille) depuis leur dernière indexation sont relus ; les
+    groupes d'un fichier supprimé ou d'une section disparue sont retirés.
+    Retourne le nombre de fichiers réindexés.
+    """
+    changed = 0
+    for name in COURSE_PAGES + I18N_FILES:
+        path = site_root / name
+        try:
+            stat = path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if _static_signatures.get(name) == signature:
+            continue
+        groups = _static_groups_of(path) if signature is not None else {}
+        for key in _static_groups.get(name, set()) - set(groups):
+            index.remove_group(key)
+        for key, (source, ref, title, chunks) in groups.items():
+            index.replace_group(key, source, ref, title, chunks)
+        _static_groups[name] = set(groups)
+        _static_signatures[name] = signature
+        changed += 1
+    return changed
+
+
+def build_index(db, force: bool = False):
+    """
+    Construire l'index complet au premier appel (ou si force=True), puis
+    rafraîchir les pages de cours et les catalogues i18n modifiés depuis.
+    Les articles sont tenus à jour par on_post_event. Lit des fichiers et la
+    base : à appeler hors de la boucle d'événements.
+    """
+    global _built
+    with _build_lock:
+        if _built and not force:
+            index_static_content()
+            return index
+        from database import BlogPost
+
+        if force:
+            _static_signatures.clear()
+        index_static_content()
+        for post in db.query(BlogPost).filter(BlogPost.is_published == True).all():
+            index_post(post)
+        _built = True
+    return index
+
+
+def build_context(passages: List[Passage], max_chars: int = 1500) -> Optional[str]:
+    """Formater les passages retenus en un bloc de contexte compact pour le prompt."""
+    if not passages:
+        return None
+    lines, used = [], 0
+    for passage in passages:
+        line = f"[{passage.source}:{passage.ref}] {passage.text}"
+        if used + len(line) > max_chars:
+            line = line[:max(0, max_chars - used)]
+        if not line:
+            break
+        lines.append(line)
+        used += len(line)
+    return "\n".join(lines)
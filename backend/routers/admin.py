@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
 
-from .. import database, security
+from .. import database, security, rate_limit, compression, live, events, jobs, analytics_olap, sketches, sessionization, ingestion
 
 router = APIRouter()
 
@@ -50,6 +53,59 @@ class ProjectAdmin(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class BulkIds(BaseModel):
+    ids: List[int]
+
+class BulkStatusUpdate(BulkIds):
+    status: str
+
+class BulkActiveUpdate(BulkIds):
+    is_active: bool
+
+VALID_MESSAGE_STATUSES = ["nouveau", "lu", "traité", "archivé"]
+
+# Taille des clauses IN (limite de paramètres SQLite)
+BULK_CHUNK_SIZE = 500
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), BULK_CHUNK_SIZE):
+        yield ids[i:i + BULK_CHUNK_SIZE]
+
+def apply_bulk(db: Session, model, ids: List[int], values: Optional[dict] = None, skip: Optional[dict] = None):
+    """
+    Met à jour (values) ou supprime (values=None) les lignes `ids` dans une seule
+    transaction, avec une requête par tranche d'identifiants plutôt qu'une par ligne.
+    Retourne un résultat par identifiant demandé.
+    """
+    ids = list(dict.fromkeys(ids))
+    skip = skip or {}
+    existing = set()
+    for chunk in _chunks(ids):
+        existing.update(row_id for (row_id,) in db.query(model.id).filter(model.id.in_(chunk)))
+
+    targets = [row_id for row_id in ids if row_id in existing and row_id not in skip]
+    try:
+        for chunk in _chunks(targets):
+            query = db.query(model).filter(model.id.in_(chunk))
+            if values is None:
+                query.delete(synchronize_session=False)
+            else:
+                query.update(values, synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Erreur lors de l'opération groupée")
+
+    results = []
+    for row_id in ids:
+        if row_id in skip:
+            results.append({"id": row_id, "success": False, "error": skip[row_id]})
+        elif row_id in existing:
+            results.append({"id": row_id, "success": True})
+        else:
+            results.append({"id": row_id, "success": False, "error": "introuvable"})
+    return {"success": True, "processed": len(targets), "results": results}
+
 # Middleware pour vérifier les droits admin
 def verify_admin(current_user: database.User = Depends(security.get_current_user)):
     user = current_user
@@ -60,40 +116,29 @@ def verify_admin(current_user: database.User = Depends(security.get_current_user
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(db: Session = Depends(database.get_db), admin: database.User = Depends(verify_admin)):
     """Obtenir les statistiques générales pour l'admin"""
-    
-    # Statistiques utilisateurs
-    total_users = db.query(User).count()
-    today = datetime.utcnow().date()
-    new_users_today = db.query(User).filter(
-        func.date(User.created_at) == today
-    ).count()
-    
-    # Statistiques messages
-    total_messages = db.query(ContactMessage).count()
-    unread_messages = db.query(ContactMessage).filter(
-        ContactMessage.status == "nouveau"
-    ).count()
-    
-    # Statistiques projets
-    total_projects = db.query(Project).count()
-    active_projects = db.query(Project).filter(
-        Project.status == "en_cours"
-    ).count()
-    completed_projects = db.query(Project).filter(
-        Project.status == "terminé"
-    ).count()
-    
-    completion_rate = (completed_projects / total_projects * 100) if total_projects > 0 else 0
-    
-    return AdminStats(
-        total_users=total_users,
-        new_users_today=new_users_today,
-        total_messages=total_messages,
-        unread_messages=unread_messages,
-        total_projects=total_projects,
-        active_projects=active_projects,
-        completion_rate=completion_rate
-    )
+    return AdminStats(**live.collect_stats(db))
+
+@router.get("/stream")
+async def stream_dashboard(request: Request, admin: database.User = Depends(verify_admin)):
+    """
+    Flux Server-Sent Events du tableau de bord : un instantané des statistiques,
+    puis les deltas (messages, inscriptions, pages vues) au fil des écritures.
+    """
+    async def events():
+        async with live.hub.subscribe() as queue:
+            yield live.format_sse("snapshot", await live.hub.snapshot())
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=live.KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield live.format_sse(message["event"], message)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 @router.get("/users", response_model=List[UserAdmin])
 async def get_users(
@@ -105,7 +150,11 @@ async def get_users(
 ):
     """Lister tous les utilisateurs"""
     
-    query = db.query(database.User)
+    User = database.User
+    query = db.query(
+        User.id, User.username, User.email, User.full_name,
+        User.is_active, User.is_admin, User.created_at
+    )
     
     if search:
         query = query.filter(
@@ -114,8 +163,8 @@ async def get_users(
             (User.full_name.contains(search))
         )
     
-    users = query.order_by(desc(User.created_at)).offset(skip).limit(limit).all()
-    return users
+    rows = query.order_by(desc(User.created_at)).offset(skip).limit(limit).all()
+    return ORJSONResponse([row._asdict() for row in rows])
 
 @router.put("/users/{user_id}/toggle-admin")
 async def toggle_user_admin(
@@ -151,6 +200,16 @@ async def toggle_user_active(
     
     return {"success": True, "message": f"Utilisateur {'activé' if user.is_active else 'désactivé'}"}
 
+@router.post("/users/bulk-active")
+async def bulk_set_users_active(
+    update: BulkActiveUpdate,
+    db: Session = Depends(database.get_db),
+    admin: database.User = Depends(verify_admin)
+):
+    """Activer/désactiver plusieurs utilisateurs en une requête"""
+    skip = {admin.id: "impossible de modifier son propre compte"} if not update.is_active else None
+    return apply_bulk(db, database.User, update.ids, {database.User.is_active: update.is_active}, skip=skip)
+
 @router.get("/messages", response_model=List[ContactMessageAdmin])
 async def get_contact_messages(
     skip: int = Query(0, ge=0),
@@ -161,13 +220,18 @@ async def get_contact_messages(
 ):
     """Lister tous les messages de contact"""
     
-    query = db.query(database.ContactMessage)
+    ContactMessage = database.ContactMessage
+    query = db.query(
+        ContactMessage.id, ContactMessage.first_name, ContactMessage.last_name, ContactMessage.email,
+        ContactMessage.phone, ContactMessage.company, ContactMessage.service, ContactMessage.message,
+        ContactMessage.status, ContactMessage.created_at
+    )
     
     if status:
         query = query.filter(ContactMessage.status == status)
     
-    messages = query.order_by(desc(ContactMessage.created_at)).offset(skip).limit(limit).all()
-    return messages
+    rows = query.order_by(desc(ContactMessage.created_at)).offset(skip).limit(limit).all()
+    return ORJSONResponse([row._asdict() for row in rows])
 
 @router.put("/messages/{message_id}/status")
 async def update_message_status(
@@ -178,8 +242,7 @@ async def update_message_status(
 ):
     """Mettre à jour le statut d'un message"""
     
-    valid_statuses = ["nouveau", "lu", "traité", "archivé"]
-    if status not in valid_statuses:
+    if status not in VALID_MESSAGE_STATUSES:
         raise HTTPException(status_code=400, detail="Statut invalide")
     
     message = db.query(database.ContactMessage).filter(database.ContactMessage.id == message_id).first()
@@ -188,9 +251,34 @@ async def update_message_status(
     
     message.status = status
     db.commit()
+    live.hub.refresh()
     
     return {"success": True, "message": "Statut mis à jour"}
 
+@router.post("/messages/bulk-status")
+async def bulk_update_message_status(
+    update: BulkStatusUpdate,
+    db: Session = Depends(database.get_db),
+    admin: database.User = Depends(verify_admin)
+):
+    """Mettre à jour le statut de plusieurs messages en une transaction"""
+    if update.status not in VALID_MESSAGE_STATUSES:
+        raise HTTPException(status_code=400, detail="Statut invalide")
+    result = apply_bulk(db, database.ContactMessage, update.ids, {database.ContactMessage.status: update.status})
+    live.hub.refresh()
+    return result
+
+@router.post("/messages/bulk-delete")
+async def bulk_delete_messages(
+    request: BulkIds,
+    db: Session = Depends(database.get_db),
+    admin: database.User = Depends(verify_admin)
+):
+    """Supprimer plusieurs messages en une transaction"""
+    result = apply_bulk(db, database.ContactMessage, request.ids)
+    live.hub.refresh()
+    return result
+
 @router.delete("/messages/{message_id}")
 async def delete_message(
     message_id: int,
@@ -205,6 +293,7 @@ async def delete_message(
     
     db.delete(message)
     db.commit()
+    live.hub.refresh()
     
     return {"success": True, "message": "Message supprimé"}
 
@@ -218,13 +307,17 @@ async def get_projects_admin(
 ):
     """Lister tous les projets pour l'admin"""
     
-    query = db.query(database.Project)
+    Project = database.Project
+    query = db.query(
+        Project.id, Project.title, Project.description, Project.technology,
+        Project.client, Project.status, Project.created_at, Project.updated_at
+    )
     
     if status:
         query = query.filter(Project.status == status)
     
-    projects = query.order_by(desc(Project.updated_at)).offset(skip).limit(limit).all()
-    return projects
+    rows = query.order_by(desc(Project.updated_at)).offset(skip).limit(limit).all()
+    return ORJSONResponse([row._asdict() for row in rows])
 
 @router.get("/analytics/users-growth")
 async def get_users_growth(
@@ -267,37 +360,146 @@ async def get_messages_by_service(db: Session = Depends(database.get_db), admin:
 @router.get("/analytics/overview")
 async def get_analytics_overview(
     days: int = Query(7, ge=1, le=90),
-    db: Session = Depends(database.get_db),
     admin: database.User = Depends(verify_admin)
 ):
-    """Obtenir un aperçu des analytics"""
+    """Obtenir un aperçu des analytics (compteurs par jour, visiteurs uniques approchés)"""
     
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    query = db.query(database.AnalyticsEvent).filter(database.AnalyticsEvent.timestamp >= start_date)
-    
-    total_views = query.filter(database.AnalyticsEvent.event_type == 'pageview').count()
-    unique_visitors = query.with_entities(database.AnalyticsEvent.session_id).distinct().count()
+    window = (await run_in_threadpool(sketches.last_days, days)).sketches
     
     return {
-        "total_views": total_views,
-        "unique_visitors": unique_visitors,
+        "total_views": window["pageviews"].value,
+        "unique_visitors": window["sessions"].count(),
         "period_days": days
     }
 
 @router.get("/analytics/top-pages")
-async def get_top_pages(limit: int = 10, db: Session = Depends(database.get_db), admin: database.User = Depends(verify_admin)):
+async def get_top_pages(
+    limit: int = Query(10, ge=1, le=100),
+    days: int = Query(90, ge=1, le=730),
+    admin: database.User = Depends(verify_admin)
+):
     """Obtenir les pages les plus visitées"""
     
-    results = db.query(
-        database.AnalyticsEvent.url,
-        func.count(database.AnalyticsEvent.id).label('views')
-    ).filter(
-        database.AnalyticsEvent.event_type == 'pageview'
-    ).group_by(database.AnalyticsEvent.url).order_by(desc('views')).limit(limit).all()
+    window = (await run_in_threadpool(sketches.last_days, days)).sketches
+    return [{"url": url, "views": views} for url, views in window["pages"].top(limit)]
+
+@router.get("/analytics/top-clicks")
+async def get_top_clicks(
+    limit: int = Query(10, ge=1, le=100),
+    days: int = Query(30, ge=1, le=730),
+    admin: database.User = Depends(verify_admin)
+):
+    """Éléments (data-track-click) les plus cliqués"""
     
-    return [{"url": row.url, "views": row.views} for row in results]
+    window = (await run_in_threadpool(sketches.last_days, days)).sketches
+    return [{"element": element, "clicks": clicks} for element, clicks in window["clicks"].top(limit)]
+
+@router.get("/analytics/sessions")
+async def get_session_summary(
+    days: int = Query(7, ge=1, le=365),
+    admin: database.User = Depends(verify_admin)
+):
+    """Sessions, durée moyenne, pages par session et taux de rebond"""
+    end = datetime.utcnow()
+    return await run_in_threadpool(sessionization.summary, end - timedelta(days=days), end)
+
+@router.get("/analytics/funnels")
+async def get_funnels(
+    days: int = Query(30, ge=1, le=365),
+    name: Optional[str] = None,
+    steps: Optional[str] = Query(None, description="Entonnoir ponctuel : étapes séparées par des virgules"),
+    admin: database.User = Depends(verify_admin)
+):
+    """Entonnoirs de conversion configurés (ANALYTICS_FUNNELS), calculés sur les résumés de sessions"""
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    if steps:
+        return {"custom": await run_in_threadpool(sessionization.funnel, steps.split(","), start, end)}
+    try:
+        return await run_in_threadpool(sessionization.funnels, start, end, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Entonnoir inconnu")
+
+def _period(start: Optional[datetime], end: Optional[datetime]):
+    end = end or datetime.utcnow()
+    return start or end - timedelta(days=7), end
+
+@router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = Query("day", regex="^(hour|day|week|month)$"),
+    event_type: Optional[str] = None,
+    admin: database.User = Depends(verify_admin)
+):
+    """Événements et sessions distinctes par heure, jour, semaine ou mois (7 derniers jours par défaut)"""
+    start, end = _period(start, end)
+    rows = await run_in_threadpool(analytics_olap.timeseries, start, end, bucket, event_type)
+    return {"start": start, "end": end, "bucket": bucket, "series": rows}
+
+@router.get("/analytics/breakdown")
+async def get_analytics_breakdown(
+    dimension: str = Query("url", description="url, event_type ou details.<clé>"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500),
+    admin: database.User = Depends(verify_admin)
+):
+    """Répartition des événements par url, type ou clé de details"""
+    start, end = _period(start, end)
+    try:
+        rows = await run_in_threadpool(analytics_olap.breakdown, start, end, dimension, event_type, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"dimension": dimension, "rows": rows}
+
+@router.get("/analytics/percentiles")
+async def get_analytics_percentiles(
+    metric: str = Query(..., description="details.<clé> numérique, ex. details.load_ms"),
+    p: str = Query("50,90,99", description="Percentiles séparés par des virgules"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    admin: database.User = Depends(verify_admin)
+):
+    """Percentiles d'une mesure numérique envoyée dans details"""
+    start, end = _period(start, end)
+    try:
+        quantiles = [float(value) / 100 for value in p.split(",")]
+        if not all(0 <= q <= 1 for q in quantiles):
+            raise ValueError("Les percentiles doivent être compris entre 0 et 100")
+        return await run_in_threadpool(analytics_olap.percentiles, start, end, metric, quantiles, event_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/analytics/ingestion/stats")
+async def get_ingestion_stats(admin: database.User = Depends(verify_admin)):
+    """Événements gardés, robots, doublons et échantillonnés depuis le démarrage du worker"""
+    return ingestion.get_stats()
+
+@router.get("/rate-limit/stats")
+async def get_rate_limit_stats(admin: database.User = Depends(verify_admin)):
+    """Compteurs de requêtes acceptées / rejetées par route limitée"""
+    return {path: dict(counters) for path, counters in rate_limit.stats.items()}
+
+@router.get("/compression/stats")
+async def get_compression_stats(admin: database.User = Depends(verify_admin)):
+    """Volume compressé et temps CPU de compression cumulés"""
+    stats = dict(compression.stats)
+    stats["ratio"] = (stats["bytes_out"] / stats["bytes_in"]) if stats["bytes_in"] else None
+    stats["cpu_ms_per_response"] = (stats["cpu_ms"] / stats["responses"]) if stats["responses"] else None
+    return stats
+
+@router.get("/events/stats")
+async def get_event_bus_stats(admin: database.User = Depends(verify_admin)):
+    """Files, pertes et erreurs par abonné du bus d'événements"""
+    return events.bus.stats()
+
+@router.get("/jobs/stats")
+async def get_job_queue_stats(db: Session = Depends(database.get_db), admin: database.User = Depends(verify_admin)):
+    """Profondeur de la file de tâches par file et par statut"""
+    return jobs.queue_stats(db)
 
 @router.post("/create-admin")
 async def create_admin_user(username: str, email: str, password: str, db: Session = Depends(database.get_db)):
@@ -329,5 +531,9 @@ async def create_admin_user(username: str, email: str, password: str, db: Sessio
     db.add(admin_user)
     db.commit()
     db.refresh(admin_user)
+    await events.bus.publish(events.UserRegistered(
+        user_id=admin_user.id, username=admin_user.username, email=admin_user.email,
+        full_name=admin_user.full_name, created_at=admin_user.created_at, source="admin"
+    ))
     
     return {"success": True, "message": "Administrateur créé avec succès", "user_id": admin_user.id}
\ No newline at end of file
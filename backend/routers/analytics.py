@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict
+from datetime import datetime
 
-from .. import database, security
+from .. import database, security, live, analytics_store, analytics_olap, sketches, ingestion
 
 router = APIRouter()
 
@@ -17,22 +18,37 @@ class AnalyticsEventCreate(BaseModel):
 async def track_event(
     event: AnalyticsEventCreate,
     request: Request,
-    db: Session = Depends(database.get_db),
     current_user: Optional[database.User] = Depends(security.get_current_user_optional)
 ):
     """
-    Enregistre un événement d'analyse (pageview, click, etc.).
+    Enregistre un événement d'analyse (pageview, click, etc.), enrichi
+    (appareil, canal, UTM), dans la partition du mois courant.
     """
     user_id = current_user.id if current_user else None
+    timestamp = datetime.utcnow()
     
-    db_event = database.AnalyticsEvent(
+    # Robots, doublons et échantillonnage sont écartés avant stockage
+    decision = ingestion.process(event.session_id, event.event_type, event.url, event.details,
+                                 request.headers.get("user-agent"))
+    if decision.verdict == ingestion.SAMPLED:
+        sketches.observe_visitor(event.session_id, timestamp)
+    if decision.verdict != ingestion.ACCEPT:
+        return {"success": True}
+    
+    # Écriture SQLite sous verrou : hors de la boucle d'événements
+    await run_in_threadpool(
+        analytics_store.record,
         session_id=event.session_id,
         user_id=user_id,
         event_type=event.event_type,
         url=event.url,
-        details=event.details,
+        details=decision.details,
+        timestamp=timestamp,
     )
-    db.add(db_event)
-    db.commit()
+    # Copie colonnaire, écrite en Parquet par lots
+    analytics_olap.append(event.session_id, user_id, event.event_type, event.url, decision.details, timestamp)
+    sketches.observe(event.session_id, event.event_type, event.url, decision.details, timestamp)
+    if event.event_type == "pageview":
+        live.hub.pageview(event.url)
     
     return {"success": True}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
@@ -6,8 +6,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from database import get_db, User
-from ..email_utils import fm
-from fastapi_mail import MessageSchema
+from .. import events, jobs
 
 # JWT, Passlib, and environment variables
 from jose import JWTError, jwt
@@ -102,7 +101,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 # --- API Routes ---
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     if get_user_by_email(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -118,12 +117,20 @@ async def register_user(user: UserCreate, background_tasks: BackgroundTasks, db:
         hashed_password=hashed_password
     )
     db.add(db_user)
+    # Email de bienvenue enregistré dans la même transaction que le compte
+    first_name = db_user.full_name.split(" ")[0]
+    welcome_email_body = f'''<h1>Bienvenue, {first_name} !</h1><p>Votre compte Vulsoft a été créé.</p>'''
+    jobs.enqueue("email.send", {"recipients": [db_user.email], "subject": "Bienvenue sur Vulsoft !", "body": welcome_email_body}, db=db)
     db.commit()
     db.refresh(db_user)
 
-    welcome_email_body = f'''<h1>Bienvenue, {user.firstName} !</h1><p>Votre compte Vulsoft a été créé.</p>'''
-    message = MessageSchema(subject="Bienvenue sur Vulsoft !", recipients=[db_user.email], body=welcome_email_body, subtype="html")
-    background_tasks.add_task(fm.send_message, message)
+    await events.bus.publish(events.UserRegistered(
+        user_id=db_user.id,
+        username=db_user.username,
+        email=db_user.email,
+        full_name=db_user.full_name,
+        created_at=db_user.created_at
+    ))
 
     return db_user
 
@@ -138,7 +145,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/forgot-password")
-async def forgot_password(req: ForgotPasswordRequest, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def forgot_password(req: ForgotPasswordRequest, request: Request, db: Session = Depends(get_db)):
     user = get_user_by_email(db, req.email)
     if not user:
         # Do not reveal that the user does not exist
@@ -151,8 +158,9 @@ async def forgot_password(req: ForgotPasswordRequest, background_tasks: Backgrou
     reset_link = f"{str(request.base_url)}pages/reset-password.html?token={reset_token}"
 
     email_body = f'''<h1>Réinitialisation de mot de passe</h1><p>Cliquez sur le lien ci-dessous pour réinitialiser votre mot de passe. Ce lien expirera dans 15 minutes.</p><a href="{reset_link}">Réinitialiser le mot de passe</a>'''
-    message = MessageSchema(subject="Réinitialisation de mot de passe Vulsoft", recipients=[user.email], body=email_body, subtype="html")
-    background_tasks.add_task(fm.send_message, message)
+    # Priorité maximale : le lien expire dans 15 minutes
+    jobs.enqueue("email.send", {"recipients": [user.email], "subject": "Réinitialisation de mot de passe Vulsoft", "body": email_body}, db=db, priority=100)
+    db.commit()
 
     return {"message": "If an account with this email exists, a password reset link has been sent."}
 
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import re
 import sys
@@ -11,15 +13,33 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db, User, BlogPost
+import events
+import security
+import blog_content
+import recommendations
+import taxonomy
 
 router = APIRouter()
 
+# LIKE clauses per query when loading existing slugs (SQLite expression depth limit)
+SLUG_PREFIX_CHUNK = 200
+
 def slugify(text: str) -> str:
     """Generate a URL-friendly slug from a string."""
     text = text.lower()
     text = re.sub(r'[\s\W]+', '-', text) # Replace spaces and non-alphanumeric with -
     return text.strip('-')
 
+def post_event(post: BlogPost) -> events.PostPublished:
+    """Build the event published after a post is created or updated."""
+    return events.PostPublished(
+        post_id=post.id,
+        slug=post.slug,
+        title=post.title,
+        content=post.content,
+        is_published=post.is_published,
+    )
+
 # --- Schemas ---
 class AuthorOut(BaseModel):
     id: int
@@ -33,17 +53,56 @@ class BlogPostBase(BaseModel):
     content: Optional[str] = None
     is_published: bool = False
 
+class TagOut(BaseModel):
+    kind: str
+    slug: str
+    name: str
+
+    class Config:
+        orm_mode = True
+
 class BlogPostCreate(BlogPostBase):
-    pass
+    tags: Optional[List[str]] = None
+    category: Optional[str] = None
 
 class BlogPostUpdate(BlogPostBase):
     title: Optional[str] = None
     content: Optional[str] = None
     is_published: Optional[bool] = None
+    tags: Optional[List[str]] = None
+    category: Optional[str] = None
+
+def post_labels(post: BaseModel) -> Dict[str, Optional[List[str]]]:
+    """Labels to index with taxonomy.set_labels (None: leave unchanged)."""
+    fields = post.dict(exclude_unset=True)
+    return {
+        "tag": fields.get("tags"),
+        "category": None if "category" not in fields else [fields["category"]] if fields["category"] else [],
+    }
+
+class BlogPostSummary(BaseModel):
+    id: int
+    title: str
+    slug: str
+    is_published: bool
+    excerpt: Optional[str] = None
+    word_count: Optional[int] = None
+    reading_time: Optional[int] = None
+    tags: List[TagOut] = []
+    author: AuthorOut
+    created_at: datetime
+    updated_at: datetime
+    content: Optional[str] = None
 
 class BlogPostOut(BlogPostBase):
     id: int
     slug: str
+    content_html: Optional[str] = None
+    excerpt: Optional[str] = None
+    word_count: Optional[int] = None
+    reading_time: Optional[int] = None
+    toc: Optional[List[Dict]] = None
+    tags: List[TagOut] = []
     author: AuthorOut
     created_at: datetime
     updated_at: datetime
@@ -74,27 +133,129 @@ async def create_blog_post(
         content=post.content,
         is_published=post.is_published,
         slug=slug,
-        author_id=default_author.id
+        author_id=default_author.id,
+        **blog_content.derive(post.content)
     )
     db.add(db_post)
+    db.flush()
+    taxonomy.set_labels(db, "post", db_post.id, post_labels(post))
+    recommendations.enqueue_refresh(db, "post", [db_post.id])
     db.commit()
     db.refresh(db_post)
+    await events.bus.publish(post_event(db_post))
     return db_post
 
-@router.get("/posts", response_model=List[BlogPostOut])
+@router.post("/posts/import")
+async def import_blog_posts(
+    posts: List[BlogPostCreate],
+    db: Session = Depends(get_db),
+    admin: User = Depends(security.verify_admin)
+):
+    """Import many blog posts in a single transaction (one executemany INSERT)."""
+    default_author = db.query(User).filter(User.is_admin == True).first()
+    if not default_author:
+        raise HTTPException(status_code=400, detail="Aucun administrateur trouvé")
+
+    # Resolve slug collisions against the DB and inside the batch. Suffixed
+    # candidates ("foo-2") may already exist too: load every slug sharing a prefix.
+    wanted = [slugify(post.title) for post in posts]
+    prefixes = sorted({slug for slug in wanted if slug})
+    taken = set()
+    for start in range(0, len(prefixes), SLUG_PREFIX_CHUNK):
+        chunk = prefixes[start:start + SLUG_PREFIX_CHUNK]
+        taken.update(slug for (slug,) in db.query(BlogPost.slug).filter(
+            or_(*(BlogPost.slug.like(f"{prefix}%") for prefix in chunk))
+        ))
+    now = datetime.utcnow()
+    rows, results, labels = [], [], {}
+    for index, (post, slug) in enumerate(zip(posts, wanted)):
+        if not slug:
+            results.append({"index": index, "success": False, "error": "Titre invalide"})
+            continue
+        candidate, suffix = slug, 2
+        while candidate in taken:
+            candidate = f"{slug}-{suffix}"
+            suffix += 1
+        taken.add(candidate)
+        rows.append({
+            "title": post.title,
+            "content": post.content,
+            **blog_content.derive(post.content),
+            "is_published": post.is_published,
+            "slug": candidate,
+            "author_id": default_author.id,
+            "created_at": now,
+            "updated_at": now,
+        })
+        labels[candidate] = post_labels(post)
+        results.append({"index": index, "success": True, "slug": candidate})
+
+    if rows:
+        try:
+            db.execute(insert(BlogPost), rows)
+            post_ids = dict(db.query(BlogPost.slug, BlogPost.id).filter(BlogPost.slug.in_(list(labels))))
+            taxonomy.set_labels_many(db, "post", {post_ids[slug]: labels[slug] for slug in labels})
+            recommendations.enqueue_refresh(db, "post", list(post_ids.values()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise HTTPException(status_code=500, detail="Import failed, no post was created")
+
+        for db_post in db.query(BlogPost).filter(BlogPost.slug.in_([row["slug"] for row in rows])):
+            await events.bus.publish(post_event(db_post))
+
+    return {"success": True, "created": len(rows), "results": results}
+
+@router.get("/posts", response_model=List[BlogPostSummary])
 async def get_blog_posts(
     skip: int = 0,
     limit: int = 20,
     published_only: bool = True,
+    include_content: bool = False,
+    tag: List[str] = Query([]),
+    category: List[str] = Query([]),
     db: Session = Depends(get_db)
 ):
-    """Get a list of blog posts."""
-    query = db.query(BlogPost)
+    """
+    Get a list of blog posts (excerpt and reading time; the full content only on request).
+    Repeated `tag`/`category` parameters keep the posts carrying all of them.
+    """
+    # Colonnes + jointure sur l'auteur en une requête, sérialisées directement
+    # (pas d'objets ORM ni de double validation Pydantic / jsonable_encoder)
+    columns = [
+        BlogPost.id, BlogPost.title, BlogPost.slug, BlogPost.is_published,
+        BlogPost.excerpt, BlogPost.word_count, BlogPost.reading_time,
+        BlogPost.created_at, BlogPost.updated_at,
+        User.id.label("author_id"), User.full_name.label("author_name")
+    ]
+    if include_content:
+        columns.append(BlogPost.content)
+    query = db.query(*columns).join(User, BlogPost.author_id == User.id)
     if published_only:
         query = query.filter(BlogPost.is_published == True)
-    
-    posts = query.order_by(BlogPost.created_at.desc()).offset(skip).limit(limit).all()
-    return posts
+    query = taxonomy.filter_items(db, query, "post", BlogPost.id, {"tag": tag, "category": category})
+
+    rows = query.order_by(BlogPost.created_at.desc()).offset(skip).limit(limit).all()
+    labels = taxonomy.labels_of(db, "post", [row.id for row in rows])
+    return ORJSONResponse([{
+        "id": row.id,
+        "title": row.title,
+        "slug": row.slug,
+        "is_published": row.is_published,
+        "excerpt": row.excerpt,
+        "word_count": row.word_count,
+        "reading_time": row.reading_time,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "tags": labels[row.id],
+        "author": {"id": row.author_id, "full_name": row.author_name},
+        **({"content": row.content} if include_content else {}),
+    } for row in rows])
+
+@router.get("/tags")
+async def get_blog_tags(db: Session = Depends(get_db)):
+    """Tags and categories of published posts with their counts (cached), for the listing filters."""
+    return ORJSONResponse(taxonomy.counts(db, "post"))
 
 @router.get("/posts/{slug}", response_model=BlogPostOut)
 async def get_blog_post(slug: str, db: Session = Depends(get_db)):
@@ -104,6 +265,14 @@ async def get_blog_post(slug: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Post not found")
     return post
 
+@router.get("/posts/{slug}/related")
+async def get_related_posts(slug: str, limit: int = 3, db: Session = Depends(get_db)):
+    """Similar posts and projects, precomputed by recommendations.py."""
+    post = db.query(BlogPost.id).filter(BlogPost.slug == slug, BlogPost.is_published == True).first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return ORJSONResponse(recommendations.related(db, "post", post.id, limit=min(limit, recommendations.TOP_K)))
+
 @router.put("/posts/{post_id}", response_model=BlogPostOut)
 async def update_blog_post(
     post_id: int,
@@ -115,17 +284,25 @@ async def update_blog_post(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    update_data = post_update.dict(exclude_unset=True)
+    labels = post_labels(post_update)
+    update_data = post_update.dict(exclude_unset=True, exclude={"tags", "category"})
     if 'title' in update_data:
         db_post.slug = slugify(update_data['title'])
+    if 'content' in update_data:
+        update_data.update(blog_content.derive(update_data['content']))
 
     for key, value in update_data.items():
         setattr(db_post, key, value)
     
     db_post.updated_at = datetime.utcnow()
     db.add(db_post)
+    # is_published doit être écrit avant le recalcul des compteurs
+    db.flush()
+    taxonomy.set_labels(db, "post", db_post.id, labels)
+    recommendations.enqueue_refresh(db, "post", [db_post.id])
     db.commit()
     db.refresh(db_post)
+    await events.bus.publish(post_event(db_post))
     return db_post
 
 @router.delete("/posts/{post_id}")
@@ -138,6 +315,10 @@ async def delete_blog_post(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    slug = db_post.slug
+    taxonomy.remove_item(db, "post", post_id)
     db.delete(db_post)
+    recommendations.enqueue_refresh(db, "post", [post_id])
     db.commit()
+    await events.bus.publish(events.PostDeleted(post_id=post_id, slug=slug))
     return {"success": True, "message": "Blog post deleted"}
\ No newline at end of file
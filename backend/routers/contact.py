@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, Dict
 from ..database import get_db, ContactMessage
 from datetime import datetime
-from ..services import email_service
+from .. import events, jobs
 import uuid
 import os
 
@@ -30,7 +30,6 @@ class ContactResponse(BaseModel):
 
 @router.post("/submit", response_model=ContactResponse)
 async def submit_contact_form( # Modifié pour accepter les formulaires multipart
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     firstName: str = Form(...),
     lastName: str = Form(...),
@@ -83,21 +82,29 @@ async def submit_contact_form( # Modifié pour accepter les formulaires multipar
         )
         
         db.add(db_contact)
+        # Emails de confirmation et de notification admin : enregistrés dans la
+        # même transaction que le message, puis envoyés par les workers
+        jobs.enqueue("contact.emails", {
+            "first_name": firstName,
+            "last_name": lastName,
+            "email": email,
+            "message": message,
+            "file_path": file_path,
+        }, db=db)
         db.commit()
         db.refresh(db_contact)
         
-        # Préparer les données pour l'email
-        form_data_dict = locals().copy()
-
-        # Envoyer les emails de confirmation et de notification admin
-        background_tasks.add_task(
-            email_service.send_contact_confirmation_email,
-            email_to=email,
-            first_name=firstName
-        )
-        background_tasks.add_task(
-            email_service.send_contact_notification_to_admin, data=form_data_dict
-        )
+        # Tableau de bord admin : traité par les abonnés du bus
+        await events.bus.publish(events.ContactSubmitted(
+            message_id=db_contact.id,
+            first_name=firstName,
+            last_name=lastName,
+            email=email,
+            message=message,
+            service=service,
+            file_path=file_path,
+            created_at=db_contact.created_at
+        ))
         
         return ContactResponse(
             success=True,
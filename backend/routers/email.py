@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException
-from fastapi_mail import MessageSchema
 from pydantic import BaseModel, EmailStr
 from typing import List
-from ..email_utils import fm
+from ..email_utils import get_mailer, fastapi_mail
 
 router = APIRouter()
 
@@ -13,7 +12,7 @@ class EmailSchema(BaseModel):
 @router.post("/send-test-email")
 async def send_test_email(recipient: EmailStr):
     """Envoyer un email de test."""
-    message = MessageSchema(
+    message = fastapi_mail.MessageSchema(
         subject="Email de test Vulsoft API",
         recipients=[recipient],
         body="<h1>Bonjour !</h1><p>Ceci est un email de test envoyé depuis l'API Vulsoft.</p>",
@@ -21,7 +20,7 @@ async def send_test_email(recipient: EmailStr):
     )
 
     try:
-        await fm.send_message(message)
+        await get_mailer().send_message(message)
         return {"message": f"Email de test envoyé à {recipient}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
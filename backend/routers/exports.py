@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import Literal, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from .. import database, security, analytics_store
+
+router = APIRouter()
+
+# Nombre de lignes lues par aller-retour avec la base et écrites par bloc
+BATCH_SIZE = 1000
+
+# Jeu de données -> (modèle, colonnes exportées, colonne de date pour le filtre)
+# Les colonnes sensibles (mots de passe, secrets 2FA) ne sont jamais exportées.
+DATASETS = {
+    "users": (database.User, (
+        "id", "username", "email", "full_name", "is_active", "is_admin", "is_two_factor_enabled", "created_at"
+    ), "created_at"),
+    "subscribers": (database.NewsletterSubscriber, ("id", "email", "is_active", "created_at"), "created_at"),
+    "messages": (database.ContactMessage, (
+        "id", "first_name", "last_name", "email", "phone", "company", "service", "budget",
+        "message", "newsletter", "status", "created_at"
+    ), "created_at"),
+    "analytics": (database.AnalyticsEvent, (
+        "id", "session_id", "user_id", "event_type", "url", "details", "timestamp"
+    ), "timestamp"),
+}
+
+def iter_rows(dataset: str, start: Optional[date], end: Optional[date]):
+    """
+    Parcourt la table par lots avec un curseur côté serveur (yield_per) :
+    la mémoire utilisée ne dépend pas de la taille de la table.
+    Utilise sa propre session, qui vit aussi longtemps que le streaming.
+    """
+    model, columns, date_column = DATASETS[dataset]
+    if dataset == "analytics":
+        # Les événements vivent dans les partitions mensuelles (analytics_store)
+        yield from analytics_store.iter_events(
+            datetime.combine(start, time.min) if start else None,
+            datetime.combine(end, time.max) if end else None,
+            batch_size=BATCH_SIZE,
+        )
+        return
+    db = database.SessionLocal()
+    try:
+        query = db.query(*(getattr(model, name) for name in columns))
+        if start:
+            query = query.filter(getattr(model, date_column) >= datetime.combine(start, time.min))
+        if end:
+            query = query.filter(getattr(model, date_column) <= datetime.combine(end, time.max))
+        query = query.order_by(model.id).execution_options(stream_results=True).yield_per(BATCH_SIZE)
+        for row in query:
+            yield row
+    finally:
+        db.close()
+
+def ndjson_lines(rows, columns):
+    buffer = []
+    for row in rows:
+        buffer.append(orjson.dumps(dict(zip(columns, row))))
+        if len(buffer) >= BATCH_SIZE:
+            yield b"\n".join(buffer) + b"\n"
+            buffer = []
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+def csv_lines(rows, columns):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list))
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+            for value in row
+        ])
+        count += 1
+        if count % BATCH_SIZE == 0:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue().encode("utf-8")
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    admin: database.User = Depends(security.verify_admin)
+):
+    """Exporter une table en NDJSON ou CSV, en streaming, avec filtre de dates optionnel."""
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail="Jeu de données inconnu")
+
+    columns = DATASETS[dataset][1]
+    rows = iter_rows(dataset, start, end)
+    if format == "csv":
+        body, media_type = csv_lines(rows, columns), "text/csv; charset=utf-8"
+    else:
+        body, media_type = ndjson_lines(rows, columns), "application/x-ndjson"
+
+    filename = f"vulsoft-{dataset}-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
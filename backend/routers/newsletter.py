@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, EmailStr
 from typing import List
 
-from .. import database, security
-from ..services import email_service
+from .. import database, security, jobs
 
 router = APIRouter()
 
@@ -40,33 +39,31 @@ async def subscribe_to_newsletter(subscriber: SubscriberBase, db: Session = Depe
 
 @router.get("/subscribers", response_model=List[SubscriberOut])
 async def get_subscribers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
     db: Session = Depends(database.get_db),
     admin: database.User = Depends(security.verify_admin)
 ):
-    """Récupérer la liste de tous les abonnés."""
-    subscribers = db.query(database.NewsletterSubscriber).order_by(database.NewsletterSubscriber.created_at.desc()).all()
+    """Récupérer une page d'abonnés. L'export complet passe par /api/admin/export/subscribers."""
+    subscribers = db.query(database.NewsletterSubscriber).order_by(
+        database.NewsletterSubscriber.created_at.desc()
+    ).offset(skip).limit(limit).all()
     return subscribers
 
 @router.post("/send")
 async def send_newsletter(
     newsletter: NewsletterRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db),
     admin: database.User = Depends(security.verify_admin)
 ):
     """Envoyer une newsletter à tous les abonnés actifs."""
-    subscribers = db.query(database.NewsletterSubscriber).filter(database.NewsletterSubscriber.is_active == True).all()
-    recipient_emails = [s.email for s in subscribers]
+    count = db.query(database.NewsletterSubscriber).filter(database.NewsletterSubscriber.is_active == True).count()
 
-    if not recipient_emails:
+    if not count:
         raise HTTPException(status_code=400, detail="Aucun abonné actif trouvé.")
 
-    # Utiliser une tâche de fond pour ne pas bloquer la réponse
-    background_tasks.add_task(
-        email_service.send_bulk_email,
-        recipients=recipient_emails,
-        subject=newsletter.subject,
-        content=newsletter.content
-    )
+    # Les workers lisent les abonnés et envoient la newsletter par lots
+    job_id = jobs.enqueue("newsletter.send", {"subject": newsletter.subject, "content": newsletter.content}, db=db)
+    db.commit()
 
-    return {"success": True, "message": f"Newsletter en cours d'envoi à {len(recipient_emails)} abonnés."}
\ No newline at end of file
+    return {"success": True, "message": f"Newsletter en cours d'envoi à {count} abonnés.", "job_id": job_id}
\ No newline at end of file
@@ -1,47 +1,228 @@
-import stripe
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import re
+import time
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
+from .. import database, security, payment_events
 from ..core.config import settings
+from lazy import lazy_import
 
 router = APIRouter()
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe = lazy_import("stripe")
+
+@lru_cache(maxsize=None)
+def get_stripe():
+    """Module stripe configuré, importé au premier paiement."""
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    if settings.STRIPE_API_BASE:
+        # Permet de tester contre un stripe-mock local
+        stripe.api_base = settings.STRIPE_API_BASE
+    return stripe
 
-# Simulation de la base de données des prix des cours.
-# En production, ces données viendraient de votre base de données.
+# Prix initiaux, insérés dans la table course_prices si elle est vide.
 COURSE_PRICES = {
     "javascript-moderne": 75000,  # 75,000 GNF
     "react-debutants": 90000,
     "nodejs-express": 85000,
 }
 
+# Statuts Stripe pour lesquels une intention peut encore être payée
+REUSABLE_STATUSES = {"requires_payment_method", "requires_confirmation", "requires_action"}
+
+# Clé générée par le formulaire de paiement à son chargement (UUID ou hexadécimal)
+CHECKOUT_KEY_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
 class PaymentIntentRequest(BaseModel):
     course_id: str
+    # Une par passage sur la page de paiement : un double clic ou un retour à
+    # l'étape 2 renvoie la même clé, donc la même intention
+    idempotency_key: str
+
+class CoursePriceUpdate(BaseModel):
+    amount: int
+    currency: str = "gnf"
+    is_active: bool = True
+
+# --- Catalogue des prix (cache mémoire) ---
+
+_price_cache: Dict[str, Tuple[int, str]] = {}
+_price_cache_loaded_at = 0.0
+
+def load_price_catalogue(db: Session) -> Dict[str, Tuple[int, str]]:
+    """Retourne {cours: (montant, devise)} des cours actifs, rechargé depuis la base à expiration du cache."""
+    global _price_cache, _price_cache_loaded_at
+    if time.monotonic() - _price_cache_loaded_at > settings.COURSE_PRICE_CACHE_SECONDS:
+        rows = db.query(database.CoursePrice).all()
+        if not rows:
+            rows = [database.CoursePrice(course_id=cid, amount=amount, currency="gnf") for cid, amount in COURSE_PRICES.items()]
+            db.add_all(rows)
+            db.commit()
+        _price_cache = {row.course_id: (row.amount, row.currency) for row in rows if row.is_active}
+        _price_cache_loaded_at = time.monotonic()
+    return _price_cache
+
+def get_course_price(db: Session, course_id: str) -> Optional[Tuple[int, str]]:
+    return load_price_catalogue(db).get(course_id)
+
+def invalidate_price_cache():
+    global _price_cache_loaded_at
+    _price_cache_loaded_at = 0.0
+
+def stripe_configured() -> bool:
+    if settings.STRIPE_API_BASE:
+        return True
+    return bool(settings.STRIPE_SECRET_KEY) and "VOTRE_CLE_SECRETE" not in settings.STRIPE_SECRET_KEY
+
+def make_idempotency_key(customer_key: str, checkout_key: str, course_id: str, amount: int, currency: str) -> str:
+    """
+    Clé Stripe d'un passage sur la page de paiement : la clé du formulaire,
+    liée au client, au cours et au prix (un changement de prix crée une
+    nouvelle intention au lieu d'une erreur Stripe).
+    """
+    raw = f"{customer_key}|{checkout_key}|{course_id}|{amount}|{currency}"
+    return "pi-" + hashlib.sha256(raw.encode()).hexdigest()[:40]
 
 @router.post("/create-payment-intent")
-async def create_payment(request: PaymentIntentRequest):
+async def create_payment(
+    request: PaymentIntentRequest,
+    http_request: Request,
+    db: Session = Depends(database.get_db),
+    current_user: Optional[database.User] = Depends(security.get_current_user_optional)
+):
     """
-    Crée une intention de paiement Stripe.
+    Crée (ou réutilise) une intention de paiement Stripe.
     """
-    if not settings.STRIPE_SECRET_KEY or "VOTRE_CLE_SECRETE" in settings.STRIPE_SECRET_KEY:
+    if not stripe_configured():
         return {"error": "La clé API Stripe n'est pas configurée sur le serveur."}
+    if not CHECKOUT_KEY_RE.match(request.idempotency_key):
+        raise HTTPException(status_code=400, detail="Clé d'idempotence invalide")
 
-    try:
-        course_id = request.course_id
-        if course_id not in COURSE_PRICES:
-            raise HTTPException(status_code=404, detail="Cours non trouvé")
+    price = get_course_price(db, request.course_id)
+    if price is None:
+        raise HTTPException(status_code=404, detail="Cours non trouvé")
+    amount, currency = price
 
-        amount = COURSE_PRICES[course_id]
+    customer_key = f"user:{current_user.id}" if current_user else "anon"
+    idempotency_key = make_idempotency_key(customer_key, request.idempotency_key, request.course_id, amount, currency)
+    # Même passage sur la page (double clic, retour à l'étape 2) : même intention, sans appel Stripe
+    existing = db.query(database.PaymentIntentRecord).filter(
+        database.PaymentIntentRecord.idempotency_key == idempotency_key
+    ).first()
+    if existing:
+        return {"clientSecret": existing.client_secret}
 
-        payment_intent = stripe.PaymentIntent.create(
+    # Réutiliser une intention récente encore payable pour le même (client, cours, prix).
+    # Seulement pour un utilisateur connecté : derrière un NAT, une même IP est
+    # partagée et le client_secret d'un visiteur serait remis à un autre.
+    if current_user:
+        since = datetime.utcnow() - timedelta(minutes=settings.STRIPE_INTENT_REUSE_MINUTES)
+        existing = db.query(database.PaymentIntentRecord).filter(
+            database.PaymentIntentRecord.customer_key == customer_key,
+            database.PaymentIntentRecord.course_id == request.course_id,
+            database.PaymentIntentRecord.amount == amount,
+            database.PaymentIntentRecord.status.in_(REUSABLE_STATUSES),
+            database.PaymentIntentRecord.created_at >= since
+        ).order_by(database.PaymentIntentRecord.created_at.desc()).first()
+        if existing:
+            return {"clientSecret": existing.client_secret}
+
+    try:
+        # Appel bloquant exécuté hors de la boucle d'événements
+        payment_intent = await run_in_threadpool(
+            get_stripe().PaymentIntent.create,
             amount=amount,
-            currency="gnf",  # Franc Guinéen
+            currency=currency,  # Franc Guinéen par défaut
             automatic_payment_methods={"enabled": True},
+            metadata={"course_id": request.course_id, "customer_key": customer_key},
+            idempotency_key=idempotency_key,
         )
-
-        return {"clientSecret": payment_intent.client_secret}
-
     except Exception as e:
         print(f"Erreur Stripe: {e}")
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Une même clé d'idempotence renvoie la même intention : ne l'enregistrer qu'une fois.
+    # Deux requêtes simultanées peuvent toutes deux passer la vérification :
+    # la seconde se heurte à l'unicité de stripe_id et relit la ligne.
+    if not db.query(database.PaymentIntentRecord).filter(database.PaymentIntentRecord.stripe_id == payment_intent.id).first():
+        db.add(database.PaymentIntentRecord(
+            stripe_id=payment_intent.id,
+            client_secret=payment_intent.client_secret,
+            idempotency_key=idempotency_key,
+            customer_key=customer_key,
+            user_id=current_user.id if current_user else None,
+            course_id=request.course_id,
+            amount=amount,
+            currency=currency,
+            status=payment_intent.status,
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            record = db.query(database.PaymentIntentRecord).filter(
+                database.PaymentIntentRecord.stripe_id == payment_intent.id
+            ).first()
+            if record is None:
+                raise
+            return {"clientSecret": record.client_secret}
+
+    return {"clientSecret": payment_intent.client_secret}
+
+@router.get("/prices")
+async def list_course_prices(db: Session = Depends(database.get_db)):
+    """Lister les prix des cours actifs."""
+    catalogue = load_price_catalogue(db)
+    return [{"course_id": cid, "amount": amount, "currency": currency} for cid, (amount, currency) in catalogue.items()]
+
+@router.put("/prices/{course_id}")
+async def update_course_price(
+    course_id: str,
+    price: CoursePriceUpdate,
+    db: Session = Depends(database.get_db),
+    admin: database.User = Depends(security.verify_admin)
+):
+    """Créer ou mettre à jour le prix d'un cours."""
+    if price.amount <= 0:
+        raise HTTPException(status_code=400, detail="Montant invalide")
+
+    row = db.query(database.CoursePrice).filter(database.CoursePrice.course_id == course_id).first()
+    if not row:
+        row = database.CoursePrice(course_id=course_id)
+        db.add(row)
+    row.amount = price.amount
+    row.currency = price.currency
+    row.is_active = price.is_active
+    db.commit()
+    invalidate_price_cache()
+
+    return {"success": True, "message": "Prix mis à jour"}
+
+@router.post("/webhook")
+async def stripe_webhook(request: Request, db: Session = Depends(database.get_db)):
+    """
+    Reçoit les webhooks Stripe : vérifie la signature, enregistre l'événement brut
+    et acquitte immédiatement. Le traitement est fait par le worker payment_events.
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook Stripe non configuré")
+
+    payload = await request.body()
+    signature = request.headers.get("stripe-signature", "")
+    try:
+        event = get_stripe().Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.error.SignatureVerificationError):
+        raise HTTPException(status_code=400, detail="Signature invalide")
+
+    if payment_events.record_event(db, event["id"], event["type"], payload.decode("utf-8")):
+        payment_events.notify()
+
+    return {"received": True}
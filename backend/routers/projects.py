@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Form, UploadFile, File
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from pydantic import BaseModel
-from typing import List, Optional
-from database import get_db, Project
+from typing import Dict, List, Optional
+from database import get_db, User, Project, ProjectImage, ProjectCard
+from config import settings
+import events
+import security
+import recommendations
+import taxonomy
+import project_cards
 from datetime import datetime
+import os
+import uuid
 
 router = APIRouter()
 
@@ -13,6 +24,8 @@ class ProjectCreate(BaseModel):
     description: Optional[str] = None
     technology: Optional[str] = None
     client: Optional[str] = None
+    tags: Optional[List[str]] = None
+    category: Optional[str] = None
 
 class ProjectUpdate(BaseModel):
     title: Optional[str] = None
@@ -20,6 +33,16 @@ class ProjectUpdate(BaseModel):
     technology: Optional[str] = None
     client: Optional[str] = None
     status: Optional[str] = None
+    tags: Optional[List[str]] = None
+    category: Optional[str] = None
+
+class TagResponse(BaseModel):
+    kind: str
+    slug: str
+    name: str
+
+    class Config:
+        orm_mode = True
 
 class ProjectResponse(BaseModel):
     id: int
@@ -30,22 +53,69 @@ class ProjectResponse(BaseModel):
     status: str
     created_at: datetime
     updated_at: datetime
+    primary_image_url: Optional[str] = None
+    image_count: int = 0
+    tags: List[TagResponse] = []
+
+class ProjectImageResponse(BaseModel):
+    id: int
+    url: str
+    is_primary: bool
+    position: int
+
+class ImageOrder(BaseModel):
+    image_ids: List[int]
+    primary_id: Optional[int] = None
+
+# Colonnes de ProjectResponse, lues dans le modèle de lecture sans instancier d'objets ORM
+CARD_COLUMNS = (
+    ProjectCard.project_id.label("id"), ProjectCard.title, ProjectCard.description, ProjectCard.technology,
+    ProjectCard.client, ProjectCard.status, ProjectCard.created_at, ProjectCard.updated_at,
+    ProjectCard.primary_image_url, ProjectCard.image_count
+)
+
+IMAGES_DIR = os.path.join("uploads", "projects")
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif", "avif"}
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+def project_labels(project: BaseModel) -> Dict[str, Optional[List[str]]]:
+    """Étiquettes à indexer (None : inchangées) ; les technologies viennent du champ texte"""
+    fields = project.dict(exclude_unset=True)
+    return {
+        "technology": taxonomy.split_technology(fields["technology"]) if "technology" in fields else None,
+        "tag": fields.get("tags"),
+        "category": None if "category" not in fields else [fields["category"]] if fields["category"] else [],
+    }
 
 @router.get("/", response_model=List[ProjectResponse])
 async def get_projects(
     skip: int = 0,
     limit: int = 50,
     status: Optional[str] = None,
+    tag: List[str] = Query([]),
+    technology: List[str] = Query([]),
+    category: List[str] = Query([]),
     db: Session = Depends(get_db)
 ):
-    """Récupérer la liste des projets"""
-    query = db.query(Project)
+    """
+    Récupérer la liste des projets avec leur image principale, en une requête sur le modèle de lecture
+    (les filtres répétés se cumulent : ?tag=react&technology=fastapi)
+    """
+    query = db.query(*CARD_COLUMNS)
     
     if status:
-        query = query.filter(Project.status == status)
+        query = query.filter(ProjectCard.status == status)
+    query = taxonomy.filter_items(db, query, "project", ProjectCard.project_id,
+                                  {"tag": tag, "technology": technology, "category": category})
     
-    projects = query.offset(skip).limit(limit).all()
-    return projects
+    rows = query.order_by(ProjectCard.project_id).offset(skip).limit(limit).all()
+    labels = taxonomy.labels_of(db, "project", [row.id for row in rows])
+    return ORJSONResponse([{**row._asdict(), "tags": labels[row.id]} for row in rows])
+
+@router.get("/tags")
+async def get_project_tags(db: Session = Depends(get_db)):
+    """Étiquettes, technologies et catégories des projets avec leur nombre (en cache)"""
+    return ORJSONResponse(taxonomy.counts(db, "project"))
 
 @router.post("/", response_model=ProjectResponse)
 async def create_project(
@@ -63,8 +133,13 @@ async def create_project(
     )
     
     db.add(db_project)
+    db.flush()
+    taxonomy.set_labels(db, "project", db_project.id, project_labels(project))
+    project_cards.refresh(db, db_project.id)
+    recommendations.enqueue_refresh(db, "project", [db_project.id])
     db.commit()
     db.refresh(db_project)
+    await events.bus.publish(events.ProjectUpdated(project_id=db_project.id))
     
     return db_project
 
@@ -78,6 +153,13 @@ async def get_project(project_id: int, db: Session = Depends(get_db)):
     
     return project
 
+@router.get("/{project_id}/related")
+async def get_related(project_id: int, limit: int = 3, db: Session = Depends(get_db)):
+    """Projets et articles similaires (précalculés par recommendations.py)"""
+    if not db.query(Project.id).filter(Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    return ORJSONResponse(recommendations.related(db, "project", project_id, limit=min(limit, recommendations.TOP_K)))
+
 @router.put("/{project_id}", response_model=ProjectResponse)
 async def update_project(
     project_id: int,
@@ -91,14 +173,18 @@ async def update_project(
         raise HTTPException(status_code=404, detail="Projet non trouvé")
     
     # Mettre à jour les champs modifiés
-    update_data = project_update.dict(exclude_unset=True)
+    update_data = project_update.dict(exclude_unset=True, exclude={"tags", "category"})
     for field, value in update_data.items():
         setattr(project, field, value)
     
     project.updated_at = datetime.utcnow()
+    taxonomy.set_labels(db, "project", project.id, project_labels(project_update))
+    project_cards.refresh(db, project.id)
+    recommendations.enqueue_refresh(db, "project", [project.id])
     
     db.commit()
     db.refresh(project)
+    await events.bus.publish(events.ProjectUpdated(project_id=project.id))
     
     return project
 
@@ -110,11 +196,127 @@ async def delete_project(project_id: int, db: Session = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
     
+    taxonomy.remove_item(db, "project", project_id)
+    file_paths = [image.file_path for image in project.images]
     db.delete(project)
+    project_cards.refresh(db, project_id)
+    recommendations.enqueue_refresh(db, "project", [project_id])
     db.commit()
+    await run_in_threadpool(remove_files, file_paths)
+    await events.bus.publish(events.ProjectUpdated(project_id=project_id, deleted=True))
     
     return {"message": "Projet supprimé avec succès"}
 
+# --- Images ---
+
+def image_response(image: ProjectImage) -> dict:
+    return {"id": image.id, "url": project_cards.image_url(image.file_path),
+            "is_primary": bool(image.is_primary), "position": image.position or 0}
+
+def remove_files(file_paths: List[str]):
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+async def save_upload(file: UploadFile, save_path: str, max_bytes: int) -> bool:
+    """Écrire l'upload par morceaux hors de la boucle ; False (et rien sur disque) s'il dépasse max_bytes."""
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    size = 0
+    buffer = await run_in_threadpool(open, save_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            await run_in_threadpool(buffer.write, chunk)
+    finally:
+        await run_in_threadpool(buffer.close)
+    if size > max_bytes:
+        await run_in_threadpool(remove_files, [save_path])
+        return False
+    return True
+
+@router.get("/{project_id}/images", response_model=List[ProjectImageResponse])
+async def get_project_images(project_id: int, db: Session = Depends(get_db)):
+    """Images d'un projet dans l'ordre de la galerie"""
+    images = db.query(ProjectImage).filter(ProjectImage.project_id == project_id).order_by(
+        ProjectImage.position, ProjectImage.id
+    ).all()
+    return ORJSONResponse([image_response(image) for image in images])
+
+@router.post("/{project_id}/images", response_model=ProjectImageResponse)
+async def upload_project_image(
+    project_id: int,
+    file: UploadFile = File(...),
+    is_primary: bool = Form(False),
+    db: Session = Depends(get_db),
+    admin: User = Depends(security.verify_admin)
+):
+    """Ajouter une image en fin de galerie (ou comme image principale)"""
+    if not db.query(Project.id).filter(Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in (file.filename or '') else ''
+    if extension not in IMAGE_EXTENSIONS or not (file.content_type or '').startswith("image/"):
+        raise HTTPException(status_code=400, detail="Format d'image non pris en charge")
+
+    save_path = os.path.join(IMAGES_DIR, f"{uuid.uuid4()}.{extension}")
+    if not await save_upload(file, save_path, settings.PROJECT_IMAGE_MAX_BYTES):
+        raise HTTPException(status_code=413, detail="Image trop volumineuse")
+
+    try:
+        last = db.query(func.max(ProjectImage.position)).filter(ProjectImage.project_id == project_id).scalar()
+        if is_primary:
+            db.query(ProjectImage).filter(ProjectImage.project_id == project_id).update({ProjectImage.is_primary: False})
+        image = ProjectImage(project_id=project_id, file_path=save_path, is_primary=is_primary,
+                             position=0 if last is None else last + 1)
+        db.add(image)
+        project_cards.refresh(db, project_id)
+        db.commit()
+    except Exception:
+        # Pas de fichier orphelin si la ligne n'a pas été enregistrée
+        db.rollback()
+        await run_in_threadpool(remove_files, [save_path])
+        raise
+    await events.bus.publish(events.ProjectUpdated(project_id=project_id))
+    return ORJSONResponse(image_response(image))
+
+@router.put("/{project_id}/images/order", response_model=List[ProjectImageResponse])
+async def reorder_project_images(project_id: int, order: ImageOrder, db: Session = Depends(get_db),
+                                 admin: User = Depends(security.verify_admin)):
+    """Réordonner la galerie : image_ids dans l'ordre voulu, primary_id pour changer l'image principale"""
+    images = {image.id: image for image in db.query(ProjectImage).filter(ProjectImage.project_id == project_id)}
+    if set(order.image_ids) != set(images) or len(order.image_ids) != len(images):
+        raise HTTPException(status_code=400, detail="image_ids doit contenir chaque image du projet une fois")
+    if order.primary_id is not None and order.primary_id not in images:
+        raise HTTPException(status_code=400, detail="Image principale inconnue")
+
+    for position, image_id in enumerate(order.image_ids):
+        images[image_id].position = position
+        if order.primary_id is not None:
+            images[image_id].is_primary = image_id == order.primary_id
+    project_cards.refresh(db, project_id)
+    db.commit()
+    await events.bus.publish(events.ProjectUpdated(project_id=project_id))
+    return ORJSONResponse([image_response(images[image_id]) for image_id in order.image_ids])
+
+@router.delete("/images/{image_id}")
+async def delete_project_image(image_id: int, db: Session = Depends(get_db),
+                               admin: User = Depends(security.verify_admin)):
+    """Supprimer une image (la suivante de la galerie devient principale si besoin)"""
+    image = db.query(ProjectImage).filter(ProjectImage.id == image_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image non trouvée")
+
+    project_id, file_path = image.project_id, image.file_path
+    db.delete(image)
+    project_cards.refresh(db, project_id)
+    db.commit()
+    await run_in_threadpool(remove_files, [file_path])
+    await events.bus.publish(events.ProjectUpdated(project_id=project_id))
+    return {"message": "Image supprimée avec succès"}
+
 @router.get("/stats/overview")
 async def get_project_stats(db: Session = Depends(get_db)):
     """Statistiques des projets"""
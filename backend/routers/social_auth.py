@@ -1,11 +1,13 @@
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 import secrets
 
-from .. import database, security
+from .. import database, security, events
 from ..core.config import settings
+from lazy import lazy_import
+
+httpx = lazy_import("httpx")
 
 router = APIRouter()
 
@@ -72,6 +74,10 @@ async def callback_google(request: Request, code: str, db: Session = Depends(dat
         db.add(user)
         db.commit()
         db.refresh(user)
+        await events.bus.publish(events.UserRegistered(
+            user_id=user.id, username=user.username, email=user.email,
+            full_name=user.full_name, created_at=user.created_at, source="google"
+        ))
 
     access_token = security.create_access_token(data={"sub": user.email})
     return RedirectResponse(f"/pages/auth-callback.html#access_token={access_token}")
@@ -126,6 +132,10 @@ async def callback_github(request: Request, code: str, db: Session = Depends(dat
         db.add(user)
         db.commit()
         db.refresh(user)
+        await events.bus.publish(events.UserRegistered(
+            user_id=user.id, username=user.username, email=user.email,
+            full_name=user.full_name, created_at=user.created_at, source="github"
+        ))
 
     access_token = security.create_access_token(data={"sub": user.email})
     return RedirectResponse(f"/pages/auth-callback.html#access_token={access_token}")
\ No newline at end of file
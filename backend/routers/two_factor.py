@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-import pyotp
-import qrcode
 import io
 from starlette.responses import StreamingResponse
 from pydantic import BaseModel
 
 from .. import database, security
 from ..core.config import settings
+from lazy import lazy_import
+
+# qrcode tire PIL : chargés seulement quand la 2FA est utilisée
+pyotp = lazy_import("pyotp")
+qrcode = lazy_import("qrcode")
 
 router = APIRouter()
 
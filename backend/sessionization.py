@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Sessions et entonnoirs de conversion, calculés au fil de l'eau.
+
+La tâche `analytics.sessionize` lit les nouveaux événements des partitions
+(curseur par partition : dernier id traité) et met à jour une ligne par
+session dans analytics/sessions.db : début, fin, nombre d'événements et de
+pages vues, pages d'entrée et de sortie, et la suite compacte des étapes
+("pageview:/pricing.html", "click:contact-submit"...). Une inactivité de plus
+de SESSION_GAP coupe la session.
+
+Les événements échantillonnés (details.sample_weight, voir ingestion.py) ne
+sont pas intégrés : le tirage garde ou écarte une session entière pour un
+type donné, ses résumés (durée, rebond, étapes) seraient biaisés. Les types
+utilisés par les entonnoirs ne doivent donc pas être échantillonnés.
+
+Les entonnoirs (ANALYTICS_FUNNELS) sont évalués sur ces résumés, jamais sur
+les événements bruts. Une étape est "type:motif", le motif (fnmatch) portant
+sur le chemin de la page, ou sur details.element pour les clics :
+
+    {"pricing_to_payment": ["pageview:/pricing*", "pageview:/payment*", "click:payment-submit"]}
+
+Usage (depuis backend/):
+    python sessionization.py run
+    python sessionization.py funnels --days 30
+"""
+
+import argparse
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from config import settings
+import analytics_store
+import ingestion
+
+DB_PATH = Path(settings.ANALYTICS_DATA_DIR) / "sessions.db"
+SESSION_GAP = timedelta(minutes=30)
+BATCH_SIZE = 5000
+# Au-delà, les étapes suivantes d'une session ne sont plus retenues
+MAX_STEPS = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    user_id INTEGER,
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    pageviews INTEGER NOT NULL,
+    entry_url TEXT,
+    exit_url TEXT,
+    steps TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_session_ended ON sessions (session_id, ended_at);
+CREATE INDEX IF NOT EXISTS ix_sessions_started ON sessions (started_at);
+CREATE TABLE IF NOT EXISTS cursors (partition TEXT PRIMARY KEY, last_id INTEGER NOT NULL);
+"""
+
+COLUMNS = ("id", "session_id", "user_id", "started_at", "ended_at", "events", "pageviews",
+           "entry_url", "exit_url", "steps")
+
+
+def _connect() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH), timeout=10)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def step_of(event_type: str, url: str, details: Optional[dict]) -> str:
+    """Étape d'entonnoir d'un événement : le chemin de la page, ou l'élément cliqué."""
+    if event_type == "click" and details and details.get("element"):
+        return f"click:{details['element']}"
+    return f"{event_type}:{urlsplit(url or '').path}"
+
+
+def is_sampled_event(details: Optional[str]) -> bool:
+    """Événement d'un type échantillonné (poids différent de 1) : exclu des sessions."""
+    return bool(details) and "sample_weight" in details and ingestion.weight(json.loads(details)) != 1
+
+
+def _find_open(conn: sqlite3.Connection, session_id: str) -> Optional[dict]:
+    row = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM sessions WHERE session_id = ? ORDER BY ended_at DESC LIMIT 1",
+        (session_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    session = dict(zip(COLUMNS, row))
+    session["steps"] = json.loads(session["steps"])
+    return session
+
+
+def _apply(session: Optional[dict], event: tuple) -> dict:
+    _, session_id, user_id, event_type, url, details, timestamp = event
+    details = json.loads(details) if details else None
+    step = step_of(event_type, url, details)
+    if session is None or timestamp - datetime.fromisoformat(session["ended_at"]) > SESSION_GAP:
+        session = {"id": None, "session_id": session_id, "user_id": user_id,
+                   "started_at": analytics_store.format_timestamp(timestamp), "ended_at": "",
+                   "events": 0, "pageviews": 0, "entry_url": url, "exit_url": url, "steps": []}
+    stamp = analytics_store.format_timestamp(timestamp)
+    session["started_at"] = min(session["started_at"], stamp)
+    if stamp >= session["ended_at"]:
+        session["ended_at"] = stamp
+        session["exit_url"] = url
+    session["user_id"] = session["user_id"] or user_id
+    session["events"] += 1
+    if event_type == "pageview":
+        session["pageviews"] += 1
+    steps = session["steps"]
+    if len(steps) < MAX_STEPS and (not steps or steps[-1] != step):
+        steps.append(step)
+    return session
+
+
+def _save(conn: sqlite3.Connection, sessions: Iterable[dict]):
+    for session in sessions:
+        values = {**session, "steps": json.dumps(session["steps"], ensure_ascii=False)}
+        if session["id"] is None:
+            conn.execute(
+                f"INSERT INTO sessions ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})",
+                [values[c] for c in COLUMNS[1:]]
+            )
+        else:
+            conn.execute(
+                f"UPDATE sessions SET {', '.join(c + ' = ?' for c in COLUMNS[1:])} WHERE id = ?",
+                [values[c] for c in COLUMNS[1:]] + [session["id"]]
+            )
+
+
+def process(batch_size: int = BATCH_SIZE) -> int:
+    """Intégrer les événements arrivés depuis le dernier passage. Renvoie le nombre d'événements traités."""
+    conn = _connect()
+    processed = 0
+    try:
+        cursors = dict(conn.execute("SELECT partition, last_id FROM cursors"))
+        for key in analytics_store.partitions():
+            source = sqlite3.connect(str(analytics_store.partition_path(key)))
+            try:
+                while True:
+                    rows = source.execute(
+                        "SELECT id, session_id, user_id, event_type, url, details, timestamp FROM events "
+                        "WHERE id > ? ORDER BY id LIMIT ?", (cursors.get(key, 0), batch_size)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    # Sessions modifiées par le lot ; une session coupée par l'inactivité
+                    # est enregistrée avant d'être remplacée par la suivante
+                    touched: Dict[str, dict] = {}
+                    closed: List[dict] = []
+                    for row in rows:
+                        if is_sampled_event(row[5]):
+                            continue
+                        session_id = row[1]
+                        if session_id not in touched:
+                            touched[session_id] = _find_open(conn, session_id)
+                        previous = touched[session_id]
+                        touched[session_id] = _apply(previous, row[:6] + (datetime.fromisoformat(row[6]),))
+                        if previous is not None and touched[session_id] is not previous:
+                            closed.append(previous)
+                    with conn:
+                        _save(conn, closed + list(touched.values()))
+                        cursors[key] = rows[-1][0]
+                        conn.execute("INSERT OR REPLACE INTO cursors (partition, last_id) VALUES (?, ?)",
+                                     (key, cursors[key]))
+                    processed += len(rows)
+            finally:
+                source.close()
+    finally:
+        conn.close()
+    return processed
+
+
+def prune(keep_days: int) -> int:
+    """Supprimer les sessions plus anciennes que `keep_days` jours et les curseurs des partitions archivées."""
+    cutoff = analytics_store.format_timestamp(datetime.utcnow() - timedelta(days=keep_days))
+    conn = _connect()
+    try:
+        with conn:
+            deleted = conn.execute("DELETE FROM sessions WHERE ended_at < ?", (cutoff,)).rowcount
+            live = analytics_store.partitions()
+            conn.execute(f"DELETE FROM cursors WHERE partition NOT IN ({', '.join('?' * len(live))})", live)
+    finally:
+        conn.close()
+    return deleted
+
+
+def summary(start: datetime, end: datetime) -> dict:
+    """Nombre de sessions, durée moyenne, pages par session et taux de rebond (une seule page vue)."""
+    conn = _connect()
+    try:
+        count, duration, pages, bounces = conn.execute(
+            "SELECT COUNT(*), AVG((julianday(ended_at) - julianday(started_at)) * 86400), "
+            "AVG(pageviews), SUM(CASE WHEN pageviews <= 1 THEN 1 ELSE 0 END) "
+            "FROM sessions WHERE started_at BETWEEN ? AND ?",
+            (analytics_store.format_timestamp(start), analytics_store.format_timestamp(end))
+        ).fetchone()
+    finally:
+        conn.close()
+    return {
+        "sessions": count,
+        "avg_duration_seconds": round(duration or 0, 1),
+        "pages_per_session": round(pages or 0, 2),
+        "bounce_rate": round(bounces / count, 4) if count else None,
+    }
+
+
+def _matches(step: str, pattern: str) -> bool:
+    return fnmatchcase(step, pattern if ":" in pattern else f"{pattern}:*")
+
+
+def funnel(steps: List[str], start: datetime, end: datetime) -> List[dict]:
+    """Sessions ayant franchi chaque étape dans l'ordre (pas forcément consécutivement)."""
+    reached = [0] * len(steps)
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "SELECT steps FROM sessions WHERE started_at BETWEEN ? AND ?",
+            (analytics_store.format_timestamp(start), analytics_store.format_timestamp(end))
+        )
+        for (raw,) in cursor:
+            depth = 0
+            for step in json.loads(raw):
+                if depth < len(steps) and _matches(step, steps[depth]):
+                    reached[depth] += 1
+                    depth += 1
+    finally:
+        conn.close()
+    return [{
+        "step": pattern,
+        "sessions": count,
+        "conversion": round(count / reached[0], 4) if reached[0] else None,
+        "from_previous": round(count / reached[i - 1], 4) if i and reached[i - 1] else None,
+    } for i, (pattern, count) in enumerate(zip(steps, reached))]
+
+
+def funnels(start: datetime, end: datetime, name: Optional[str] = None) -> Dict[str, List[dict]]:
+    definitions = settings.ANALYTICS_FUNNELS
+    if name is not None:
+        if name not in definitions:
+            raise KeyError(name)
+        definitions = {name: definitions[name]}
+    return {key: funnel(steps, start, end) for key, steps in definitions.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="intégrer les nouveaux événements")
+    show = commands.add_parser("funnels", help="afficher les entonnoirs configurés")
+    show.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print(f"✅ {process()} événement(s) intégré(s)")
+    else:
+        end = datetime.utcnow()
+        for name, steps in funnels(end - timedelta(days=args.days), end).items():
+            print(name)
+            for step in steps:
+                print(f"  {step['sessions']:>8}  {step['step']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Compteurs probabilistes des cartes analytics de l'admin.
+
+Par jour (UTC), chaque worker tient en mémoire :
+    - `sessions` : HyperLogLog des session_id (visiteurs uniques, ~1,6 % d'erreur) ;
+    - `pageviews` : nombre exact de pages vues ;
+    - `pages` / `clicks` : pages vues et clics (details.element) les plus
+      fréquents, Space-Saving pour les candidats et Count-Min pour les comptes.
+
+Toutes les FLUSH_SECONDS, ces deltas sont fusionnés dans analytics/sketches.db
+(une ligne par jour et par compteur, fusion en transaction : plusieurs workers
+peuvent écrire). Une période se calcule en fusionnant ses jours : le coût ne
+dépend plus du nombre d'événements, et la mémoire reste bornée. La fusion des
+jours terminés d'une période est gardée en cache ; seuls hier et aujourd'hui
+sont relus à chaque appel. Avec NumPy, les tables sont fusionnées en vectoriel.
+
+Usage (depuis backend/):
+    python sketches.py rebuild --start 2026-10-01   # recalculer depuis les partitions SQLite
+    python sketches.py show --days 7
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import sqlite3
+import struct
+import threading
+import zlib
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from config import settings
+from lazy import lazy_import, is_available
+import analytics_store
+import ingestion
+
+# Fusion vectorielle des registres et des tables si NumPy est installé (importé au premier usage)
+np = lazy_import("numpy")
+HAS_NUMPY = is_available("numpy")
+
+DB_PATH = Path(settings.ANALYTICS_DATA_DIR) / "sketches.db"
+FLUSH_SECONDS = 5.0
+
+HLL_PRECISION = 12
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+TOP_CAPACITY = 200
+# Fusions de jours terminés gardées par window() (une par début de période)
+WINDOW_CACHE_SIZE = 8
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Cardinalité approchée ; la fusion (max des registres) est exacte."""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytearray] = None):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    def add(self, value: str):
+        x = _hash64(value)
+        index = x & (self.m - 1)
+        rank = (64 - self.p) - (x >> self.p).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if HAS_NUMPY:
+            merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8), np.frombuffer(other.registers, dtype=np.uint8))
+            self.registers = bytearray(merged.tobytes())
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Petites cardinalités : comptage linéaire
+            estimate = self.m * math.log(self.m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "HyperLogLog":
+        return cls(raw[0], bytearray(raw[1:]))
+
+
+class CountMinSketch:
+    """Comptes approchés par excès (jamais sous-estimés) ; la fusion additionne les tables."""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH, table: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else array("q", bytes(8 * width * depth))
+
+    def _cells(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        cells = self._cells(key)
+        for cell in cells:
+            self.table[cell] += count
+        return min(self.table[cell] for cell in cells)
+
+    def estimate(self, key: str) -> int:
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def merge(self, other: "CountMinSketch"):
+        if HAS_NUMPY:
+            merged = np.frombuffer(self.table, dtype=np.int64) + np.frombuffer(other.table, dtype=np.int64)
+            self.table = array("q", merged.tobytes())
+        else:
+            self.table = array("q", map(sum, zip(self.table, other.table)))
+
+    def to_bytes(self) -> bytes:
+        return struct.pack("<II", self.width, self.depth) + self.table.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CountMinSketch":
+        width, depth = struct.unpack("<II", raw[:8])
+        table = array("q")
+        table.frombytes(raw[8:])
+        return cls(width, depth, table)
+
+
+class HeavyHitters:
+    """
+    Éléments les plus fréquents : Space-Saving garde au plus `capacity`
+    candidats, leur compte affiché est le minimum des deux estimations.
+    """
+
+    def __init__(self, capacity: int = TOP_CAPACITY, cms: Optional[CountMinSketch] = None,
+                 counters: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.cms = cms or CountMinSketch()
+        self.counters: Dict[str, int] = counters or {}
+
+    def add(self, key: str, count: int = 1):
+        self.cms.add(key, count)
+        if key in self.counters:
+            self.counters[key] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = count
+        else:
+            # Space-Saving : le nouvel élément hérite du compte du plus petit
+            smallest = min(self.counters, key=self.counters.__getitem__)
+            self.counters[key] = self.counters.pop(smallest) + count
+
+    def merge(self, other: "HeavyHitters"):
+        self.cms.merge(other.cms)
+        # Un élément absent d'un résumé plein peut y valoir jusqu'à son minimum
+        floor_self = min(self.counters.values()) if len(self.counters) >= self.capacity else 0
+        floor_other = min(other.counters.values()) if len(other.counters) >= other.capacity else 0
+        merged = {key: self.counters.get(key, floor_self) + other.counters.get(key, floor_other)
+                  for key in self.counters.keys() | other.counters.keys()}
+        self.counters = dict(sorted(merged.items(), key=lambda item: item[1], reverse=True)[:self.capacity])
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        ranked = [(key, min(count, self.cms.estimate(key))) for key, count in self.counters.items()]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def to_bytes(self) -> bytes:
+        cms = self.cms.to_bytes()
+        return struct.pack("<II", self.capacity, len(cms)) + cms + orjson.dumps(self.counters)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "HeavyHitters":
+        capacity, size = struct.unpack("<II", raw[:8])
+        return cls(capacity, CountMinSketch.from_bytes(raw[8:8 + size]), orjson.loads(raw[8 + size:]))
+
+
+class Counter:
+    """Compte exact, pour fusionner les pages vues comme les autres compteurs."""
+
+    def __init__(self, value: int = 0):
+        self.value = value
+
+    def add(self, count: int = 1):
+        self.value += count
+
+    def merge(self, other: "Counter"):
+        self.value += other.value
+
+    def to_bytes(self) -> bytes:
+        return str(self.value).encode()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "Counter":
+        return cls(int(raw))
+
+
+KINDS = {"sessions": HyperLogLog, "pageviews": Counter, "pages": HeavyHitters, "clicks": HeavyHitters}
+
+
+class DaySketch:
+    def __init__(self, sketches: Optional[dict] = None):
+        self.sketches = sketches or {name: kind() for name, kind in KINDS.items()}
+
+    def observe(self, session_id: str, event_type: str, url: str, details: Optional[dict]):
+        self.sketches["sessions"].add(session_id)
+        # Événement échantillonné : il compte pour 1/taux
+        count = round(ingestion.weight(details))
+        if event_type == "pageview":
+            self.sketches["pageviews"].add(count)
+            self.sketches["pages"].add(url, count)
+        elif event_type == "click":
+            self.sketches["clicks"].add(str((details or {}).get("element") or url), count)
+
+    def merge(self, other: "DaySketch"):
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def copy(self) -> "DaySketch":
+        result = DaySketch()
+        result.merge(self)
+        return result
+
+
+# --- Persistance ---
+
+_pending: Dict[date, DaySketch] = {}
+_pending_lock = threading.Lock()
+# Tenu par flush() de l'extraction des deltas au commit, et par window() pendant
+# sa lecture : une période ne voit jamais un delta ni en mémoire ni en base
+_flush_lock = threading.Lock()
+# Jours terminés (avant hier) : ils ne changent plus, inutile de les relire
+_cache: Dict[date, DaySketch] = {}
+# (premier jour, dernier jour terminé) -> fusion de ces jours
+_window_cache: Dict[Tuple[date, date], DaySketch] = {}
+_flush_task: Optional[asyncio.Task] = None
+
+
+def _connect() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS sketches (day TEXT, name TEXT, data BLOB, PRIMARY KEY (day, name))")
+    return conn
+
+
+def _load(rows) -> Dict[date, DaySketch]:
+    days: Dict[date, dict] = {}
+    for day, name, data in rows:
+        if name in KINDS:
+            days.setdefault(date.fromisoformat(day), {})[name] = KINDS[name].from_bytes(zlib.decompress(data))
+    return {day: DaySketch({**{n: k() for n, k in KINDS.items()}, **sketches}) for day, sketches in days.items()}
+
+
+def observe(session_id: str, event_type: str, url: str, details: Optional[dict] = None,
+            timestamp: Optional[datetime] = None):
+    """Compter un événement dans le delta en mémoire du worker."""
+    day = (timestamp or datetime.utcnow()).date()
+    with _pending_lock:
+        sketch = _pending.get(day)
+        if sketch is None:
+            sketch = _pending[day] = DaySketch()
+        sketch.observe(session_id, event_type, url, details)
+
+
+def observe_visitor(session_id: str, timestamp: Optional[datetime] = None):
+    """Compter une session dont l'événement a été écarté par l'échantillonnage."""
+    day = (timestamp or datetime.utcnow()).date()
+    with _pending_lock:
+        sketch = _pending.get(day)
+        if sketch is None:
+            sketch = _pending[day] = DaySketch()
+        sketch.sketches["sessions"].add(session_id)
+
+
+def _invalidate(days):
+    """Oublier les jours réécrits, et les fusions qui les contiennent."""
+    for day in days:
+        _cache.pop(day, None)
+    for key in [key for key in _window_cache if any(key[0] <= day <= key[1] for day in days)]:
+        del _window_cache[key]
+
+
+def flush() -> int:
+    """Fusionner les deltas en mémoire dans la base, en une transaction."""
+    global _pending
+    with _flush_lock:
+        with _pending_lock:
+            pending, _pending = _pending, {}
+        if not pending:
+            return 0
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [day.isoformat() for day in pending]
+            stored = _load(conn.execute(
+                f"SELECT day, name, data FROM sketches WHERE day IN ({', '.join('?' * len(keys))})", keys
+            ))
+            for day, delta in pending.items():
+                merged = stored.get(day) or DaySketch()
+                merged.merge(delta)
+                conn.executemany("INSERT OR REPLACE INTO sketches (day, name, data) VALUES (?, ?, ?)", [
+                    (day.isoformat(), name, zlib.compress(sketch.to_bytes()))
+                    for name, sketch in merged.sketches.items()
+                ])
+            conn.execute("COMMIT")
+            _invalidate(pending)
+        except Exception:
+            conn.execute("ROLLBACK")
+            # Les deltas ne sont pas perdus : ils seront fusionnés au prochain cycle
+            with _pending_lock:
+                for day, delta in pending.items():
+                    _pending.setdefault(day, DaySketch()).merge(delta)
+            raise
+        finally:
+            conn.close()
+    return len(pending)
+
+
+async def _flush_loop():
+    from fastapi.concurrency import run_in_threadpool
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        try:
+            await run_in_threadpool(flush)
+        except Exception as e:
+            print(f"Échec de l'enregistrement des compteurs analytics: {e}")
+
+
+def start_flusher():
+    global _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_flusher():
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    flush()
+
+
+def _stored(start: date, end: date) -> DaySketch:
+    """Fusion des jours [start, end] écrits en base (cache des jours terminés)."""
+    settled = datetime.utcnow().date() - timedelta(days=1)
+    result = DaySketch()
+    missing = []
+    day = start
+    while day <= end:
+        if day in _cache:
+            result.merge(_cache[day])
+        else:
+            missing.append(day.isoformat())
+        day += timedelta(days=1)
+    if missing and DB_PATH.exists():
+        conn = _connect()
+        try:
+            loaded = _load(conn.execute(
+                f"SELECT day, name, data FROM sketches WHERE day IN ({', '.join('?' * len(missing))})", missing
+            ))
+        finally:
+            conn.close()
+        for day, sketch in loaded.items():
+            if day < settled:
+                _cache[day] = sketch
+            result.merge(sketch)
+    return result
+
+
+def window(start: date, end: date) -> DaySketch:
+    """Fusion des jours [start, end] : jours terminés (fusion en cache), jours récents et delta non encore écrit."""
+    settled = datetime.utcnow().date() - timedelta(days=1)
+    last_settled = min(end, settled - timedelta(days=1))
+    with _flush_lock:
+        if start <= last_settled:
+            key = (start, last_settled)
+            if key not in _window_cache:
+                if len(_window_cache) >= WINDOW_CACHE_SIZE:
+                    del _window_cache[next(iter(_window_cache))]
+                _window_cache[key] = _stored(start, last_settled)
+            result = _window_cache[key].copy()
+            recent_start = last_settled + timedelta(days=1)
+        else:
+            result = DaySketch()
+            recent_start = start
+        if recent_start <= end:
+            result.merge(_stored(recent_start, end))
+        with _pending_lock:
+            for day, delta in _pending.items():
+                if start <= day <= end:
+                    result.merge(delta)
+    return result
+
+
+def last_days(days: int) -> DaySketch:
+    """Les `days` derniers jours, aujourd'hui compris."""
+    today = datetime.utcnow().date()
+    return window(today - timedelta(days=days - 1), today)
+
+
+def prune(keep_days: int) -> int:
+    """Supprimer les compteurs plus anciens que `keep_days` jours."""
+    if not DB_PATH.exists():
+        return 0
+    cutoff = datetime.utcnow().date() - timedelta(days=keep_days)
+    conn = _connect()
+    try:
+        deleted = conn.execute("DELETE FROM sketches WHERE day < ?", (cutoff.isoformat(),)).rowcount
+    finally:
+        conn.close()
+    _invalidate([day for day in _cache if day < cutoff])
+    _window_cache.clear()
+    return deleted
+
+
+def rebuild(start: date, end: date) -> int:
+    """Recalculer les compteurs des jours [start, end] depuis les partitions SQLite."""
+    rebuilt: Dict[date, DaySketch] = {}
+    for _, session_id, _, event_type, url, details, moment in analytics_store.iter_events(
+        datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.max.time())
+    ):
+        rebuilt.setdefault(moment.date(), DaySketch()).observe(session_id, event_type, url, details)
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM sketches WHERE day BETWEEN ? AND ?", (start.isoformat(), end.isoformat()))
+        for day, sketch in rebuilt.items():
+            conn.executemany("INSERT INTO sketches (day, name, data) VALUES (?, ?, ?)", [
+                (day.isoformat(), name, zlib.compress(s.to_bytes())) for name, s in sketch.sketches.items()
+            ])
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    _cache.clear()
+    _window_cache.clear()
+    return len(rebuilt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    recompute = commands.add_parser("rebuild", help="recalculer les compteurs depuis les partitions SQLite")
+    recompute.add_argument("--start", type=date.fromisoformat, required=True)
+    recompute.add_argument("--end", type=date.fromisoformat, default=datetime.utcnow().date())
+    show = commands.add_parser("show", help="afficher les compteurs des derniers jours")
+    show.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"✅ {rebuild(args.start, args.end)} jour(s) recalculé(s)")
+    else:
+        sketch = last_days(args.days).sketches
+        print(f"Visiteurs uniques : ~{sketch['sessions'].count()}  Pages vues : {sketch['pageviews'].value}")
+        for url, views in sketch["pages"].top(10):
+            print(f"{views:>8}  {url}")
+
+
+if __name__ == "__main__":
+    main()
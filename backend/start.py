@@ -1,33 +1,277 @@
 #!/usr/bin/env python3
 """
 Script de démarrage pour l'API Vulsoft
-Usage: python start.py
+
+Usage:
+    python start.py                  # production : un worker par cœur, app préchargée
+    python start.py --workers 4      # nombre de workers explicite
+    python start.py --uds /run/vulsoft.sock   # écoute sur un socket Unix (derrière nginx)
+    python start.py --dev            # développement : un processus, rechargement automatique
+
+Signaux envoyés au processus maître (PID dans vulsoft.pid, voir stop.py) :
+    SIGHUP           redémarrage progressif : chaque worker est remplacé par un
+                     nouveau, l'ancien n'est arrêté qu'une fois le nouveau prêt.
+                     Les nouveaux workers réimportent le code de l'application
+                     (même préchargée) : systemctl reload déploie le nouveau code
+    SIGTERM/SIGINT   arrêt propre de tous les workers
 """
 
-import uvicorn
+import argparse
+import importlib
 import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
 from pathlib import Path
 
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_DIR = Path(__file__).resolve().parent
+PID_FILE = BACKEND_DIR / "vulsoft.pid"
+APP_PATH = "main:app"
+
+# Délai maximal pour qu'un nouveau worker termine son démarrage (lifespan inclus)
+READY_TIMEOUT = 30
+GRACEFUL_TIMEOUT = 30
+
+
+def pick_implementations():
+    """uvloop et httptools s'ils sont installés (uvicorn[standard]), sinon asyncio/h11."""
+    loop, http = "asyncio", "h11"
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        pass
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        pass
+    return loop, http
+
+
+def load_app(app_path: str = APP_PATH, fresh: bool = False):
+    """
+    Importer l'application. Avec `fresh`, les modules du backend hérités du
+    maître (version préchargée) sont d'abord oubliés : le code est relu sur le
+    disque, les bibliothèques tierces restent chargées.
+    """
+    if fresh:
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if name != "__main__" and path and Path(path).resolve().is_relative_to(BACKEND_DIR) \
+                    and "site-packages" not in path:
+                del sys.modules[name]
+        importlib.invalidate_caches()
+    module_name, attr = app_path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def bind_socket(host: str, port: int, uds: str = None) -> socket.socket:
+    """Socket partagé par tous les workers (ouvert une fois par le maître)."""
+    if uds:
+        if os.path.exists(uds):
+            os.unlink(uds)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(uds)
+        os.chmod(uds, 0o666)
+    else:
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Arbiter:
+    """Processus maître : fork les workers, les surveille et les remplace."""
+
+    def __init__(self, sock, workers: int, preload: bool, log_level: str):
+        self.sock = sock
+        self.num_workers = workers
+        self.preload = preload
+        self.log_level = log_level
+        self.loop, self.http = pick_implementations()
+        self.app = load_app() if preload else None
+        # Vrai après le premier SIGHUP : l'app préchargée n'est plus à jour
+        self.reloaded = False
+        self.workers = set()
+        self.pending_signals = []
+        self.stopping = False
+
+    # --- Worker ---
+
+    def _run_worker(self, ready_fd: int):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        if self.preload and not self.reloaded:
+            app = self.app
+        else:
+            # Après un SIGHUP, l'app préchargée du maître est l'ancienne version
+            app = load_app(fresh=self.preload)
+        config = uvicorn.Config(
+            app,
+            loop=self.loop,
+            http=self.http,
+            log_level=self.log_level,
+            timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        )
+        server = uvicorn.Server(config)
+        startup = server.startup
+
+        async def startup_and_notify(sockets=None):
+            await startup(sockets=sockets)
+            # Le worker n'est déclaré prêt qu'après le lifespan (init_db, workers de fond...)
+            if server.started:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+
+        server.startup = startup_and_notify
+        server.run(sockets=[self.sock])
+
+    def spawn_worker(self):
+        """Fork un worker et attend qu'il soit prêt. Retourne son PID, ou None en cas d'échec."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                self._run_worker(write_fd)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+
+        os.close(write_fd)
+        ready, _, _ = select.select([read_fd], [], [], READY_TIMEOUT)
+        ok = bool(ready) and os.read(read_fd, 1) == b"1"
+        os.close(read_fd)
+        if not ok:
+            print(f"❌ Le worker {pid} n'a pas démarré dans les {READY_TIMEOUT}s")
+            self._terminate(pid, sig=signal.SIGKILL)
+            return None
+        self.workers.add(pid)
+        return pid
+
+    def _terminate(self, pid: int, sig=signal.SIGTERM):
+        try:
+            os.kill(pid, sig)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.workers.discard(pid)
+
+    # --- Maître ---
+
+    def rolling_restart(self):
+        """Remplacer les workers un par un ; on s'arrête au premier nouveau worker défaillant."""
+        print("🔄 Redémarrage progressif des workers...")
+        # Désormais (relances comprises) chaque worker importe le code à jour
+        self.reloaded = True
+        for old_pid in list(self.workers):
+            if self.spawn_worker() is None:
+                print("⚠️  Redémarrage interrompu : les anciens workers restent en service")
+                return
+            self._terminate(old_pid)
+        print(f"✅ {len(self.workers)} workers redémarrés")
+
+    def reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping:
+                    print(f"⚠️  Worker {pid} arrêté (statut {status}), relance")
+
+    def stop(self):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            self._terminate(pid, sig=signal.SIGKILL)
+
+    def run(self):
+        PID_FILE.write_text(str(os.getpid()))
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.pending_signals.append(signum))
+
+        try:
+            for _ in range(self.num_workers):
+                if self.spawn_worker() is None:
+                    sys.exit(1)
+            print(f"✅ {len(self.workers)} workers prêts (loop={self.loop}, http={self.http}, préchargement={self.preload})")
+
+            while True:
+                while self.pending_signals:
+                    signum = self.pending_signals.pop(0)
+                    if signum == signal.SIGHUP:
+                        self.rolling_restart()
+                    else:
+                        print("🛑 Arrêt des workers...")
+                        self.stop()
+                        return
+                self.reap_workers()
+                while len(self.workers) < self.num_workers and not self.pending_signals:
+                    if self.spawn_worker() is None:
+                        break
+                time.sleep(0.5)
+        finally:
+            if PID_FILE.exists() and PID_FILE.read_text() == str(os.getpid()):
+                PID_FILE.unlink()
+
+
 def main():
     """Démarrer le serveur FastAPI"""
-    
-    # Configuration du serveur
-    config = {
-        "app": "main:app",
-        "host": "0.0.0.0",
-        "port": 8002,
-        "reload": True,  # Rechargement automatique en développement
-        "log_level": "info"
-    }
-    
+    parser = argparse.ArgumentParser(description="Serveur Vulsoft API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8002)))
+    parser.add_argument("--uds", default=os.getenv("UDS"), help="chemin d'un socket Unix")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--no-preload", action="store_true",
+                        help="importer l'app dans chaque worker plutôt que dans le maître")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--dev", action="store_true", help="un seul processus avec rechargement automatique")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    address = args.uds or f"http://localhost:{args.port}"
+
     print("🚀 Démarrage du serveur Vulsoft API...")
-    print(f"📍 URL: http://localhost:{config['port']}")
-    print(f"📚 Documentation: http://localhost:{config['port']}/docs")
-    print("🔄 Mode rechargement automatique activé")
+    print(f"📍 URL: {address}")
+    if not args.uds:
+        print(f"📚 Documentation: {address}/docs")
+
+    if args.dev:
+        print("🔄 Mode rechargement automatique activé")
+        print("\n" + "="*50)
+        uvicorn.run(APP_PATH, host=args.host, port=args.port, uds=args.uds, reload=True, log_level=args.log_level)
+        return
+
+    print(f"⚙️  {args.workers} workers")
     print("\n" + "="*50)
-    
-    # Démarrer le serveur
-    uvicorn.run(**config)
+    sock = bind_socket(args.host, args.port, args.uds)
+    Arbiter(sock, args.workers, preload=not args.no_preload, log_level=args.log_level).run()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
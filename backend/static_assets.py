@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Pipeline des fichiers statiques du site.
+
+Build (python static_assets.py) :
+    - copie le site dans dist/ ;
+    - ajoute une empreinte de contenu aux fichiers de css/, js/, images/ et font/
+      (main.css -> main.3f2a9c1e.css) et réécrit les références dans le HTML,
+      le CSS et le JS ;
+    - précompresse les fichiers texte en .br (si brotli est installé) et .gz ;
+    - écrit dist/asset-manifest.json (chemin d'origine -> chemin avec empreinte).
+
+Service (PrecompressedStaticFiles) :
+    - choisit la variante .br / .gz selon Accept-Encoding (Content-Encoding, Vary) ;
+    - Cache-Control immutable pour les fichiers avec empreinte, revalidation
+      par ETag pour les autres (HTML, manifest, sw.js...).
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : on se contente alors de gzip
+    brotli = None
+
+SITE_ROOT = Path(__file__).resolve().parent.parent
+DIST_DIR = SITE_ROOT / "dist"
+MANIFEST_NAME = "asset-manifest.json"
+
+FINGERPRINT_DIRS = ("images", "font", "css", "js")  # ordre : les dépendances d'abord
+EXCLUDED = {"backend", "api", "apk", "dist", ".git", ".vscode", "node_modules"}
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".xml", ".txt", ".ttf", ".ttc", ".otf", ".map", ".webmanifest"}
+REWRITABLE = {".html", ".css", ".js"}
+MIN_COMPRESS_SIZE = 256
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+_FINGERPRINTED_RE = re.compile(r"\.[0-9a-f]{8}\.[^./]+$")
+_REFERENCE_RE = re.compile(r"""(?P<quote>["'(])(?P<prefix>(?:\.\./|/)?)(?P<path>(?:css|js|images|font)/[^"'()?#\s]+)""")
+
+
+def fingerprint_name(relative: str, content: bytes) -> str:
+    digest = hashlib.md5(content).hexdigest()[:8]
+    stem, dot, ext = relative.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{relative}.{digest}"
+
+
+def rewrite_references(text: str, manifest: Dict[str, str]) -> str:
+    """Remplacer css/main.css, /css/main.css et ../css/main.css par leur version avec empreinte."""
+    def replace(match):
+        target = manifest.get(match.group("path"))
+        if target is None:
+            return match.group(0)
+        return match.group("quote") + match.group("prefix") + target
+    return _REFERENCE_RE.sub(replace, text)
+
+
+def compress_file(path: Path) -> Dict[str, int]:
+    """Écrire path.gz et path.br à côté du fichier, seulement s'ils sont plus petits."""
+    data = path.read_bytes()
+    sizes = {"identity": len(data)}
+    if len(data) < MIN_COMPRESS_SIZE or path.suffix.lower() not in COMPRESSIBLE:
+        return sizes
+    variants = {"gzip": (".gz", gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))}
+    if brotli is not None:
+        variants["br"] = (".br", brotli.compress(data, quality=BROTLI_QUALITY))
+    for encoding, (suffix, encoded) in variants.items():
+        if len(encoded) < len(data) * 0.9:
+            path.with_name(path.name + suffix).write_bytes(encoded)
+            sizes[encoding] = len(encoded)
+    return sizes
+
+
+def build(site_root: Path = SITE_ROOT, out_dir: Path = DIST_DIR) -> Dict[str, str]:
+    """Construire dist/ et retourner le manifeste des empreintes."""
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    shutil.copytree(site_root, out_dir, ignore=lambda directory, names: [
+        name for name in names
+        if (Path(directory) == site_root and name in EXCLUDED) or name.startswith(".") or name.endswith((".gz", ".br"))
+    ])
+
+    manifest: Dict[str, str] = {}
+    for directory in FINGERPRINT_DIRS:
+        for path in sorted((out_dir / directory).rglob("*")):
+            if not path.is_file():
+                continue
+            relative = path.relative_to(out_dir).as_posix()
+            if path.suffix.lower() in REWRITABLE:
+                path.write_text(rewrite_references(path.read_text(encoding="utf-8"), manifest), encoding="utf-8")
+            target = fingerprint_name(relative, path.read_bytes())
+            # L'original est conservé pour les URLs construites en JS et le service worker
+            shutil.copy2(path, out_dir / target)
+            manifest[relative] = target
+
+    for path in out_dir.glob("*.html"):
+        path.write_text(rewrite_references(path.read_text(encoding="utf-8"), manifest), encoding="utf-8")
+
+    for path in list(out_dir.rglob("*")):
+        if path.is_file():
+            compress_file(path)
+
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def _accepted_encodings(headers: Headers):
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles servant les variantes .br/.gz précompressées avec les bons en-têtes de cache."""
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        headers = {
+            "Cache-Control": IMMUTABLE if _FINGERPRINTED_RE.search(full_path) else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+
+        # La variante compressée a sa propre taille/date, donc son propre ETag
+        path = full_path
+        accepted = _accepted_encodings(request_headers)
+        for name, suffix in self.ENCODINGS:
+            if name in accepted:
+                try:
+                    stat_result = os.stat(full_path + suffix)
+                except OSError:
+                    continue
+                path = full_path + suffix
+                headers["Content-Encoding"] = name
+                break
+
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result,
+                                media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construire les fichiers statiques précompressés")
+    parser.add_argument("--out", type=Path, default=DIST_DIR)
+    args = parser.parse_args()
+    result = build(out_dir=args.out)
+    print(f"✅ {len(result)} fichiers avec empreinte dans {args.out}" + ("" if brotli else " (brotli absent : gzip seulement)"))
@@ -1,32 +1,76 @@
 #!/usr/bin/env python3
 """
-Script pour arrêter le serveur Vulsoft API
+Script pour arrêter (ou recharger) le serveur Vulsoft API
+
+Usage:
+    python stop.py            # arrêt propre (SIGTERM au processus maître)
+    python stop.py --reload   # redémarrage progressif des workers (SIGHUP)
 """
 
+import argparse
 import os
 import signal
-import psutil
+import time
+from pathlib import Path
+
+PID_FILE = Path(__file__).resolve().parent / "vulsoft.pid"
+STOP_TIMEOUT = 35
+
+def read_pid():
+    """PID du processus maître écrit par start.py, ou None s'il ne tourne plus."""
+    try:
+        pid = int(PID_FILE.read_text().strip())
+        os.kill(pid, 0)
+        return pid
+    except (FileNotFoundError, ValueError, ProcessLookupError):
+        return None
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
 
 def stop_server():
     """Arrêter le serveur FastAPI"""
-    
+
     print("🛑 Arrêt du serveur Vulsoft API...")
-    
-    # Chercher les processus Python qui utilisent le port 8001
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            if proc.info['name'] == 'python' or proc.info['name'] == 'python3':
-                cmdline = ' '.join(proc.info['cmdline'] or [])
-                if 'start.py' in cmdline or 'main:app' in cmdline:
-                    print(f"📍 Processus trouvé: PID {proc.info['pid']}")
-                    proc.terminate()
-                    proc.wait(timeout=5)
-                    print("✅ Serveur arrêté avec succès")
-                    return
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    print("ℹ️  Aucun serveur Vulsoft en cours d'exécution")
+
+    pid = read_pid()
+    if pid is None:
+        print("ℹ️  Aucun serveur Vulsoft en cours d'exécution")
+        return
+
+    print(f"📍 Processus maître: PID {pid}")
+    os.kill(pid, signal.SIGTERM)
+
+    deadline = time.monotonic() + STOP_TIMEOUT
+    while is_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.2)
+
+    if is_running(pid):
+        print("⚠️  Arrêt forcé")
+        os.kill(pid, signal.SIGKILL)
+        PID_FILE.unlink(missing_ok=True)
+
+    print("✅ Serveur arrêté avec succès")
+
+def reload_server():
+    """Redémarrage progressif des workers sans interruption de service"""
+    pid = read_pid()
+    if pid is None:
+        print("ℹ️  Aucun serveur Vulsoft en cours d'exécution")
+        return
+    os.kill(pid, signal.SIGHUP)
+    print(f"🔄 Redémarrage progressif demandé (PID {pid})")
 
 if __name__ == "__main__":
-    stop_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Arrêter ou recharger le serveur Vulsoft API")
+    parser.add_argument("--reload", action="store_true", help="redémarrage progressif des workers")
+    args = parser.parse_args()
+
+    if args.reload:
+        reload_server()
+    else:
+        stop_server()
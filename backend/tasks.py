@@ -0,0 +1,115 @@
+"""
+Tâches de fond exécutées par les workers de `jobs.py`.
+
+Les erreurs ne sont pas interceptées : une exception replanifie la tâche
+(backoff exponentiel) jusqu'à max_attempts. Les tâches périodiques se
+replanifient dans un finally, pour que la chaîne survive à un échec définitif.
+"""
+
+from typing import List
+
+from jobs import task, enqueue_many, reschedule
+from database import SessionLocal, NewsletterSubscriber
+from email_utils import get_mailer, fastapi_mail
+import email_service
+import analytics_store
+import analytics_olap
+import sketches
+import sessionization
+import recommendations
+from config import settings
+
+# Destinataires par email de newsletter (en copie cachée) : un lot en échec
+# est réessayé seul, sans renvoyer la newsletter aux autres lots
+NEWSLETTER_BATCH_SIZE = 100
+ANALYTICS_MAINTENANCE_INTERVAL = 24 * 3600
+SESSIONIZE_INTERVAL = 60
+RECOMMENDATIONS_REBUILD_INTERVAL = 24 * 3600
+
+
+@task("email.send", queue="email", priority=10)
+async def send_email(recipients: List[str], subject: str, body: str, subtype: str = "html"):
+    """Email transactionnel (bienvenue, réinitialisation de mot de passe...)."""
+    message = fastapi_mail.MessageSchema(subject=subject, recipients=recipients, body=body, subtype=subtype)
+    await get_mailer().send_message(message)
+
+
+@task("contact.emails", queue="email", priority=10)
+async def send_contact_emails(first_name: str, last_name: str, email: str, message: str, file_path: str = None):
+    """Confirmation à l'expéditeur et notification à l'administrateur."""
+    await email_service.send_contact_confirmation_email(email_to=email, first_name=first_name)
+    await email_service.send_contact_notification_to_admin(data={
+        "firstName": first_name,
+        "lastName": last_name,
+        "email": email,
+        "message": message,
+        "file_path": file_path,
+    })
+
+
+@task("newsletter.send", queue="email", max_attempts=3)
+def send_newsletter(subject: str, content: str):
+    """Découper les abonnés actifs en lots, chacun envoyé par sa propre tâche (créées en une transaction)."""
+    db = SessionLocal()
+    try:
+        emails = [email for (email,) in db.query(NewsletterSubscriber.email).filter(
+            NewsletterSubscriber.is_active == True
+        ).order_by(NewsletterSubscriber.id)]
+        enqueue_many("newsletter.batch", [
+            {"recipients": emails[start:start + NEWSLETTER_BATCH_SIZE], "subject": subject, "content": content}
+            for start in range(0, len(emails), NEWSLETTER_BATCH_SIZE)
+        ], db=db)
+        db.commit()
+    finally:
+        db.close()
+
+
+@task("newsletter.batch", queue="email", priority=-10)
+async def send_newsletter_batch(recipients: List[str], subject: str, content: str):
+    message = fastapi_mail.MessageSchema(subject=subject, recipients=[], bcc=recipients, body=content, subtype="html")
+    await get_mailer().send_message(message)
+
+
+@task("analytics.maintenance", max_attempts=3, timeout=1800)
+def analytics_maintenance():
+    """Archiver les partitions hors rétention, rendre l'espace libre et compacter les fichiers Parquet, purger les vieux compteurs et sessions, puis se replanifier."""
+    try:
+        archived = analytics_store.archive_expired()
+        freed = analytics_store.vacuum()
+        compacted = analytics_olap.compact()
+        sketches.prune(settings.ANALYTICS_SKETCH_RETENTION_DAYS)
+        sessionization.prune(settings.ANALYTICS_SESSION_RETENTION_DAYS)
+        if archived or freed or compacted:
+            print(f"Analytics : partitions archivées {archived}, pages rendues {freed}, jours compactés {compacted}")
+    finally:
+        reschedule("analytics.maintenance", delay=ANALYTICS_MAINTENANCE_INTERVAL)
+
+
+@task("analytics.sessionize", max_attempts=3, timeout=600)
+def analytics_sessionize():
+    """Intégrer les nouveaux événements aux résumés de sessions, puis se replanifier."""
+    try:
+        sessionization.process()
+    finally:
+        reschedule("analytics.sessionize", delay=SESSIONIZE_INTERVAL)
+
+
+@task("recommendations.refresh", max_attempts=3, timeout=600)
+def recommendations_refresh(kind: str, item_id: int):
+    """Mettre à jour les contenus similaires après l'écriture d'un article ou d'un projet."""
+    db = SessionLocal()
+    try:
+        recommendations.refresh(db, kind, item_id)
+    finally:
+        db.close()
+
+
+@task("recommendations.rebuild", max_attempts=3, timeout=1800)
+def recommendations_rebuild():
+    """Recalculer tous les contenus similaires (idf à jour), puis se replanifier."""
+    db = SessionLocal()
+    try:
+        recommendations.rebuild(db)
+    finally:
+        db.close()
+        reschedule("recommendations.rebuild", delay=RECOMMENDATIONS_REBUILD_INTERVAL)
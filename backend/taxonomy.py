@@ -0,0 +1,234 @@
+"""
+Étiquettes, technologies et catégories des articles et des projets.
+
+Une seule table `tags` (kind, slug) et deux tables d'association
+(`post_tags`, `project_tags`) indexées par (tag_id, élément) : c'est l'index
+inversé. Un filtre `?tag=react&technology=fastapi` devient un GROUP BY sur
+cet index (éléments portant toutes les étiquettes demandées), sans LIKE sur
+Project.technology.
+
+Les compteurs par étiquette (tags.post_count, tags.project_count ; articles
+publiés seulement) sont recalculés pour les étiquettes touchées par chaque
+écriture. `counts()` en garde une copie en mémoire par worker, invalidée par
+les événements du blog et des projets.
+"""
+
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, false, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import BlogPost, Project, Tag, post_tags, project_tags
+import events
+
+KINDS = ("tag", "technology", "category")
+# Une seule valeur par élément
+SINGLE_KINDS = {"category"}
+
+ASSOCIATIONS = {
+    "post": (post_tags, post_tags.c.post_id, "post_count"),
+    "project": (project_tags, project_tags.c.project_id, "project_count"),
+}
+
+_SEPARATORS_RE = re.compile(r"\s*[,;/|]\s*")
+
+_counts_cache: Dict[str, dict] = {}
+_counts_loaded_at: Dict[str, float] = {}
+
+
+def slugify(name: str) -> str:
+    """Forme normalisée d'une étiquette ("Vue.js" -> "vue.js", "C++" -> "c++")."""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9+#.]+", "-", folded).strip("-.")
+
+
+def split_technology(value: Optional[str]) -> List[str]:
+    """Project.technology en texte libre ("React, FastAPI / Stripe") vers une liste."""
+    return [part.strip() for part in _SEPARATORS_RE.split(value or "") if part.strip()]
+
+
+def ensure_tags(db: Session, kind: str, names: Iterable[str]) -> Dict[str, int]:
+    """
+    {slug: id} des étiquettes du type `kind` pour ces noms, créées au besoin
+    (sans commit). INSERT OR IGNORE puis relecture : deux écritures concurrentes
+    qui créent la même étiquette ne se heurtent pas à uq_tags_kind_slug.
+    """
+    wanted: Dict[str, str] = {}
+    for name in names:
+        slug = slugify(name)
+        if slug:
+            wanted.setdefault(slug, name.strip())
+    if not wanted:
+        return {}
+    db.execute(insert(Tag.__table__).prefix_with("OR IGNORE"), [
+        {"kind": kind, "slug": slug, "name": name, "post_count": 0, "project_count": 0}
+        for slug, name in wanted.items()
+    ])
+    return dict(db.query(Tag.slug, Tag.id).filter(Tag.kind == kind, Tag.slug.in_(list(wanted))))
+
+
+def set_labels(db: Session, item_type: str, item_id: int, labels: Dict[str, Optional[List[str]]]):
+    """
+    Remplacer les étiquettes d'un élément, type par type (None : inchangé), puis
+    recalculer les compteurs des étiquettes ajoutées ou retirées. Sans commit.
+    """
+    set_labels_many(db, item_type, {item_id: labels})
+
+
+def set_labels_many(db: Session, item_type: str, labels_by_item: Dict[int, Dict[str, Optional[List[str]]]]):
+    """
+    set_labels pour plusieurs éléments (imports, rattrapages) : un INSERT OR
+    IGNORE par type d'étiquette, une lecture des associations existantes, un
+    DELETE et un INSERT groupés, un recalcul des compteurs. Sans commit.
+    """
+    if not labels_by_item:
+        return
+    table, item_column, _ = ASSOCIATIONS[item_type]
+    item_ids = list(labels_by_item)
+
+    wanted: Dict[int, Dict[str, List[str]]] = {}
+    for item_id, labels in labels_by_item.items():
+        for kind, names in labels.items():
+            if names is not None:
+                wanted.setdefault(item_id, {})[kind] = names[:1] if kind in SINGLE_KINDS else names
+    ids_by_kind = {kind: ensure_tags(db, kind, [name for labels in wanted.values() for name in labels.get(kind, [])])
+                   for kind in {kind for labels in wanted.values() for kind in labels}}
+
+    current: Dict[int, set] = {item_id: set() for item_id in item_ids}
+    kind_of: Dict[int, str] = {}
+    for item_id, tag_id, kind in db.execute(
+        select(item_column, table.c.tag_id, Tag.kind).join(Tag, Tag.id == table.c.tag_id).where(item_column.in_(item_ids))
+    ):
+        current[item_id].add(tag_id)
+        kind_of[tag_id] = kind
+
+    removed, added, touched = [], [], set()
+    for item_id, labels in wanted.items():
+        for kind, names in labels.items():
+            slugs = {slugify(name) for name in names}
+            new_ids = {tag_id for slug, tag_id in ids_by_kind[kind].items() if slug in slugs}
+            old_ids = {tag_id for tag_id in current[item_id] if kind_of[tag_id] == kind}
+            removed += [{"item": item_id, "tag": tag_id} for tag_id in old_ids - new_ids]
+            added += [{item_column.name: item_id, "tag_id": tag_id} for tag_id in new_ids - old_ids]
+            touched |= old_ids ^ new_ids
+    if removed:
+        db.execute(table.delete().where(item_column == bindparam("item"), table.c.tag_id == bindparam("tag")), removed)
+    if added:
+        db.execute(table.insert(), added)
+    # La publication d'un article change aussi les compteurs de ses étiquettes
+    for tag_ids in current.values():
+        touched |= tag_ids
+    refresh_counts(db, touched)
+
+
+def remove_item(db: Session, item_type: str, item_id: int):
+    """Retirer un élément supprimé de l'index (avant son commit)."""
+    table, item_column, _ = ASSOCIATIONS[item_type]
+    tag_ids = {tag_id for (tag_id,) in db.execute(select(table.c.tag_id).where(item_column == item_id))}
+    db.execute(table.delete().where(item_column == item_id))
+    refresh_counts(db, tag_ids)
+
+
+def refresh_counts(db: Session, tag_ids: Iterable[int]):
+    """Recompter les éléments de ces étiquettes (articles publiés seulement)."""
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    posts = dict(db.execute(
+        select(post_tags.c.tag_id, func.count())
+        .join(BlogPost, BlogPost.id == post_tags.c.post_id)
+        .where(post_tags.c.tag_id.in_(tag_ids), BlogPost.is_published == True)
+        .group_by(post_tags.c.tag_id)
+    ).all())
+    projects = dict(db.execute(
+        select(project_tags.c.tag_id, func.count())
+        .where(project_tags.c.tag_id.in_(tag_ids))
+        .group_by(project_tags.c.tag_id)
+    ).all())
+    for tag in db.query(Tag).filter(Tag.id.in_(tag_ids)):
+        tag.post_count = posts.get(tag.id, 0)
+        tag.project_count = projects.get(tag.id, 0)
+
+
+def filter_items(db: Session, query, item_type: str, id_column, filters: Dict[str, List[str]]):
+    """
+    Restreindre `query` aux éléments portant toutes les étiquettes de `filters`
+    ({kind: [slug, ...]}) : intersection par GROUP BY ... HAVING sur l'index.
+    """
+    wanted = {(kind, slugify(value)) for kind, values in filters.items() for value in values or [] if slugify(value)}
+    if not wanted:
+        return query
+    tag_ids = [tag_id for (tag_id,) in db.query(Tag.id).filter(
+        or_(*(and_(Tag.kind == kind, Tag.slug == slug) for kind, slug in wanted))
+    )]
+    if len(tag_ids) < len(wanted):
+        # Une étiquette inconnue : aucun élément ne les porte toutes
+        return query.filter(false())
+    table, item_column, _ = ASSOCIATIONS[item_type]
+    matching = (
+        select(item_column)
+        .where(table.c.tag_id.in_(tag_ids))
+        .group_by(item_column)
+        .having(func.count() == len(tag_ids))
+    )
+    return query.filter(id_column.in_(matching))
+
+
+def labels_of(db: Session, item_type: str, item_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """Étiquettes de plusieurs éléments en une requête : {id: [{"kind", "slug", "name"}]}."""
+    item_ids = list(item_ids)
+    result: Dict[int, List[dict]] = {item_id: [] for item_id in item_ids}
+    if not item_ids:
+        return result
+    table, item_column, _ = ASSOCIATIONS[item_type]
+    rows = db.execute(
+        select(item_column, Tag.kind, Tag.slug, Tag.name)
+        .join(Tag, Tag.id == table.c.tag_id)
+        .where(item_column.in_(item_ids))
+        .order_by(Tag.kind, Tag.name)
+    )
+    for item_id, kind, slug, name in rows:
+        result[item_id].append({"kind": kind, "slug": slug, "name": name})
+    return result
+
+
+def counts(db: Session, item_type: str) -> dict:
+    """{kind: [{"slug", "name", "count"}]} des étiquettes utilisées, pour les filtres du frontend."""
+    loaded_at = _counts_loaded_at.get(item_type)
+    if loaded_at is None or time.monotonic() - loaded_at > settings.TAXONOMY_CACHE_SECONDS:
+        column = getattr(Tag, ASSOCIATIONS[item_type][2])
+        result = {kind: [] for kind in KINDS}
+        for kind, slug, name, count in db.query(Tag.kind, Tag.slug, Tag.name, column).filter(
+            column > 0
+        ).order_by(column.desc(), Tag.name):
+            result[kind].append({"slug": slug, "name": name, "count": count})
+        _counts_cache[item_type] = result
+        _counts_loaded_at[item_type] = time.monotonic()
+    return _counts_cache[item_type]
+
+
+def invalidate():
+    _counts_loaded_at.clear()
+
+
+@events.bus.subscribe(events.PostPublished, events.PostDeleted, events.ProjectUpdated)
+def on_item_event(event):
+    """Chaque worker recharge ses compteurs après une écriture (scope=ALL)."""
+    invalidate()
+
+
+def backfill_projects(db: Session) -> int:
+    """Indexer les technologies des projets créés avant la taxonomie."""
+    indexed = select(project_tags.c.project_id).join(Tag, Tag.id == project_tags.c.tag_id).where(Tag.kind == "technology")
+    projects = db.query(Project.id, Project.technology).filter(
+        Project.technology != None, Project.technology != "", Project.id.not_in(indexed)
+    ).all()
+    set_labels_many(db, "project", {
+        project_id: {"technology": split_technology(technology)} for project_id, technology in projects
+    })
+    db.commit()
+    return len(projects)
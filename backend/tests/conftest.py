@@ -0,0 +1,27 @@
+"""
+Configuration commune des tests (lancés depuis backend/ : `python -m pytest tests`).
+
+Les modules du backend s'importent à plat (`from config import settings`) :
+backend/ est ajouté au chemin. Les tests tournent dans un répertoire
+temporaire, pour que les chemins relatifs de la configuration (base SQLite,
+données analytiques) et le .env local ne soient pas ceux du déploiement.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.chdir(tempfile.mkdtemp(prefix="vulsoft-tests-"))
+for name, value in {
+    "MAIL_USERNAME": "test",
+    "MAIL_PASSWORD": "test",
+    "MAIL_FROM": "test@example.com",
+    "MAIL_PORT": "25",
+    "MAIL_SERVER": "localhost",
+    "MAIL_FROM_NAME": "Vulsoft",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,32 @@
+from blog_content import derive, sanitize
+
+
+def clean(raw_html: str) -> str:
+    return "".join(sanitize(raw_html).out)
+
+
+def test_script_and_content_are_dropped():
+    assert clean("<p>a<script>alert(1)</script>b</p>") == "<p>ab</p>"
+    assert clean("<style>p{}</style><p>ok</p>") == "<p>ok</p>"
+
+
+def test_event_handler_attributes_are_stripped():
+    assert clean('<p onclick="alert(1)">x</p>') == "<p>x</p>"
+    assert clean('<img src="/a.png" onerror="alert(1)" alt="a">') == '<img src="/a.png" alt="a">'
+
+
+def test_unsafe_urls_are_removed():
+    assert "javascript" not in clean('<a href="java&#x09;script:alert(1)">x</a>')
+    assert clean('<a href="https://vulsoft.org">x</a>').startswith('<a href="https://vulsoft.org"')
+
+
+def test_self_closing_dropped_tag_does_not_swallow_the_rest():
+    assert clean("<p>a</p><svg/><p>b</p>") == "<p>a</p><p>b</p>"
+    assert clean("<p>a<iframe src=x /></p><p>b</p>") == "<p>a</p><p>b</p>"
+
+
+def test_derive_collects_text_and_toc():
+    derived = derive("<h2>Intro</h2><p>un deux trois</p><script>x y z</script>")
+    assert derived["excerpt"] == "Intro un deux trois"
+    assert derived["word_count"] == 4
+    assert derived["toc"] == [{"level": 2, "id": "intro", "text": "Intro"}]
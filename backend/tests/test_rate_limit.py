@@ -0,0 +1,41 @@
+import pytest
+
+from rate_limit import MemoryStore, Policy, SQLiteStore
+
+POLICY = Policy(rate=1.0, burst=3)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore(shards=2)
+    return SQLiteStore(str(tmp_path / "rate_limit.db"))
+
+
+def test_burst_then_refusal_with_retry_after(store):
+    assert [store.consume("ip:1", POLICY, 100.0)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = store.consume("ip:1", POLICY, 100.0)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_bucket_refills_at_policy_rate(store):
+    for _ in range(3):
+        store.consume("ip:1", POLICY, 100.0)
+    allowed, retry_after = store.consume("ip:1", POLICY, 100.5)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+    assert store.consume("ip:1", POLICY, 101.0)[0]
+    assert not store.consume("ip:1", POLICY, 101.0)[0]
+
+
+def test_refill_is_capped_at_burst(store):
+    store.consume("ip:1", POLICY, 100.0)
+    results = [store.consume("ip:1", POLICY, 1000.0)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_keys_have_separate_buckets(store):
+    for _ in range(3):
+        store.consume("ip:1", POLICY, 100.0)
+    assert store.consume("ip:2", POLICY, 100.0)[0]
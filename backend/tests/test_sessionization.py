@@ -0,0 +1,60 @@
+import json
+from datetime import datetime, timedelta
+
+from sessionization import SESSION_GAP, _apply, is_sampled_event
+
+START = datetime(2026, 3, 1, 10, 0, 0)
+
+
+def event(minutes: float, url: str = "/", event_type: str = "pageview", details=None, user_id=None):
+    timestamp = START + timedelta(minutes=minutes)
+    return (1, "s1", user_id, event_type, url, json.dumps(details) if details else None, timestamp)
+
+
+def test_events_within_the_gap_extend_the_session():
+    session = _apply(None, event(0, "/"))
+    session = _apply(session, event(10, "/blog"))
+    session = _apply(session, event(12, "/blog", "click", {"element": "cta"}, user_id=7))
+    assert session["events"] == 3
+    assert session["pageviews"] == 2
+    assert session["entry_url"] == "/"
+    assert session["exit_url"] == "/blog"
+    assert session["user_id"] == 7
+    assert session["steps"] == ["pageview:/", "pageview:/blog", "click:cta"]
+
+
+def test_gap_longer_than_session_gap_starts_a_new_session():
+    first = _apply(None, event(0, "/"))
+    gap = SESSION_GAP.total_seconds() / 60
+    second = _apply(first, event(gap + 1, "/contact"))
+    assert second is not first
+    assert second["events"] == 1
+    assert second["entry_url"] == "/contact"
+    assert second["started_at"] == (START + timedelta(minutes=gap + 1)).isoformat(sep=" ")
+
+
+def test_gap_of_exactly_session_gap_keeps_the_session():
+    first = _apply(None, event(0, "/"))
+    same = _apply(first, event(SESSION_GAP.total_seconds() / 60, "/blog"))
+    assert same is first
+    assert same["events"] == 2
+
+
+def test_late_event_moves_start_but_not_exit():
+    session = _apply(None, event(5, "/blog"))
+    session = _apply(session, event(1, "/"))
+    assert session["started_at"] == (START + timedelta(minutes=1)).isoformat(sep=" ")
+    assert session["exit_url"] == "/blog"
+
+
+def test_repeated_steps_are_collapsed():
+    session = _apply(None, event(0, "/"))
+    session = _apply(session, event(1, "/"))
+    assert session["steps"] == ["pageview:/"]
+
+
+def test_sampled_events_are_detected():
+    assert not is_sampled_event(None)
+    assert not is_sampled_event(json.dumps({"element": "cta"}))
+    assert not is_sampled_event(json.dumps({"sample_weight": 1}))
+    assert is_sampled_event(json.dumps({"sample_weight": 10}))
@@ -0,0 +1,56 @@
+import pytest
+
+import sketches
+from sketches import CountMinSketch, HeavyHitters, HyperLogLog
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def merge_path(request, monkeypatch):
+    """Les fusions ont une version NumPy et une version pure Python : tester les deux."""
+    if request.param and not sketches.HAS_NUMPY:
+        pytest.skip("numpy n'est pas installé")
+    monkeypatch.setattr(sketches, "HAS_NUMPY", request.param)
+
+
+def test_hyperloglog_merge_roundtrip(merge_path):
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        (left if i % 2 else right).add(f"s{i}")
+        union.add(f"s{i}")
+    merged = HyperLogLog.from_bytes(left.to_bytes())
+    merged.merge(HyperLogLog.from_bytes(right.to_bytes()))
+    assert merged.registers == union.registers
+    assert merged.count() == pytest.approx(3000, rel=0.05)
+
+
+def test_count_min_sketch_merge_roundtrip(merge_path):
+    left, right = CountMinSketch(), CountMinSketch()
+    left.add("/", 5)
+    left.add("/blog", 2)
+    right.add("/", 3)
+    merged = CountMinSketch.from_bytes(left.to_bytes())
+    merged.merge(CountMinSketch.from_bytes(right.to_bytes()))
+    assert merged.estimate("/") == 8
+    assert merged.estimate("/blog") == 2
+    assert merged.estimate("/absent") == 0
+
+
+def test_heavy_hitters_merge_roundtrip(merge_path):
+    left, right = HeavyHitters(capacity=3), HeavyHitters(capacity=3)
+    for key, count in {"/": 10, "/blog": 6, "/contact": 1}.items():
+        left.add(key, count)
+    for key, count in {"/": 4, "/projects": 8, "/blog": 1}.items():
+        right.add(key, count)
+    merged = HeavyHitters.from_bytes(left.to_bytes())
+    merged.merge(HeavyHitters.from_bytes(right.to_bytes()))
+    assert merged.top(3) == [("/", 14), ("/projects", 8), ("/blog", 7)]
+    assert len(merged.counters) == 3
+
+
+def test_heavy_hitters_counts_never_underestimate_after_eviction():
+    hitters = HeavyHitters(capacity=2)
+    for key in ["a", "a", "a", "b", "c", "c"]:
+        hitters.add(key)
+    counts = dict(hitters.top(2))
+    assert counts["a"] == 3
+    assert counts["c"] >= 2
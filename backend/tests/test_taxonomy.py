@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# database.py importe encore .core.config : sans ce paquet, rien à tester ici
+taxonomy = pytest.importorskip("taxonomy", exc_type=ImportError)
+from database import Base, BlogPost  # noqa: E402
+from taxonomy import filter_items, set_labels_many, slugify, split_technology  # noqa: E402
+
+
+@pytest.mark.parametrize("name, slug", [
+    ("Vue.js", "vue.js"),
+    ("C++", "c++"),
+    ("C#", "c#"),
+    ("  Intelligence Artificielle ", "intelligence-artificielle"),
+    ("Développement Web", "developpement-web"),
+    ("...", ""),
+])
+def test_slugify(name, slug):
+    assert slugify(name) == slug
+
+
+def test_split_technology():
+    assert split_technology("React, FastAPI / Stripe;  ") == ["React", "FastAPI", "Stripe"]
+    assert split_technology(None) == []
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    taxonomy.invalidate()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_filter_items_requires_every_label(db):
+    posts = [BlogPost(title=f"Post {i}", slug=f"post-{i}", is_published=True) for i in range(3)]
+    db.add_all(posts)
+    db.flush()
+    set_labels_many(db, "post", {
+        posts[0].id: {"tag": ["Python", "FastAPI"], "category": ["Web"]},
+        posts[1].id: {"tag": ["Python"], "category": ["Web"]},
+        posts[2].id: {"tag": ["FastAPI"], "category": ["Data"]},
+    })
+    db.commit()
+
+    def ids(filters):
+        query = filter_items(db, db.query(BlogPost), "post", BlogPost.id, filters)
+        return sorted(post.slug for post in query)
+
+    assert ids({"tag": ["python"]}) == ["post-0", "post-1"]
+    assert ids({"tag": ["Python", "fastapi"]}) == ["post-0"]
+    assert ids({"tag": ["FastAPI"], "category": ["data"]}) == ["post-2"]
+    assert ids({"tag": ["Rust"]}) == []
+    assert ids({}) == ["post-0", "post-1", "post-2"]
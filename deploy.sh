@@ -243,7 +243,12 @@ User=www-data
 Group=www-data
 WorkingDirectory=/var/www/vulsoft.org/backend
 Environment=PATH=/var/www/vulsoft.org/backend/venv/bin
-ExecStart=/var/www/vulsoft.org/backend/venv/bin/gunicorn main:app -w 4 -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8000
+Environment=JOBS_EMBEDDED_WORKER=false
+# Plusieurs workers : événements rediffusés entre eux, seaux de limitation partagés
+Environment=EVENT_BUS_BROKER=local
+Environment=RATE_LIMIT_STORE=sqlite:///./rate_limit.db
+Environment=RATE_LIMIT_TRUSTED_PROXIES=["127.0.0.1"]
+ExecStart=/var/www/vulsoft.org/backend/venv/bin/python start.py --host 127.0.0.1 --port 8000
 ExecReload=/bin/kill -s HUP $MAINPID
 Restart=always
 RestartSec=3
@@ -254,6 +259,29 @@ EOF
 
 print_success "Service systemd généré (vulsoft.service)"
 
+# Workers de la file de tâches (emails, newsletter)
+cat > vulsoft-worker.service << 'EOF'
+[Unit]
+Description=Vulsoft job queue worker
+After=network.target
+
+[Service]
+Type=exec
+User=www-data
+Group=www-data
+WorkingDirectory=/var/www/vulsoft.org/backend
+Environment=PATH=/var/www/vulsoft.org/backend/venv/bin
+ExecStart=/var/www/vulsoft.org/backend/venv/bin/python jobs.py worker --queues email,default --concurrency 4
+TimeoutStopSec=150
+Restart=always
+RestartSec=3
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+print_success "Service systemd généré (vulsoft-worker.service)"
+
 # Test de l'application
 print_status "Test de l'application..."
 
@@ -310,7 +338,7 @@ echo ""
 echo "1. 🔧 Configuration du serveur:"
 echo "   - Copiez les fichiers sur votre serveur"
 echo "   - Configurez nginx avec nginx.conf"
-echo "   - Installez le service avec vulsoft.service"
+echo "   - Installez les services vulsoft.service et vulsoft-worker.service"
 echo ""
 echo "2. 🔐 Configuration SSL:"
 echo "   - Obtenez un certificat SSL (Let's Encrypt recommandé)"
@@ -326,8 +354,8 @@ echo "   - Changez SECRET_KEY en production"
 echo "   - Configurez les clés Stripe LIVE"
 echo ""
 echo "5. 🚀 Démarrage:"
-echo "   sudo systemctl enable vulsoft"
-echo "   sudo systemctl start vulsoft"
+echo "   sudo systemctl enable vulsoft vulsoft-worker"
+echo "   sudo systemctl start vulsoft vulsoft-worker"
 echo "   sudo systemctl reload nginx"
 echo ""
 echo "6. 📊 Monitoring:"
@@ -9,6 +9,46 @@ class AdminAPI extends VulsoftAuth {
         return await this.request('/admin/stats');
     }
 
+    /**
+     * Flux temps réel du dashboard (Server-Sent Events lus avec fetch,
+     * pour pouvoir envoyer l'en-tête Authorization). Retourne un AbortController.
+     */
+    openDashboardStream(onEvent, onError) {
+        const controller = new AbortController();
+        const run = async () => {
+            const response = await fetch(`${this.apiUrl}/admin/stream`, {
+                headers: { Authorization: `Bearer ${this.getAccessToken()}` },
+                signal: controller.signal
+            });
+            if (!response.ok) {
+                throw new Error(`Flux indisponible (${response.status})`);
+            }
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let event = 'message';
+                    let data = '';
+                    block.split('\n').forEach(line => {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                    });
+                    if (data) onEvent(event, JSON.parse(data));
+                }
+            }
+        };
+        run().catch(error => {
+            if (!controller.signal.aborted) onError?.(error);
+        });
+        return controller;
+    }
+
     async getUsers(params = {}) {
         const queryString = new URLSearchParams(params).toString();
         return await this.request(`/admin/users?${queryString}`);
@@ -44,6 +84,27 @@ class AdminAPI extends VulsoftAuth {
         });
     }
 
+    async bulkUpdateMessageStatus(ids, status) {
+        return await this.request('/admin/messages/bulk-status', {
+            method: 'POST',
+            body: JSON.stringify({ ids, status })
+        });
+    }
+
+    async bulkDeleteMessages(ids) {
+        return await this.request('/admin/messages/bulk-delete', {
+            method: 'POST',
+            body: JSON.stringify({ ids })
+        });
+    }
+
+    async bulkSetUsersActive(ids, isActive) {
+        return await this.request('/admin/users/bulk-active', {
+            method: 'POST',
+            body: JSON.stringify({ ids, is_active: isActive })
+        });
+    }
+
     async getProjectsAdmin(params = {}) {
         const queryString = new URLSearchParams(params).toString();
         return await this.request(`/admin/projects?${queryString}`);
@@ -140,6 +201,13 @@ class AdminAPI extends VulsoftAuth {
         });
     }
 
+    async reorderProjectImages(projectId, imageIds, primaryId = null) {
+        return await this.request(`/projects/${projectId}/images/order`, {
+            method: 'PUT',
+            body: JSON.stringify({ image_ids: imageIds, primary_id: primaryId })
+        });
+    }
+
     async deleteProjectImage(imageId) {
         return await this.request(`/projects/images/${imageId}`, {
             method: 'DELETE'
@@ -173,6 +241,12 @@ class AdminAPI extends VulsoftAuth {
 // Instance globale de l'API Admin
 window.adminAPI = new AdminAPI();
 
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text ?? '';
+    return div.innerHTML;
+}
+
 // Gestionnaire de navigation
 class AdminNavigation {
     constructor() {
@@ -213,6 +287,9 @@ class AdminNavigation {
         document.querySelector(`[data-section="${sectionName}"]`).classList.add('active');
 
         this.currentSection = sectionName;
+        if (sectionName !== 'dashboard') {
+            this.closeDashboardStream();
+        }
 
         // Charger les données de la section
         this.loadSectionData(sectionName);
@@ -245,15 +322,67 @@ class AdminNavigation {
     }
 
     async loadDashboard() {
-        try {
-            const stats = await window.adminAPI.getAdminStats();
-            this.renderStats(stats);
-            this.loadRecentActivity();
-        } catch (error) {
-            window.notifications?.error('Erreur lors du chargement du dashboard');
+        // Le flux envoie d'abord un instantané, puis les deltas : pas de rechargement périodique
+        if (this.dashboardStream) return;
+        this.activity = [];
+        this.loadRecentActivity();
+        this.dashboardStream = window.adminAPI.openDashboardStream(
+            (event, message) => this.handleDashboardEvent(event, message),
+            () => {
+                this.dashboardStream = null;
+                window.notifications?.error('Erreur lors du chargement du dashboard');
+                // Reconnexion tant que le dashboard est affiché
+                setTimeout(() => {
+                    if (this.currentSection === 'dashboard') this.loadDashboard();
+                }, 5000);
+            }
+        );
+    }
+
+    closeDashboardStream() {
+        if (this.dashboardStream) {
+            this.dashboardStream.abort();
+            this.dashboardStream = null;
         }
     }
 
+    handleDashboardEvent(event, message) {
+        if (event === 'snapshot') {
+            this.stats = message.stats;
+            this.streamVersion = message.version;
+            this.renderStats(this.stats);
+            return;
+        }
+        // Déjà inclus dans l'instantané
+        if (message.version <= this.streamVersion) return;
+        this.streamVersion = message.version;
+
+        const data = message.data;
+        if (event === 'stats') {
+            this.stats = data;
+        } else if (data.delta) {
+            Object.entries(data.delta).forEach(([key, delta]) => {
+                this.stats[key] += delta;
+            });
+        }
+        this.renderStats(this.stats);
+
+        if (event === 'contact') {
+            this.pushActivity(`📧 Nouveau message de ${data.name}`, data.service || 'Contact');
+        } else if (event === 'registration') {
+            this.pushActivity(`👤 Nouvel utilisateur inscrit : ${data.username}`, '');
+        } else if (event === 'pageviews') {
+            const top = Object.entries(data.pages)[0];
+            this.pushActivity(`👁️ ${data.count} page(s) vue(s)`, top ? top[0] : '');
+        }
+    }
+
+    pushActivity(title, detail) {
+        this.activity.unshift({ title, detail, time: new Date() });
+        this.activity = this.activity.slice(0, 10);
+        this.loadRecentActivity();
+    }
+
     renderStats(stats) {
         const statsGrid = document.getElementById('stats-grid');
         statsGrid.innerHTML = `
@@ -282,20 +411,19 @@ class AdminNavigation {
 
     async loadRecentActivity() {
         const activityEl = document.getElementById('recent-activity');
+        activityEl.classList.remove('loading');
+        if (!this.activity || this.activity.length === 0) {
+            activityEl.innerHTML = '<div class="empty-state">En attente d\'activité...</div>';
+            return;
+        }
         activityEl.innerHTML = `
             <div style="padding: 2rem;">
-                <div style="margin-bottom: 1rem; padding: 1rem; background: var(--bg-secondary); border-radius: 8px;">
-                    <strong>📧 Nouveau message de contact</strong><br>
-                    <small style="color: var(--text-secondary);">Il y a 2 heures</small>
-                </div>
-                <div style="margin-bottom: 1rem; padding: 1rem; background: var(--bg-secondary); border-radius: 8px;">
-                    <strong>👤 Nouvel utilisateur inscrit</strong><br>
-                    <small style="color: var(--text-secondary);">Il y a 4 heures</small>
-                </div>
-                <div style="margin-bottom: 1rem; padding: 1rem; background: var(--bg-secondary); border-radius: 8px;">
-                    <strong>🚀 Projet mis à jour</strong><br>
-                    <small style="color: var(--text-secondary);">Hier</small>
-                </div>
+                ${this.activity.map(item => `
+                    <div style="margin-bottom: 1rem; padding: 1rem; background: var(--bg-secondary); border-radius: 8px;">
+                        <strong>${escapeHtml(item.title)}</strong><br>
+                        <small style="color: var(--text-secondary);">${escapeHtml(item.detail)} · ${item.time.toLocaleTimeString('fr-FR')}</small>
+                    </div>
+                `).join('')}
             </div>
         `;
     }
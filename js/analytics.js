@@ -46,7 +46,7 @@ class AnalyticsTracker {
             await this.auth.request('/analytics/track', {
                 method: 'POST',
                 body: JSON.stringify(payload),
-                headers: { 'Content-Type': 'application/json' }
+                headers: { 'Content-Type': 'application/json', 'X-Session-ID': this.sessionId }
             });
         } catch (error) {
             // Ne pas bloquer l'utilisateur si le tracking échoue
@@ -39,8 +39,8 @@ document.addEventListener('DOMContentLoaded', () => {
             year: 'numeric', month: 'long', day: 'numeric'
         });
 
-        // Convertir le contenu Markdown en HTML
-        const contentHtml = marked.parse(post.content || '');
+        // HTML nettoyé calculé à l'enregistrement (Markdown converti en repli)
+        const contentHtml = post.content_html ?? marked.parse(post.content || '');
 
         const authorInitials = post.author.full_name
             .split(' ')
@@ -77,7 +77,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!relatedGrid) return;
 
         try {
-            // Cet endpoint est un exemple, il faudra l'implémenter côté backend
+            // Voisins précalculés côté serveur (articles et projets)
             const response = await fetch(`${API_URL}/blog/posts/${currentPostId}/related`);
             if (!response.ok) {
                 throw new Error('Impossible de charger les articles similaires.');
@@ -87,9 +87,13 @@ document.addEventListener('DOMContentLoaded', () => {
             if (relatedPosts.length > 0) {
                 relatedPostsSection.style.display = 'block';
                 relatedGrid.innerHTML = '';
-                relatedPosts.forEach(post => {
-                    const postCard = createRelatedPostCard(post);
-                    relatedGrid.appendChild(postCard);
+                // Les voisins mêlent articles et projets : une carte propre à chacun
+                relatedPosts.forEach(item => {
+                    if (item.type === 'project') {
+                        relatedGrid.appendChild(createRelatedProjectCard(item));
+                    } else if (item.type === 'post') {
+                        relatedGrid.appendChild(createRelatedPostCard(item));
+                    }
                 });
             }
 
@@ -101,7 +105,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function createRelatedPostCard(post) {
         const card = document.createElement('a');
-        card.href = `blog-post.html?id=${post.id}`;
+        card.href = post.url || `blog-post.html?id=${post.slug}`;
         card.className = 'blog-card';
 
         card.innerHTML = `
@@ -113,5 +117,20 @@ document.addEventListener('DOMContentLoaded', () => {
         return card;
     }
 
+    function createRelatedProjectCard(project) {
+        const card = document.createElement('a');
+        card.href = project.url || `project-details.html?id=${project.id}`;
+        card.className = 'blog-card';
+
+        card.innerHTML = `
+            <div class="blog-card-image" style="background-image: url('https://placehold.co/600x400/1a1a1a/ffffff?text=Projet')"></div>
+            <div class="blog-card-content">
+                <div class="blog-card-meta"><span>Projet</span></div>
+                <h3 class="blog-card-title">${project.title}</h3>
+            </div>
+        `;
+        return card;
+    }
+
     fetchPostDetails();
 });
\ No newline at end of file
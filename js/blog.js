@@ -104,7 +104,7 @@ class BlogManager {
         const randomKeyword = keywords[Math.floor(Math.random() * keywords.length)];
         const imageUrl = post.image_url || `https://source.unsplash.com/600x400/?${randomKeyword}&sig=${post.id}`;
         // Créer un extrait du contenu
-        const excerpt = this.createExcerpt(post.content);
+        const excerpt = post.excerpt || this.createExcerpt(post.content);
 
         // Formater la date
         const date = new Date(post.created_at).toLocaleDateString('fr-FR', {
@@ -145,9 +145,8 @@ class BlogManager {
     }
 
     openPost(post) {
-        // Pour l'instant, afficher dans une modal simple
-        // Plus tard, on pourra créer une page dédiée
-        this.showPostModal(post);
+        // Page générée côté serveur (backend/blog_static.py)
+        window.location.href = `/blog/${post.slug}.html`;
     }
 
     showPostModal(post) {
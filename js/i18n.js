@@ -30,11 +30,35 @@ class I18nManager {
         return this.defaultLanguage;
     }
 
+    async loadManifest() {
+        // Bundles par page générés par le backend (i18n_bundles.py) ; null si le site est servi sans lui
+        if (this.manifest === undefined) {
+            try {
+                const response = await fetch('/i18n/manifest.json');
+                this.manifest = response.ok ? await response.json() : null;
+            } catch (error) {
+                this.manifest = null;
+            }
+        }
+        return this.manifest;
+    }
+
+    bundleUrl(manifest, lang) {
+        const page = document.documentElement.dataset.i18nPage
+            || window.location.pathname.split('/').pop().replace(/\.html$/, '')
+            || 'index';
+        const files = manifest.pages[page] || manifest.pages._all;
+        // Les replis entre langues sont déjà appliqués dans chaque bundle
+        return files && files[lang] ? `/i18n/${files[lang]}` : null;
+    }
+
     async loadTranslations(lang) {
         try {
+            const manifest = await this.loadManifest();
+            const bundle = manifest && this.bundleUrl(manifest, lang);
             // Adjust path for pages in subdirectories
             const path = window.location.pathname.includes('/pages/') ? '..' : '.';
-            const response = await fetch(`${path}/${lang}.json`);
+            const response = await fetch(bundle || `${path}/${lang}.json`);
             if (!response.ok) {
                 throw new Error(`Could not load translation file for ${lang}`);
             }